@@ -21,6 +21,8 @@ setup(
     },
     packages=find_packages('src'),
     package_dir={'': 'src'},
+    extras_require={'fast': ['orjson']},
+    entry_points={'console_scripts': ['etherpad-migrate = py_etherpad.migrate:main']},
     options={'bdist_wheel': {'universal': True}},
     zip_safe=True,  # This package can safely be installed from a zip file
     platforms='any',
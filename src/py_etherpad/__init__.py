@@ -1,12 +1,30 @@
 #!/usr/bin/env python
 """Module to talk to EtherpadLite API."""
 
-import json
+import contextlib
+import functools
+import time
 import urllib.error as urllib_error
 import urllib.parse as urllib_parse
 import urllib.request as urllib_request
 import urllib.request as build_opener
 
+from .batch import Batch, BatchResult, imap
+from .cache import ResponseCache
+from .chat import chat_since, iter_chat
+from .codec import get_loads
+from .functions import FUNCTIONS, READ_FUNCTIONS, compile_specs, make_spec, parse_version
+from .history import export_revisions, iter_revisions
+from .mappers import MapperCache
+from .metrics import CallEvent, MetricsCollector
+from .pool import ConnectionPool
+from .ratelimit import AdaptiveConcurrency, RateLimiter, TokenBucket
+from .retry import CircuitBreaker, CircuitOpenError, RetryPolicy, attempt_timeout
+from .sessions import SessionManager
+from .singleflight import SingleFlight
+from .stream import load_streamed
+from .upload import FormBody, Upload, encode_form, is_large
+
 
 class EtherpadLiteClient:
     """Client to talk to EtherpadLite API."""
@@ -18,46 +36,208 @@ class EtherpadLiteClient:
     CODE_INVALID_API_KEY = 4
     TIMEOUT = 20
 
+    # API functions without side effects
+    READ_FUNCTIONS = READ_FUNCTIONS
+
     apiKey = ""
     baseUrl = "http://localhost:9001/api"
 
-    def __init__(self, apiKey=None, baseUrl=None, api_version="1.3.0"):
+    def __init__(self, apiKey=None, baseUrl=None, api_version="1.3.0", pooled=True, max_connections=10,
+                 idle_timeout=4, cache=None, single_flight=False, retry=None, circuit_breaker=None,
+                 json_backend=None, rate_limiter=None, concurrency=None, mapper_cache=None):
         if apiKey:
             self.apiKey = apiKey
 
         if baseUrl:
             self.baseUrl = baseUrl
         self.API_STRING = api_version
-        self.API_VERSION = api_version.split(".")
-
-    def call(self, function, params={}):
+        self.API_VERSION = parse_version(api_version)
+
+        # Keep-alive connections are reused across calls; pooled=False opens a new connection per call.
+        self.pool = None
+        if pooled:
+            self.pool = ConnectionPool(self.baseUrl, max_connections, idle_timeout, self.TIMEOUT)
+        self._path = urllib_parse.urlsplit(self.baseUrl).path
+        # Path, url and parameters of every function are worked out once, see py_etherpad.functions.
+        self._specs = compile_specs(self.baseUrl, self._path, api_version)
+        self._headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        self._post_headers = dict(self._headers, apikey=self.apiKey)
+
+        # Responses are decoded straight from bytes, by orjson if installed, see py_etherpad.codec.
+        self._loads = get_loads(json_backend)
+
+        # Optional ResponseCache for hot read calls, see py_etherpad.cache.
+        self.cache = cache
+        # Optional MapperCache for the IDs of group and author mappers, see py_etherpad.mappers.
+        self.mapper_cache = mapper_cache
+        # Identical concurrent reads share one request when single_flight is set.
+        self.flights = SingleFlight(self.READ_FUNCTIONS) if single_flight else None
+        # Optional RetryPolicy and CircuitBreaker for transient failures, see py_etherpad.retry.
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        # Optional RateLimiter and AdaptiveConcurrency to spare the server, see py_etherpad.ratelimit.
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+
+        # Callbacks around every request, see add_hook.
+        self.pre_call_hooks = []
+        self.post_call_hooks = []
+
+        # Chain the enabled layers around _send, innermost first.
+        self._dispatch = self._send
+        for layer in (self.concurrency, self.rate_limiter, self.circuit_breaker, self.retry, self.flights, self.cache,
+                      self.mapper_cache):
+            if layer is not None:
+                self._dispatch = functools.partial(layer.fetch, send=self._dispatch)
+
+    def close(self):
+        """closes the connections of the pool"""
+        if self.pool is not None:
+            self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def call(self, function, params=None):
         """Create a dictionary of all parameters"""
-        url = f"{self.baseUrl}/{self.API_STRING}/{function}"
-        apikey = {"apikey": self.apiKey}
-
-        if "POST" in params.keys():
-            method = "POST"
-            params.update(params.pop("POST"))
-            data = urllib_parse.urlencode(params).encode()
+        return self._dispatch(function, self._params(function, params))
+
+    def _spec(self, function):
+        """returns the FunctionSpec of function, functions unknown to py_etherpad.functions are passed through"""
+        spec = self._specs.get(function)
+        if spec is None:
+            if function in FUNCTIONS:
+                since = ".".join(map(str, FUNCTIONS[function][0]))
+                raise ValueError(f"{function} needs API version {since}, the client uses {self.API_STRING}")
+            spec = self._specs[function] = make_spec(self.baseUrl, self._path, self.API_STRING, function)
+        return spec
+
+    def _params(self, function, params):
+        """returns params without the parameters the API version of the client does not know yet"""
+        dropped = self._spec(function).dropped
+        if params is None:
+            return {}
+        if dropped:
+            return {key: value for key, value in params.items() if key not in dropped}
+        return params
+
+    def call_streamed(self, function, key, params=None):
+        """call returning the list data[key] as iterator which decodes the elements while they are downloaded.
+
+        The request bypasses cache, single flight, retries and hooks. Its
+        connection is busy until the iterator is exhausted or dropped.
+        """
+        method, data = self._encode(self._params(function, params))
+        if self.pool is not None:
+            path, headers = self._route(function, method)
+            response = self.pool.stream("POST", path, data, headers, function in self.READ_FUNCTIONS)
         else:
-            method = "GET"
-            params.update(apikey)
-            data = urllib_parse.urlencode(params, True).encode()
-
+            response = contextlib.closing(self._urlopen(function, method, data))
+        return self.handleResult(load_streamed(response, key))
+
+    def _send(self, function, params):
+        """send the call to the server and return the data of the result"""
+        method, data = self._encode(params)
+        if self.pre_call_hooks or self.post_call_hooks:
+            return self._observe(function, method, data)
+        return self._decode(self._transfer(function, method, data)[1])
+
+    def _transfer(self, function, method, data):
+        """returns status and body of the response"""
+        timeout = attempt_timeout(self.TIMEOUT)
+        if self.pool is not None:
+            path, headers = self._route(function, method)
+            return self.pool.request("POST", path, data, headers, function in self.READ_FUNCTIONS, timeout)
+        return self._open(function, method, data, timeout)
+
+    def _observe(self, function, method, data):
+        """_send with the call hooks around it"""
+        start = self._before_hooks(function, data)
+        status = response = error = None
         try:
-            opener = build_opener.build_opener()
-            if method == "POST":
-                request = urllib_request.Request(url=url, headers=apikey, method=method)
-                response = opener.open(request, data=data, timeout=self.TIMEOUT)
-            else:
-                request = urllib_request.Request(url=url, data=data)
-                response = opener.open(request, timeout=self.TIMEOUT)
-            result = response.read().decode("utf-8")
-            response.close()
-        except urllib_error.HTTPError:
+            status, response = self._transfer(function, method, data)
+            return self._decode(response)
+        except Exception as e:
+            error = e
             raise
-
-        result = json.loads(result)
+        finally:
+            self._after_hooks(function, data, start, status, response, error)
+
+    def _before_hooks(self, function, data):
+        """calls the pre call hooks, returns the start time of the request"""
+        for hook in self.pre_call_hooks:
+            hook(function, self._payload_size(data))
+        return time.perf_counter()
+
+    def _after_hooks(self, function, data, start, status, response, error):
+        """calls the post call hooks with the CallEvent of a request, status comes from an HTTPError if there is one"""
+        if isinstance(error, urllib_error.HTTPError):
+            status = error.code
+        event = CallEvent(function, self._payload_size(data), len(response or b""), status,
+                          time.perf_counter() - start, error)
+        for hook in self.post_call_hooks:
+            hook(event)
+
+    @staticmethod
+    def _payload_size(data):
+        """bytes of an encoded body; of a streamed FormBody only the bytes sent so far"""
+        return data.sent if isinstance(data, FormBody) else len(data)
+
+    def add_hook(self, pre=None, post=None):
+        """registers callbacks around every request: pre(function, payload_bytes) and post(CallEvent).
+
+        payload_bytes of a streamed upload is 0 before it is sent.
+        """
+        if pre is not None:
+            self.pre_call_hooks.append(pre)
+        if post is not None:
+            self.post_call_hooks.append(post)
+
+    def _encode(self, params):
+        """urlencode the parameters, the apikey travels as header when the parameters are POSTed"""
+        post = params.get("POST")
+        if post is not None:
+            method = "POST"
+            fields = {key: value for key, value in params.items() if key != "POST"}
+            fields.update(post)
+            doseq = False
+        else:
+            method = "GET"
+            fields = dict(params, apikey=self.apiKey)
+            doseq = True
+        # POSTed Uploads are encoded while they are sent, see py_etherpad.upload.
+        if post is not None and any(isinstance(value, Upload) for value in post.values()):
+            return method, FormBody(fields, doseq)
+        return method, encode_form(fields, doseq).encode()
+
+    def _route(self, function, method):
+        """returns path and headers of a pooled request"""
+        return self._spec(function).path, self._post_headers if method == "POST" else self._headers
+
+    def _open(self, function, method, data, timeout=None):
+        """send the request on a fresh connection"""
+        response = self._urlopen(function, method, data, timeout)
+        result = response.status, response.read()
+        response.close()
+        return result
+
+    def _urlopen(self, function, method, data, timeout=None):
+        """returns the unread response of a request on a fresh connection"""
+        timeout = self.TIMEOUT if timeout is None else timeout
+        url = self._spec(function).url
+        apikey = {"apikey": self.apiKey}
+        opener = build_opener.build_opener()
+        if method == "POST":
+            request = urllib_request.Request(url=url, headers=apikey, method=method)
+            return opener.open(request, data=data, timeout=timeout)
+        request = urllib_request.Request(url=url, data=data)
+        return opener.open(request, timeout=timeout)
+
+    def _decode(self, result):
+        result = self._loads(result)
         if result is None:
             raise ValueError("JSON response could not be decoded")
 
@@ -102,8 +282,10 @@ class EtherpadLiteClient:
         """deletes a group"""
         return self.call("deleteGroup", {"groupID": groupID})
 
-    def listPads(self, groupID):
-        """returns all pads of this group"""
+    def listPads(self, groupID, stream=False):
+        """returns all pads of this group, with stream padIDs is an iterator (see call_streamed)"""
+        if stream:
+            return self.call_streamed("listPads", "padIDs", {"groupID": groupID})
         return self.call("listPads", {"groupID": groupID})
 
     # createGroupPad(groupID, padName, [text], [authorId])
@@ -113,12 +295,13 @@ class EtherpadLiteClient:
         if text:
             params["text"] = text
         if authorID != "":
-            if (self.API_VERSION[0] >= 1) and (self.API_VERSION[1] >= 3):
-                params["authorID"] = authorID
+            params["authorID"] = authorID
         return self.call("createGroupPad", params)
 
-    def listAllGroups(self):
-        """lists all existing groups"""
+    def listAllGroups(self, stream=False):
+        """lists all existing groups, with stream groupIDs is an iterator (see call_streamed)"""
+        if stream:
+            return self.call_streamed("listAllGroups", "groupIDs")
         return self.call("listAllGroups")
 
     # AUTHORS
@@ -186,25 +369,23 @@ class EtherpadLiteClient:
         return self.call("getText", params)
 
     def setText(self, padID, text, authorID=""):
-        """Sets the text of a pad"""
-        if len(text.encode()) > 8192:
-            params = {"padID": padID, "POST": {"text": text}}
+        """Sets the text of a pad, text may also be a file-like object or an iterable of chunks"""
+        if is_large(text):
+            params = {"padID": padID, "POST": {"text": Upload(text)}}
         else:
             params = {"padID": padID, "text": text}
         if authorID != "":
-            if (self.API_VERSION[0] >= 1) and (self.API_VERSION[1] >= 3):
-                params["authorID"] = authorID
+            params["authorID"] = authorID
         return self.call("setText", params)
 
     def appendText(self, padID, text, authorID=""):
-        """Appends text to a pad."""
-        if len(text.encode()) > 8192:
-            params = {"padID": padID, "POST": {"text": text}}
+        """Appends text to a pad, text may also be a file-like object or an iterable of chunks."""
+        if is_large(text):
+            params = {"padID": padID, "POST": {"text": Upload(text)}}
         else:
             params = {"padID": padID, "text": text}
         if authorID != "":
-            if (self.API_VERSION[0] >= 1) and (self.API_VERSION[1] >= 3):
-                params["authorID"] = authorID
+            params["authorID"] = authorID
         return self.call("appendText", params)
 
     def getHtml(self, padID, rev=None):
@@ -215,14 +396,14 @@ class EtherpadLiteClient:
         return self.call("getHTML", params)
 
     def setHtml(self, padID, html, authorID=""):
-        """sets the text of a pad based on HTML, HTML must be well-formed. Malformed HTML will send a warning to the API log."""
-        if len(html.encode()) > 8192:
-            params = {"padID": padID, "POST": {"html": html}}
+        """sets the text of a pad based on HTML, HTML must be well-formed. Malformed HTML will send a warning to the API log.
+        html may also be a file-like object or an iterable of chunks."""
+        if is_large(html):
+            params = {"padID": padID, "POST": {"html": Upload(html)}}
         else:
             params = {"padID": padID, "html": html}
         if authorID != "":
-            if (self.API_VERSION[0] >= 1) and (self.API_VERSION[1] >= 3):
-                params["authorID"] = authorID
+            params["authorID"] = authorID
         return self.call("setHTML", params)
 
     def getAttributePool(self, padID):
@@ -245,18 +426,20 @@ class EtherpadLiteClient:
         """Restores revision from past as new changeset"""
         params = {"padID": padID, "rev": rev}
         if authorID != "":
-            if (self.API_VERSION[0] >= 1) and (self.API_VERSION[1] >= 3):
-                params["authorID"] = authorID
+            params["authorID"] = authorID
         return self.call("restoreRevision", params)
 
     # CHAT
 
-    def getChatHistory(self, padID, start=None, end=None):
-        """returns a part of the chat history, when start and end are given or the whole chat histroy, when no extra parameters are given"""
+    def getChatHistory(self, padID, start=None, end=None, stream=False):
+        """returns a part of the chat history, when start and end are given or the whole chat histroy, when no extra parameters are given.
+        With stream messages is an iterator (see call_streamed)."""
         params = {"padID": padID}
         if start is not None and end is not None:
             params["start"] = start
             params["end"] = end
+        if stream:
+            return self.call_streamed("getChatHistory", "messages", params)
         return self.call("getChatHistory", params)
 
     def getChatHead(self, padID):
@@ -281,8 +464,7 @@ class EtherpadLiteClient:
         if text:
             params["text"] = text
         if authorID != "":
-            if (self.API_VERSION[0] >= 1) and (self.API_VERSION[1] >= 3):
-                params["authorID"] = authorID
+            params["authorID"] = authorID
         return self.call("createPad", params)
 
     def getRevisionsCount(self, padID):
@@ -327,8 +509,7 @@ class EtherpadLiteClient:
         """
         params = {"sourceID": sourceID, "destinationID": destinationID, "force": force}
         if authorID != "":
-            if (self.API_VERSION[0] >= 1) and (self.API_VERSION[1] >= 3):
-                params["authorID"] = authorID
+            params["authorID"] = authorID
         return self.call("copyPadWithoutHistory", params)
 
     def movePad(self, sourceID, destinationID, force=False):
@@ -379,8 +560,10 @@ class EtherpadLiteClient:
 
     # PADS
 
-    def listAllPads(self):
-        """lists all pads on this epl instance"""
+    def listAllPads(self, stream=False):
+        """lists all pads on this epl instance, with stream padIDs is an iterator (see call_streamed)"""
+        if stream:
+            return self.call_streamed("listAllPads", "padIDs")
         return self.call("listAllPads")
 
     # GLOBAL
@@ -388,3 +571,39 @@ class EtherpadLiteClient:
     def getStats(self):
         """get stats of the etherpad instance"""
         return self.call("getStats")
+
+    # BATCH
+    # Run one client method for many inputs concurrently. Items of params are passed as keyword arguments (dict), as
+    # positional arguments (tuple) or as the single argument (anything else).
+
+    def map(self, method, params, max_workers=8):
+        """calls method for every item of params, returns a list of BatchResults in input order"""
+        return list(imap(self, method, params, max_workers))
+
+    def imap(self, method, params, max_workers=8, ordered=True):
+        """like map, but yields the BatchResults as they complete (in input order unless ordered is false)"""
+        return imap(self, method, params, max_workers, ordered)
+
+    def batch(self, max_workers=8):
+        """returns a Batch, e.g. client.batch().getText(padIDs)"""
+        return Batch(self, max_workers)
+
+    # HISTORY
+
+    def iter_revisions(self, padID, start=0, end=None, prefetch=8):
+        """yields (rev, changeset) for the revisions start to end (default: head) in order, prefetching concurrently"""
+        return iter_revisions(self, padID, start, end, prefetch)
+
+    def export_revisions(self, padID, path, start=0, end=None, prefetch=8, checkpoint_every=1000):
+        """writes the revisions of a pad to a (.gz) newline-delimited JSON file, resuming from its checkpoint"""
+        return export_revisions(self, padID, path, start, end, prefetch, checkpoint_every)
+
+    # CHAT PAGING
+
+    def iter_chat(self, padID, page_size=100, start=0, end=None, prefetch=2):
+        """yields (index, message) for the chat messages start to end (default: chat head), page_size per request"""
+        return iter_chat(self, padID, page_size, start, end, prefetch)
+
+    def chat_since(self, padID, index, page_size=100):
+        """returns the (index, message) pairs of the chat messages after index, for polling"""
+        return chat_since(self, padID, index, page_size)
@@ -0,0 +1,273 @@
+"""Module to talk to EtherpadLite API from asyncio code."""
+
+import asyncio
+import http.client
+import io
+import ssl
+import time
+import urllib.error as urllib_error
+import urllib.parse as urllib_parse
+
+from py_etherpad import EtherpadLiteClient
+from py_etherpad.batch import aimap
+from py_etherpad.chat import achat_since, aiter_chat
+from py_etherpad.history import aexport_revisions, aiter_revisions
+
+
+class AsyncConnectionPool:
+    """Pool of persistent HTTP/1.1 connections driven by asyncio streams.
+
+    Mirrors py_etherpad.pool.ConnectionPool: LIFO reuse, idle eviction (also
+    of connections the server has closed) and at most max_connections open
+    sockets. Waiting for a free connection does not
+    block the event loop, so thousands of calls can be in flight at once.
+    """
+
+    def __init__(self, baseUrl, max_connections=100, idle_timeout=4, timeout=20):
+        parts = urllib_parse.urlsplit(baseUrl)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"unsupported URL scheme: {parts.scheme!r}")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self.connections_created = 0
+        self.requests = 0
+
+        self._idle = []  # (reader, writer, last used), oldest first
+        self._open = 0
+        self._closed = False
+        self._cond = None
+
+    def _condition(self):
+        # Created lazily so the pool binds to the loop it is first used in.
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    def _evict(self, now):
+        while self._idle and now - self._idle[0][2] > self.idle_timeout:
+            self._idle.pop(0)[1].close()
+            self._open -= 1
+
+    async def _checkout(self):
+        """returns a (reader, writer, reused) tuple"""
+        cond = self._condition()
+        async with cond:
+            while True:
+                if self._closed:
+                    raise ValueError("connection pool is closed")
+                self._evict(time.monotonic())
+                while self._idle:
+                    reader, writer, _ = self._idle.pop()
+                    if not (reader.at_eof() or writer.is_closing()):
+                        return reader, writer, True
+                    # The server closed the connection while it was idle.
+                    writer.close()
+                    self._open -= 1
+                if self._open < self.max_connections:
+                    self._open += 1
+                    self.connections_created += 1
+                    break
+                await cond.wait()
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        except BaseException:
+            await self._release(None, None, False)
+            raise
+        return reader, writer, False
+
+    async def _release(self, reader, writer, reusable):
+        cond = self._condition()
+        async with cond:
+            if reusable and not self._closed:
+                self._idle.append((reader, writer, time.monotonic()))
+            else:
+                if writer is not None:
+                    writer.close()
+                self._open -= 1
+            cond.notify()
+
+    async def _write(self, writer, method, path, body, headers):
+        """writes one request"""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if body is None or isinstance(body, bytes):
+            lines.append(f"Content-Length: {len(body or b'')}")
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        else:
+            # An iterable body is sent chunked, one chunk written and drained at a time.
+            lines.append("Transfer-Encoding: chunked")
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+            for chunk in body:
+                if chunk:
+                    writer.write(b"%X\r\n%s\r\n" % (len(chunk), chunk))
+                    await writer.drain()
+            writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _read(self, reader):
+        """reads one response, returns (status, reason, headers, body, keep_alive)"""
+        status_line = await reader.readline()
+        if not status_line:
+            raise http.client.RemoteDisconnected("Remote end closed connection without response")
+        version, status, reason = (status_line.decode("latin-1").rstrip("\r\n").split(" ", 2) + [""])[:3]
+        message = http.client.HTTPMessage()
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            message[name.strip()] = value.strip()
+
+        keep_alive = version == "HTTP/1.1" and (message.get("Connection") or "").lower() != "close"
+        if (message.get("Transfer-Encoding") or "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";", 1)[0], 16)
+                if not size:
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            data = b"".join(chunks)
+        elif message.get("Content-Length") is not None:
+            data = await reader.readexactly(int(message["Content-Length"]))
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return int(status), reason, message, data, keep_alive
+
+    async def request(self, method, path, body=None, headers=None, idempotent=False):
+        """sends a request and returns the (status, body) of the response.
+
+        Resends and error statuses work like for the blocking ConnectionPool.
+        """
+        headers = headers or {}
+        while True:
+            reader, writer, reused = await self._checkout()
+            sent = False
+
+            async def exchange():
+                nonlocal sent
+                await self._write(writer, method, path, body, headers)
+                sent = True
+                return await self._read(reader)
+
+            try:
+                status, reason, message, data, keep_alive = await asyncio.wait_for(exchange(), self.timeout)
+            except (http.client.RemoteDisconnected, asyncio.IncompleteReadError, ConnectionResetError,
+                    BrokenPipeError):
+                await self._release(reader, writer, False)
+                # The server closed a keep-alive connection while it was idle. A
+                # request which was sent may have been processed, only one
+                # which is safe to repeat is sent again.
+                if reused and (not sent or idempotent):
+                    continue
+                raise
+            except BaseException:
+                await self._release(reader, writer, False)
+                raise
+            await self._release(reader, writer, keep_alive)
+            self.requests += 1
+            break
+
+        if status >= 400:
+            raise urllib_error.HTTPError(self.origin + path, status, reason, message, io.BytesIO(data))
+        return status, data
+
+    async def close(self):
+        """closes all idle connections, busy connections are closed when returned"""
+        cond = self._condition()
+        async with cond:
+            self._closed = True
+            while self._idle:
+                self._idle.pop()[1].close()
+                self._open -= 1
+            cond.notify_all()
+
+
+class AsyncEtherpadLiteClient(EtherpadLiteClient):
+    """Client to talk to EtherpadLite API without blocking the event loop.
+
+    Offers the API methods of EtherpadLiteClient, each returning an awaitable:
+
+        async with AsyncEtherpadLiteClient(apiKey, baseUrl) as client:
+            text = await client.getText("padID")
+
+    The optional layers of the blocking client (cache, single_flight, retry,
+    circuit_breaker, rate_limiter, concurrency and mapper_cache) block while
+    they wait and are not supported; hooks are.
+    """
+
+    def __init__(self, apiKey=None, baseUrl=None, api_version="1.3.0", max_connections=100, idle_timeout=4,
+                 json_backend=None):
+        super().__init__(apiKey, baseUrl, api_version, pooled=False, json_backend=json_backend)
+        self.pool = AsyncConnectionPool(self.baseUrl, max_connections, idle_timeout, self.TIMEOUT)
+
+    async def call(self, function, params=None):
+        """Create a dictionary of all parameters"""
+        method, data = self._encode(self._params(function, params))
+        path, headers = self._route(function, method)
+        idempotent = function in self.READ_FUNCTIONS
+        if not (self.pre_call_hooks or self.post_call_hooks):
+            return self._decode((await self.pool.request("POST", path, data, headers, idempotent))[1])
+
+        start = self._before_hooks(function, data)
+        status = response = error = None
+        try:
+            status, response = await self.pool.request("POST", path, data, headers, idempotent)
+            return self._decode(response)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._after_hooks(function, data, start, status, response, error)
+
+    async def call_streamed(self, function, key, params=None):
+        """call returning data[key] as iterator, the async client decodes the whole response first"""
+        data = await self.call(function, dict(params or {}))
+        data[key] = iter(data[key])
+        return data
+
+    async def close(self):
+        """closes the connections of the pool"""
+        await self.pool.close()
+
+    async def map(self, method, params, max_workers=8):
+        """awaits method for every item of params, returns a list of BatchResults in input order"""
+        return [result async for result in aimap(self, method, params, max_workers)]
+
+    def imap(self, method, params, max_workers=8, ordered=True):
+        """async iterator over the BatchResults of map, in input order unless ordered is false"""
+        return aimap(self, method, params, max_workers, ordered)
+
+    def iter_revisions(self, padID, start=0, end=None, prefetch=8):
+        """async iterator over (rev, changeset) for the revisions start to end (default: head), prefetching"""
+        return aiter_revisions(self, padID, start, end, prefetch)
+
+    async def export_revisions(self, padID, path, start=0, end=None, prefetch=8, checkpoint_every=1000):
+        """writes the revisions of a pad to a (.gz) newline-delimited JSON file, resuming from its checkpoint"""
+        return await aexport_revisions(self, padID, path, start, end, prefetch, checkpoint_every)
+
+    def iter_chat(self, padID, page_size=100, start=0, end=None, prefetch=2):
+        """async iterator over (index, message) for the chat messages start to end (default: chat head)"""
+        return aiter_chat(self, padID, page_size, start, end, prefetch)
+
+    async def chat_since(self, padID, index, page_size=100):
+        """returns the (index, message) pairs of the chat messages after index, for polling"""
+        return await achat_since(self, padID, index, page_size)
+
+    def __enter__(self):
+        raise TypeError("AsyncEtherpadLiteClient closes its pool asynchronously, use 'async with'")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,189 @@
+"""Who wrote what: the author of every character of a pad, built from its changesets."""
+
+import array
+import threading
+
+from .changeset import AttributePool, Changeset, ChangesetError
+from .history import iter_revisions
+
+
+class AuthorNames:
+    """Cache of getAuthorName, the names of unknown authors are asked for concurrently in one batch."""
+
+    def __init__(self, client, max_workers=8):
+        self.client = client
+        self.max_workers = max_workers
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def get(self, authorIDs):
+        """returns {authorID: name}, None for authors without a name, unknown to the server or failing to load.
+
+        Only the answers of the server are kept, authors whose request failed
+        otherwise are asked for again by the next get.
+        """
+        with self._lock:
+            missing = [authorID for authorID in dict.fromkeys(authorIDs) if authorID not in self._names]
+        names = {}
+        for result in self.client.imap("getAuthorName", missing, self.max_workers):
+            if result.ok:
+                names[result.args] = result.value
+            elif isinstance(result.error, ValueError):
+                # The author does not exist.
+                names[result.args] = None
+        with self._lock:
+            self._names.update(names)
+            return {authorID: self._names.get(authorID) for authorID in authorIDs}
+
+
+class Authorship:
+    """The author of every character of a pad and per-author counters, updated revision by revision.
+
+    The text is kept as runs of characters by the same author in two arrays,
+    run lengths and author numbers (0 is no author), so memory follows the
+    number of runs rather than the length of the pad. Per author number the
+    arrays chars, inserted and removed count the characters the author owns
+    now, has ever inserted and has lost to deletions. update() applies only
+    the revisions added since the last update.
+    """
+
+    def __init__(self, client, padID, prefetch=8, names=None):
+        self.client = client
+        self.padID = padID
+        self.prefetch = prefetch
+        self.names = names or AuthorNames(client)
+        self.rev = -1
+        self.authorIDs = [""]
+        self.lengths = array.array("L", [1])  # the text before revision 0 is "\n"
+        self.authors = array.array("L", [0])
+        self.chars = array.array("q", [1])
+        self.inserted = array.array("q", [0])
+        self.removed = array.array("q", [0])
+        self._numbers = {"": 0}
+        self._by_attribs = {}  # attribute string -> author number, None if it names no author
+        self._pool = AttributePool()
+
+    def __len__(self):
+        return sum(self.lengths)
+
+    def _number(self, authorID):
+        number = self._numbers.get(authorID)
+        if number is None:
+            number = self._numbers[authorID] = len(self.authorIDs)
+            self.authorIDs.append(authorID)
+            for counter in (self.chars, self.inserted, self.removed):
+                counter.append(0)
+        return number
+
+    def _author(self, attribs):
+        """returns the author number set by an op's attributes, None if they do not touch the author"""
+        if not attribs:
+            return None
+        try:
+            return self._by_attribs[attribs]
+        except KeyError:
+            pass
+        try:
+            resolved = self._pool.resolve(attribs)
+        except ChangesetError:
+            # The attribute is newer than the pool, which only grows.
+            self._pool = AttributePool.from_api(self.client.getAttributePool(self.padID))
+            resolved = self._pool.resolve(attribs)
+        number = None
+        for key, value in resolved:
+            if key == "author":
+                number = self._number(value)
+        self._by_attribs[attribs] = number
+        return number
+
+    def update(self):
+        """applies the revisions added since the last update, returns how many there were"""
+        head = self.client.getRevisionsCount(self.padID)["revisions"]
+        applied = 0
+        for rev, changeset in iter_revisions(self.client, self.padID, self.rev + 1, head, self.prefetch):
+            self.apply(changeset)
+            self.rev = rev
+            applied += 1
+        return applied
+
+    def apply(self, changeset):
+        """applies one changeset (a Changeset or its packed string) to the runs and counters"""
+        if isinstance(changeset, str):
+            changeset = Changeset.unpack(changeset)
+        old_lengths, old_authors = self.lengths, self.authors
+        if changeset.old_len != sum(old_lengths):
+            raise ChangesetError(f"changeset expects a text of length {changeset.old_len}, got {sum(old_lengths)}")
+        lengths = array.array("L")
+        authors = array.array("L")
+        chars, inserted, removed = self.chars, self.inserted, self.removed
+        run = -1
+        left = 0  # characters of old run not consumed yet
+
+        def push(count, author):
+            if authors and authors[-1] == author:
+                lengths[-1] += count
+            else:
+                lengths.append(count)
+                authors.append(author)
+
+        def take(count, assign, delete):
+            nonlocal run, left
+            while count:
+                if not left:
+                    run += 1
+                    if run >= len(old_lengths):
+                        raise ChangesetError("changeset operations exceed the text")
+                    left = old_lengths[run]
+                part = min(count, left)
+                author = old_authors[run]
+                if delete:
+                    chars[author] -= part
+                    removed[author] += part
+                elif assign is None or assign == author:
+                    push(part, author)
+                else:
+                    chars[author] -= part
+                    chars[assign] += part
+                    push(part, assign)
+                left -= part
+                count -= part
+
+        consumed = 0
+        for opcode, count, _, attribs in changeset.ops:
+            author = self._author(attribs)
+            if opcode == "+":
+                author = author or 0
+                chars[author] += count
+                inserted[author] += count
+                push(count, author)
+            else:
+                take(count, author, opcode == "-")
+                consumed += count
+        take(changeset.old_len - consumed, None, False)
+        self.lengths, self.authors = lengths, authors
+
+    def runs(self):
+        """yields (start, end, authorID) for the runs of characters by the same author, "" for no author"""
+        start = 0
+        for length, author in zip(self.lengths, self.authors):
+            yield start, start + length, self.authorIDs[author]
+            start += length
+
+    def author_at(self, pos):
+        """returns the authorID of the character at pos"""
+        for start, end, authorID in self.runs():
+            if pos < end:
+                return authorID
+        raise IndexError("position outside of the text")
+
+    def report(self):
+        """returns a row per author with name, chars owned, share of the text, inserted and removed chars, largest first"""
+        total = len(self)
+        authorIDs = self.authorIDs[1:]
+        names = self.names.get(authorIDs)
+        rows = [{"authorID": authorID, "name": names[authorID], "chars": self.chars[number],
+                 "share": self.chars[number] / total, "inserted": self.inserted[number],
+                 "removed": self.removed[number]}
+                for number, authorID in enumerate(authorIDs, 1)]
+        rows.sort(key=lambda row: row["chars"], reverse=True)
+        return rows
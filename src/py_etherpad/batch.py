@@ -0,0 +1,114 @@
+"""Run many EtherpadLite API calls concurrently with bounded parallelism."""
+
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+
+
+class BatchResult(collections.namedtuple("BatchResult", "index args value error")):
+    """Outcome of one call of a batch. error holds the raised exception, value is None then."""
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _invoke(func, args):
+    """dicts are passed as keyword arguments, tuples as positional arguments, anything else as the only argument"""
+    if isinstance(args, dict):
+        return func(**args)
+    if isinstance(args, tuple):
+        return func(*args)
+    return func(args)
+
+
+def _call(index, func, args):
+    try:
+        return BatchResult(index, args, _invoke(func, args), None)
+    except Exception as e:
+        return BatchResult(index, args, None, e)
+
+
+def imap(client, method, params, max_workers=8, ordered=True):
+    """yields a BatchResult per item of params, in input order or as soon as each call completes.
+
+    params is consumed lazily: at most twice max_workers calls are queued or
+    waiting for an earlier result at any time, so memory stays bounded.
+    method is the name of a client method or any callable.
+    """
+    func = method if callable(method) else getattr(client, method)
+    items = enumerate(params)
+    done = {}
+    next_index = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        pending = {executor.submit(_call, i, func, args) for i, args in itertools.islice(items, 2 * max_workers)}
+        while pending:
+            finished, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                if not ordered:
+                    yield result
+                else:
+                    done[result.index] = result
+            while next_index in done:
+                yield done.pop(next_index)
+                next_index += 1
+            room = 2 * max_workers - len(pending) - len(done)
+            pending.update(executor.submit(_call, i, func, args) for i, args in itertools.islice(items, room))
+
+
+async def aimap(client, method, params, max_workers=8, ordered=True):
+    """asyncio counterpart of imap for AsyncEtherpadLiteClient, max_workers bounds the calls in flight"""
+    func = getattr(client, method)
+
+    async def run(index, args):
+        try:
+            return BatchResult(index, args, await _invoke(func, args), None)
+        except Exception as e:
+            return BatchResult(index, args, None, e)
+
+    items = enumerate(params)
+    done = {}
+    next_index = 0
+    pending = {asyncio.ensure_future(run(i, args)) for i, args in itertools.islice(items, max_workers)}
+    try:
+        while pending:
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                result = task.result()
+                if not ordered:
+                    yield result
+                else:
+                    done[result.index] = result
+            while next_index in done:
+                yield done.pop(next_index)
+                next_index += 1
+            room = max_workers - len(pending) - len(done)
+            pending.update(asyncio.ensure_future(run(i, args)) for i, args in itertools.islice(items, room))
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class Batch:
+    """Calls a client method once per item, e.g. client.batch().getText(padIDs).
+
+    Every method returns the list of BatchResults in input order; errors are
+    reported per item instead of aborting the batch.
+    """
+
+    def __init__(self, client, max_workers=8):
+        self.client = client
+        self.max_workers = max_workers
+
+    def __getattr__(self, method):
+        if method.startswith("_") or not callable(getattr(self.client, method, None)):
+            raise AttributeError(method)
+
+        def run(params):
+            return self.client.map(method, params, self.max_workers)
+
+        return run
@@ -0,0 +1,116 @@
+"""Read-through cache for EtherpadLite API responses."""
+
+import collections
+import threading
+import time
+
+
+class ResponseCache:
+    """LRU cache of API responses with per-function time to live.
+
+    Only functions listed in ttls are cached. Calls passing an explicit rev
+    read an immutable historical revision and never expire. Mutating calls
+    made through the same client drop every cached response of the pads they
+    touch. Cached results are shared between callers and must not be modified.
+    """
+
+    DEFAULT_TTLS = {
+        "getText": 2,
+        "getHTML": 2,
+        "getReadOnlyID": 3600,
+        "getPublicStatus": 10,
+        "listAuthorsOfPad": 10,
+    }
+
+    # mutating function -> parameters naming the pads it changes
+    INVALIDATES = {
+        "setText": ("padID",),
+        "appendText": ("padID",),
+        "setHTML": ("padID",),
+        "restoreRevision": ("padID",),
+        "deletePad": ("padID",),
+        "movePad": ("sourceID", "destinationID"),
+        "copyPad": ("destinationID",),
+        "copyPadWithoutHistory": ("destinationID",),
+        "setPublicStatus": ("padID",),
+    }
+
+    def __init__(self, ttls=None, maxsize=1024, clock=time.monotonic):
+        self.ttls = dict(self.DEFAULT_TTLS if ttls is None else ttls)
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()  # key -> (expires, value)
+        self._pads = collections.defaultdict(set)  # padID -> keys
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, function, params, send):
+        """returns the cached response of function or calls send(function, params) and caches its result"""
+        if function in self.INVALIDATES:
+            padIDs = [params[name] for name in self.INVALIDATES[function] if name in params]
+            try:
+                return send(function, params)
+            finally:
+                for padID in padIDs:
+                    self.invalidate(padID)
+        if function not in self.ttls:
+            return send(function, params)
+
+        key = (function, tuple(sorted((k, v) for k, v in params.items() if k != "POST")))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > self.clock()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        ttl = None if params.get("rev") is not None else self.ttls[function]
+        padID = params.get("padID")
+        value = send(function, params)
+        with self._lock:
+            # A pad was changed while the call was in flight, the value may predate the change.
+            if generation != self._generation:
+                return value
+            self._entries[key] = (None if ttl is None else self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            if padID is not None:
+                self._pads[padID].add(key)
+            while len(self._entries) > self.maxsize:
+                old_key, _ = self._entries.popitem(last=False)
+                self._unindex(old_key)
+        return value
+
+    def _unindex(self, key):
+        padID = dict(key[1]).get("padID")
+        keys = self._pads.get(padID)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._pads[padID]
+
+    def invalidate(self, padID):
+        """drops all cached responses of a pad"""
+        with self._lock:
+            self._generation += 1
+            for key in self._pads.pop(padID, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        """drops all cached responses"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._pads.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """returns hit and miss counters"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
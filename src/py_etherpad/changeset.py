@@ -0,0 +1,320 @@
+"""Parse, apply and compose Etherpad Easysync changesets, e.g. from getRevisionChangeset.
+
+A packed changeset looks like ``Z:c>6|1=6*0+6$brave ``: the length of the
+old text, the length difference, the operations and, after ``$``, the char
+bank holding the inserted characters. Every operation is an opcode (``=``
+keep, ``-`` delete, ``+`` insert) with a character count, optionally
+preceded by the number of newlines it spans (``|1``) and attribute numbers
+(``*0``) which resolve through the pad's AttributePool.
+"""
+
+import collections
+import re
+
+_HEADER = re.compile(r"Z:([0-9a-z]+)([><])([0-9a-z]+)")
+_OP = re.compile(r"((?:\*[0-9a-z]+)*)(?:\|([0-9a-z]+))?([-+=])([0-9a-z]+)")
+_ATTRIB = re.compile(r"\*([0-9a-z]+)")
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+class ChangesetError(ValueError):
+    """Raised for malformed changesets or changesets not matching the text."""
+
+
+Op = collections.namedtuple("Op", "opcode chars lines attribs")
+
+
+def base36(number):
+    """formats a non-negative int the way changesets do"""
+    digits = ""
+    while True:
+        number, digit = divmod(number, 36)
+        digits = _DIGITS[digit] + digits
+        if not number:
+            return digits
+
+
+def unpack(changeset):
+    """splits a changeset into (old length, new length, ops, char bank)"""
+    header = _HEADER.match(changeset)
+    if header is None:
+        raise ChangesetError(f"not a changeset: {changeset[:20]!r}")
+    old_len = int(header.group(1), 36)
+    diff = int(header.group(3), 36)
+    new_len = old_len + diff if header.group(2) == ">" else old_len - diff
+    bank = changeset.find("$", header.end())
+    if bank < 0:
+        raise ChangesetError("changeset has no char bank")
+    return old_len, new_len, changeset[header.end():bank], changeset[bank + 1:]
+
+
+def iter_ops(ops):
+    """yields an Op(opcode, chars, lines, attribs) for every operation of an unpacked ops string"""
+    pos = 0
+    end = len(ops)
+    while pos < end:
+        match = _OP.match(ops, pos)
+        if match is None:
+            raise ChangesetError(f"invalid operation at {ops[pos:pos + 20]!r}")
+        pos = match.end()
+        yield Op(match.group(3), int(match.group(4), 36), int(match.group(2) or "0", 36), match.group(1))
+
+
+class _Assembler:
+    """Collects ops, merging neighbours of the same kind the way Etherpad does.
+
+    An op spanning newlines has to end right after a newline, so characters
+    following the last newline of a run are kept in a separate op.
+    """
+
+    def __init__(self):
+        self.ops = []
+        self._kind = None
+        self._chars = self._lines = self._tail = 0
+
+    def push(self, opcode, chars, lines, attribs):
+        if not chars:
+            return
+        if (opcode, attribs) != self._kind:
+            self._flush()
+            self._kind = (opcode, attribs)
+        if lines:
+            self._chars += self._tail + chars
+            self._lines += lines
+            self._tail = 0
+        else:
+            self._tail += chars
+
+    def _flush(self):
+        if self._kind is not None:
+            opcode, attribs = self._kind
+            if self._chars:
+                self.ops.append(Op(opcode, self._chars, self._lines, attribs))
+            if self._tail:
+                self.ops.append(Op(opcode, self._tail, 0, attribs))
+        self._kind = None
+        self._chars = self._lines = self._tail = 0
+
+    def finish(self):
+        self._flush()
+        # Trailing plain keeps are implicit.
+        while self.ops and self.ops[-1].opcode == "=" and not self.ops[-1].attribs:
+            self.ops.pop()
+        return self.ops
+
+
+class Changeset:
+    """An unpacked changeset: lengths, a tuple of Ops and the char bank."""
+
+    __slots__ = ("old_len", "new_len", "ops", "char_bank")
+
+    def __init__(self, old_len, new_len, ops, char_bank=""):
+        self.old_len = old_len
+        self.new_len = new_len
+        self.ops = tuple(ops)
+        self.char_bank = char_bank
+
+    @classmethod
+    def unpack(cls, changeset):
+        """parses a packed changeset string"""
+        old_len, new_len, ops, bank = unpack(changeset)
+        return cls(old_len, new_len, iter_ops(ops), bank)
+
+    def pack(self):
+        """returns the packed changeset string"""
+        diff = self.new_len - self.old_len
+        parts = ["Z:", base36(self.old_len), ">" if diff >= 0 else "<", base36(abs(diff))]
+        for op in self.ops:
+            parts.append(op.attribs)
+            if op.lines:
+                parts.append("|" + base36(op.lines))
+            parts.append(op.opcode + base36(op.chars))
+        parts.append("$")
+        parts.append(self.char_bank)
+        return "".join(parts)
+
+    __str__ = pack
+
+    def __repr__(self):
+        return f"Changeset({self.pack()!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Changeset) and self.pack() == other.pack()
+
+    def __hash__(self):
+        return hash(self.pack())
+
+    def is_identity(self):
+        """true if the changeset leaves text and attributes untouched"""
+        return self.old_len == self.new_len and not self.ops
+
+    def apply(self, text):
+        """returns text with the changeset applied, in time linear to the text length"""
+        if len(text) != self.old_len:
+            raise ChangesetError(f"changeset expects a text of length {self.old_len}, got {len(text)}")
+        pieces = []
+        pos = 0
+        bank_pos = 0
+        bank = self.char_bank
+        for opcode, chars, _, _ in self.ops:
+            if opcode == "=":
+                pieces.append(text[pos:pos + chars])
+                pos += chars
+            elif opcode == "-":
+                pos += chars
+            else:
+                pieces.append(bank[bank_pos:bank_pos + chars])
+                bank_pos += chars
+        if pos > self.old_len or bank_pos > len(bank):
+            raise ChangesetError("changeset operations exceed the text")
+        pieces.append(text[pos:])
+        result = "".join(pieces)
+        if len(result) != self.new_len:
+            raise ChangesetError(f"changeset should produce length {self.new_len}, got {len(result)}")
+        return result
+
+    def compose(self, other, pool=None):
+        """returns the changeset doing self followed by other.
+
+        With a pool, attributes of overlapping ops are merged key by key (other
+        wins); without one, attributes of other replace those of self.
+        """
+        if self.new_len != other.old_len:
+            raise ChangesetError(f"cannot compose, lengths {self.new_len} and {other.old_len} differ")
+        assembler = _Assembler()
+        bank = []
+        a_ops = _explicit(self)
+        b_ops = _explicit(other)
+        a_bank = self.char_bank
+        b_bank = other.char_bank
+        ai = bi = a_bank_pos = b_bank_pos = 0
+
+        while ai < len(a_ops) or bi < len(b_ops):
+            a = a_ops[ai] if ai < len(a_ops) else None
+            b = b_ops[bi] if bi < len(b_ops) else None
+            if a is not None and a[0] == "-":
+                assembler.push("-", a[1], a[2], a[3])
+                ai += 1
+                continue
+            if b is not None and b[0] == "+":
+                assembler.push("+", b[1], b[2], b[3])
+                bank.append(b_bank[b_bank_pos:b_bank_pos + b[1]])
+                b_bank_pos += b[1]
+                bi += 1
+                continue
+            if a is None or b is None:
+                raise ChangesetError("changeset operations exceed the text")
+
+            # Both ops cover characters of the intermediate text; the shorter one carries the line count.
+            chars = min(a[1], b[1])
+            if a[1] < b[1]:
+                lines = a[2]
+            elif b[1] < a[1]:
+                lines = b[2]
+            else:
+                lines = max(a[2], b[2])
+            if b[0] == "=":
+                assembler.push(a[0], chars, lines, _merge(a[3], b[3], pool, keep=a[0] == "="))
+                if a[0] == "+":
+                    bank.append(a_bank[a_bank_pos:a_bank_pos + chars])
+            elif a[0] == "=":
+                assembler.push("-", chars, lines, a[3])
+            if a[0] == "+":
+                a_bank_pos += chars
+
+            for op in (a, b):
+                op[1] -= chars
+                op[2] = max(op[2] - lines, 0)
+            if not a[1]:
+                ai += 1
+            if not b[1]:
+                bi += 1
+
+        return Changeset(self.old_len, other.new_len, assembler.finish(), "".join(bank))
+
+
+def _explicit(changeset):
+    """the ops of a changeset as mutable lists, including the implicit keep of the remaining text"""
+    ops = [list(op) for op in changeset.ops]
+    consumed = sum(op[1] for op in ops if op[0] != "+")
+    if consumed < changeset.old_len:
+        ops.append(["=", changeset.old_len - consumed, 0, ""])
+    return ops
+
+
+def _merge(first, second, pool, keep):
+    if pool is None:
+        return second or first
+    merged = dict(pool.attributes(first))
+    merged.update(pool.attributes(second))
+    if not keep:
+        # Inserted text carries no removed attributes.
+        merged = {key: value for key, value in merged.items() if value}
+    return pool.attribs(merged)
+
+
+class AttributePool:
+    """Maps the attribute numbers of changesets to (key, value) pairs.
+
+    Build it from getAttributePool: AttributePool.from_api(client.getAttributePool(padID)).
+    """
+
+    def __init__(self, numToAttrib=None):
+        self.numToAttrib = {int(num): tuple(attrib) for num, attrib in (numToAttrib or {}).items()}
+        self._attribToNum = {attrib: num for num, attrib in self.numToAttrib.items()}
+        self._resolved = {}
+
+    @classmethod
+    def from_api(cls, data):
+        """builds the pool from the data returned by getAttributePool"""
+        return cls(data["pool"]["numToAttrib"])
+
+    def get(self, num):
+        """returns the (key, value) pair of an attribute number"""
+        return self.numToAttrib[num]
+
+    def put(self, key, value):
+        """returns the number of an attribute, adding it to the pool if needed"""
+        attrib = (key, value)
+        num = self._attribToNum.get(attrib)
+        if num is None:
+            num = self._attribToNum[attrib] = max(self.numToAttrib, default=-1) + 1
+            self.numToAttrib[num] = attrib
+        return num
+
+    def resolve(self, attribs):
+        """returns the (key, value) pairs of an op's attribute string like '*0*3'"""
+        resolved = self._resolved.get(attribs)
+        if resolved is None:
+            try:
+                resolved = tuple(self.numToAttrib[int(num, 36)] for num in _ATTRIB.findall(attribs))
+            except KeyError as e:
+                raise ChangesetError(f"attribute {e.args[0]} is not in the pool") from None
+            self._resolved[attribs] = resolved
+        return resolved
+
+    def attributes(self, attribs):
+        """returns the attributes of an attribute string as a dict"""
+        return dict(self.resolve(attribs))
+
+    def attribs(self, attributes):
+        """returns the attribute string of a dict of attributes"""
+        nums = sorted(self.put(key, value) for key, value in attributes.items())
+        return "".join("*" + base36(num) for num in nums)
+
+
+def apply(changeset, text):
+    """returns text with changeset (a string or Changeset) applied"""
+    if not isinstance(changeset, Changeset):
+        changeset = Changeset.unpack(changeset)
+    return changeset.apply(text)
+
+
+def compose(changesets, pool=None):
+    """composes a sequence of changesets (strings or Changesets) into one Changeset"""
+    result = None
+    for changeset in changesets:
+        if not isinstance(changeset, Changeset):
+            changeset = Changeset.unpack(changeset)
+        result = changeset if result is None else result.compose(changeset, pool)
+    return result
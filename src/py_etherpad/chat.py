@@ -0,0 +1,43 @@
+"""Read the chat history of a pad in pages, e.g. to archive it or to poll for new messages."""
+
+
+def iter_chat(client, padID, page_size=100, start=0, end=None, prefetch=2):
+    """yields (index, message) for the chat messages start to end (default: chat head) in order.
+
+    Every getChatHistory request asks for page_size messages; the next pages
+    are requested concurrently while the caller processes the current one.
+    """
+    if end is None:
+        end = client.getChatHead(padID)["chatHead"]
+    pages = ((padID, first, min(first + page_size - 1, end)) for first in range(start, end + 1, page_size))
+    for result in client.imap("getChatHistory", pages, prefetch):
+        if not result.ok:
+            raise result.error
+        for index, message in enumerate(result.value["messages"], result.args[1]):
+            yield index, message
+
+
+def chat_since(client, padID, index, page_size=100, prefetch=2):
+    """returns the (index, message) pairs of the chat messages after index.
+
+    Pass the last index seen (-1 at first) to poll for new messages; without
+    new messages a poll costs a single getChatHead request.
+    """
+    return list(iter_chat(client, padID, page_size, index + 1, None, prefetch))
+
+
+async def aiter_chat(client, padID, page_size=100, start=0, end=None, prefetch=2):
+    """asyncio counterpart of iter_chat for AsyncEtherpadLiteClient"""
+    if end is None:
+        end = (await client.getChatHead(padID))["chatHead"]
+    pages = ((padID, first, min(first + page_size - 1, end)) for first in range(start, end + 1, page_size))
+    async for result in client.imap("getChatHistory", pages, prefetch):
+        if not result.ok:
+            raise result.error
+        for index, message in enumerate(result.value["messages"], result.args[1]):
+            yield index, message
+
+
+async def achat_since(client, padID, index, page_size=100, prefetch=2):
+    """asyncio counterpart of chat_since for AsyncEtherpadLiteClient"""
+    return [item async for item in aiter_chat(client, padID, page_size, index + 1, None, prefetch)]
@@ -0,0 +1,29 @@
+"""JSON decoding of API responses, with a faster codec when one is installed."""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # optional, pip install pyetherpadlite[fast]
+    orjson = None
+
+
+def _stdlib_loads(data):
+    # json.loads detects the encoding of bytes itself, no decode() beforehand.
+    return json.loads(data)
+
+
+# Codecs which decode a response body from bytes, fastest first.
+BACKENDS = {"json": _stdlib_loads}
+if orjson is not None:
+    BACKENDS = {"orjson": orjson.loads, **BACKENDS}
+
+
+def get_loads(backend=None):
+    """returns the decoding function of backend, by default the fastest installed one"""
+    if backend is None:
+        return next(iter(BACKENDS.values()))
+    try:
+        return BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"JSON backend {backend!r} is not available, installed: {', '.join(BACKENDS)}") from None
@@ -0,0 +1,173 @@
+"""Diffs between any two revisions of a pad, computed locally from memoized changesets."""
+
+import html
+import threading
+
+from .changeset import Changeset
+
+# Snapshot text before revision 0, the changeset of revision 0 applies to it.
+_EMPTY = "\n"
+
+
+class _PadHistory:
+    """what is known about one pad: changesets by rev, texts at checkpoints and composed blocks"""
+
+    __slots__ = ("changesets", "snapshots", "blocks")
+
+    def __init__(self):
+        self.changesets = {}  # rev -> Changeset turning rev - 1 into rev
+        self.snapshots = {}  # rev (a multiple of checkpoint_every) -> text
+        self.blocks = {}  # k -> Changeset turning k * checkpoint_every into (k + 1) * checkpoint_every
+
+
+class RevisionDiffer:
+    """Diffs between revisions of pads without createDiffHtml round trips.
+
+    Every changeset is fetched once per (padID, rev), concurrently, and kept.
+    The text of every checkpoint_every-th revision and the composition of the
+    changesets between two such checkpoints are kept as well, so the text of
+    any revision takes at most checkpoint_every changesets to rebuild and a
+    range composes at most 2 * checkpoint_every changesets plus one block per
+    checkpoint_every revisions. Histories are assumed to be append-only; call
+    forget() after restoreRevision or when a pad was recreated.
+    """
+
+    def __init__(self, client, checkpoint_every=100, max_workers=8):
+        self.client = client
+        self.checkpoint_every = checkpoint_every
+        self.max_workers = max_workers
+        self.fetched = 0
+        self._pads = {}
+        self._lock = threading.Lock()
+
+    def _history(self, padID):
+        with self._lock:
+            history = self._pads.get(padID)
+            if history is None:
+                history = self._pads[padID] = _PadHistory()
+            return history
+
+    def forget(self, padID):
+        """drops everything known about a pad"""
+        with self._lock:
+            self._pads.pop(padID, None)
+
+    def head(self, padID):
+        """returns the head revision of a pad, asking the server"""
+        return self.client.getRevisionsCount(padID)["revisions"]
+
+    def _fetch(self, padID, history, revs):
+        """fetches the changesets of revs which are not known yet"""
+        missing = [(padID, rev) for rev in revs if rev not in history.changesets]
+        for result in self.client.imap("getRevisionChangeset", missing, self.max_workers):
+            if not result.ok:
+                raise result.error
+            history.changesets[result.args[1]] = Changeset.unpack(result.value)
+            self.fetched += 1
+
+    def text(self, padID, rev):
+        """returns the text of a pad at rev, rebuilt from the nearest checkpoint"""
+        history = self._history(padID)
+        every = self.checkpoint_every
+        # Start from the last snapshot at or below rev, the text before revision 0 if there is none.
+        base = max((known for known in history.snapshots if known <= rev), default=-1)
+        self._fetch(padID, history, range(base + 1, rev + 1))
+        text = history.snapshots[base] if base >= 0 else _EMPTY
+        for current in range(base + 1, rev + 1):
+            text = history.changesets[current].apply(text)
+            if current % every == 0:
+                history.snapshots[current] = text
+        return text
+
+    def changeset(self, padID, start, end):
+        """returns the Changeset turning the text at start into the text at end"""
+        if not 0 <= start <= end:
+            raise ValueError("the revisions must satisfy 0 <= start <= end")
+        history = self._history(padID)
+        every = self.checkpoint_every
+        # Whole blocks between checkpoints, single revisions at both ends.
+        plan = []
+        rev = start
+        while rev < end:
+            if rev % every == 0 and rev + every <= end:
+                plan.append((rev // every, range(rev + 1, rev + every + 1)))
+                rev += every
+            else:
+                plan.append((None, range(rev + 1, rev + 2)))
+                rev += 1
+        self._fetch(padID, history, (current for block, revs in plan if block not in history.blocks
+                                     for current in revs))
+        parts = []
+        for block, revs in plan:
+            if block is None:
+                parts.append(history.changesets[revs[0]])
+                continue
+            composed = history.blocks.get(block)
+            if composed is None:
+                composed = history.blocks[block] = _compose(history.changesets[current] for current in revs)
+            parts.append(composed)
+        if not parts:
+            length = len(self.text(padID, start))
+            return Changeset(length, length, ())
+        return _compose(parts)
+
+    def diff(self, padID, start, end=None):
+        """returns the changes from start to end (default: head) as a list of (opcode, text), opcode is =, - or +"""
+        if end is None:
+            end = self.head(padID)
+        changeset = self.changeset(padID, start, end)
+        return segments(changeset, self.text(padID, start))
+
+    def diff_text(self, padID, start, end=None):
+        """returns the text at end with removed text marked [-like this-] and inserted text {+like this+}"""
+        return render_text(self.diff(padID, start, end))
+
+    def diff_html(self, padID, start, end=None):
+        """returns the text at end as HTML, with removed text in <del> and inserted text in <ins>"""
+        return render_html(self.diff(padID, start, end))
+
+
+def _compose(changesets):
+    changesets = iter(changesets)
+    result = next(changesets)
+    for changeset in changesets:
+        result = result.compose(changeset)
+    return result
+
+
+def segments(changeset, text):
+    """returns the changes of a Changeset applied to text as a list of (opcode, text), adjacent ones merged"""
+    if len(text) != changeset.old_len:
+        raise ValueError(f"changeset expects a text of length {changeset.old_len}, got {len(text)}")
+    result = []
+    pos = bank_pos = 0
+
+    def add(opcode, part):
+        if not part:
+            return
+        if result and result[-1][0] == opcode:
+            result[-1] = (opcode, result[-1][1] + part)
+        else:
+            result.append((opcode, part))
+
+    for opcode, chars, _, _ in changeset.ops:
+        if opcode == "+":
+            add("+", changeset.char_bank[bank_pos:bank_pos + chars])
+            bank_pos += chars
+        else:
+            add(opcode, text[pos:pos + chars])
+            pos += chars
+    add("=", text[pos:])
+    return result
+
+
+def render_text(diff):
+    """formats segments with [-removed-] and {+inserted+} markers"""
+    markers = {"=": "%s", "-": "[-%s-]", "+": "{+%s+}"}
+    return "".join(markers[opcode] % part for opcode, part in diff)
+
+
+def render_html(diff):
+    """formats segments as HTML, removed text in <del>, inserted text in <ins> and newlines as <br>"""
+    tags = {"=": "%s", "-": "<del>%s</del>", "+": "<ins>%s</ins>"}
+    return "".join(tags[opcode] % html.escape(part).replace("\n", "<br>") for opcode, part in diff)
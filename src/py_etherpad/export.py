@@ -0,0 +1,115 @@
+"""Export the text and HTML of every pad of an instance with a pool of processes."""
+
+import concurrent.futures
+import os
+import time
+import urllib.parse
+
+from . import EtherpadLiteClient
+from .migrate import list_pads
+
+# format -> (client method, key of its result, file suffix)
+FORMATS = {
+    "txt": ("getText", "text", ".txt"),
+    "html": ("getHtml", "html", ".html"),
+}
+
+# The client of a worker process, created once by _init_worker.
+_client = None
+
+
+def pad_path(directory, padID, fmt):
+    """returns the file a pad is exported to, padIDs are quoted to be safe file names"""
+    return os.path.join(directory, urllib.parse.quote(padID, safe="$.-_") + FORMATS[fmt][2])
+
+
+def _init_worker(apiKey, baseUrl, api_version, options):
+    global _client
+    _client = EtherpadLiteClient(apiKey, baseUrl, api_version, **options)
+
+
+def _export_chunk(padIDs, directory, formats, threads, transform):
+    """exports padIDs from a worker process, returns its counters"""
+    def export(padID):
+        written = 0
+        for fmt in formats:
+            method, key, _ = FORMATS[fmt]
+            content = getattr(_client, method)(padID)[key]
+            if transform is not None:
+                content = transform(padID, fmt, content)
+            data = content.encode()
+            with open(pad_path(directory, padID, fmt), "wb") as f:
+                f.write(data)
+            written += len(data)
+        return written
+
+    stats = {"pads": 0, "bytes": 0, "failed": {}}
+    for result in _client.imap(export, padIDs, threads, ordered=False):
+        if result.ok:
+            stats["pads"] += 1
+            stats["bytes"] += result.value
+        else:
+            # Exceptions do not always survive pickling, their message does.
+            stats["failed"][result.args] = f"{type(result.error).__name__}: {result.error}"
+    return stats
+
+
+def export_instance(apiKey, baseUrl, directory, padIDs=None, formats=("txt", "html"), processes=None, threads=8,
+                    chunk_size=100, api_version="1.3.0", transform=None, progress=None, **options):
+    """writes every pad (or padIDs) to directory as one file per format, e.g. "pad.txt" and "pad.html".
+
+    The padIDs are listed by listAllPads and handed out in chunks of
+    chunk_size to processes worker processes (by default one per core); each
+    worker has its own EtherpadLiteClient (with options) reusing its
+    connections and fetches threads pads at a time, so decoding and the
+    optional transform(padID, format, content) run in parallel on all cores.
+    transform has to be a module level function to reach the workers.
+
+    progress(stats) is called in the calling process after every chunk.
+    Returns the counters pads, bytes, failed ({padID: error message}),
+    seconds, pads_per_second and bytes_per_second.
+    """
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown format {fmt!r}, use one of {', '.join(FORMATS)}")
+    os.makedirs(directory, exist_ok=True)
+    options.setdefault("max_connections", threads)
+    start = time.monotonic()
+    if padIDs is None:
+        with EtherpadLiteClient(apiKey, baseUrl, api_version, **options) as client:
+            padIDs = list(list_pads(client))
+    processes = processes or os.cpu_count() or 1
+    chunks = (padIDs[i:i + chunk_size] for i in range(0, len(padIDs), chunk_size))
+
+    stats = {"pads": 0, "bytes": 0, "failed": {}}
+    with concurrent.futures.ProcessPoolExecutor(processes, initializer=_init_worker,
+                                                initargs=(apiKey, baseUrl, api_version, options)) as executor:
+        # Two chunks per process keep the workers busy without queueing every padID at once.
+        pending = set()
+        for chunk in chunks:
+            pending.add(executor.submit(_export_chunk, chunk, directory, formats, threads, transform))
+            if len(pending) >= 2 * processes:
+                pending = _collect(pending, stats, start, progress)
+        while pending:
+            pending = _collect(pending, stats, start, progress)
+    _rates(stats, start)
+    return stats
+
+
+def _collect(pending, stats, start, progress):
+    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+    for future in done:
+        result = future.result()
+        stats["pads"] += result["pads"]
+        stats["bytes"] += result["bytes"]
+        stats["failed"].update(result["failed"])
+        if progress is not None:
+            progress(dict(_rates(stats, start)))
+    return pending
+
+
+def _rates(stats, start):
+    stats["seconds"] = seconds = max(time.monotonic() - start, 1e-9)
+    stats["pads_per_second"] = stats["pads"] / seconds
+    stats["bytes_per_second"] = stats["bytes"] / seconds
+    return stats
@@ -0,0 +1,101 @@
+"""Properties of the EtherpadLite API functions."""
+
+import collections
+
+# API functions without side effects
+READ_FUNCTIONS = frozenset({
+    "listPads", "listAllGroups", "listPadsOfAuthor", "getAuthorName", "getSessionInfo", "listSessionsOfGroup",
+    "listSessionsOfAuthor", "getText", "getHTML", "getAttributePool", "getRevisionChangeset", "createDiffHTML",
+    "getChatHistory", "getChatHead", "getRevisionsCount", "getSavedRevisionsCount", "listSavedRevisions",
+    "padUsersCount", "padUsers", "getReadOnlyID", "getPadID", "getPublicStatus", "listAuthorsOfPad",
+    "getLastEdited", "checkToken", "isPasswordProtected", "listAllPads", "getStats",
+})
+
+# Parameters which newer API versions added to existing functions, with the version that added them
+_AUTHOR_ID = {"authorID": (1, 3, 0)}
+
+# API version which introduced each function, and its version dependent parameters
+FUNCTIONS = {
+    # GROUPS
+    "createGroup": ((1, 0, 0), {}),
+    "createGroupIfNotExistsFor": ((1, 0, 0), {}),
+    "deleteGroup": ((1, 0, 0), {}),
+    "listPads": ((1, 0, 0), {}),
+    "createGroupPad": ((1, 0, 0), _AUTHOR_ID),
+    "listAllGroups": ((1, 1, 0), {}),
+    # AUTHORS
+    "createAuthor": ((1, 0, 0), {}),
+    "createAuthorIfNotExistsFor": ((1, 0, 0), {}),
+    "listPadsOfAuthor": ((1, 2, 0), {}),
+    "getAuthorName": ((1, 1, 0), {}),
+    # SESSIONS
+    "createSession": ((1, 0, 0), {}),
+    "deleteSession": ((1, 0, 0), {}),
+    "getSessionInfo": ((1, 0, 0), {}),
+    "listSessionsOfGroup": ((1, 0, 0), {}),
+    "listSessionsOfAuthor": ((1, 0, 0), {}),
+    # PAD CONTENT
+    "getText": ((1, 0, 0), {}),
+    "setText": ((1, 0, 0), _AUTHOR_ID),
+    "appendText": ((1, 2, 13), _AUTHOR_ID),
+    "getHTML": ((1, 0, 0), {}),
+    "setHTML": ((1, 0, 0), _AUTHOR_ID),
+    "getAttributePool": ((1, 2, 8), {}),
+    "getRevisionChangeset": ((1, 2, 8), {}),
+    "createDiffHTML": ((1, 2, 7), {}),
+    "restoreRevision": ((1, 2, 11), _AUTHOR_ID),
+    # CHAT
+    "getChatHistory": ((1, 2, 7), {}),
+    "getChatHead": ((1, 2, 7), {}),
+    "appendChatMessage": ((1, 2, 12), {}),
+    # PAD
+    "createPad": ((1, 0, 0), _AUTHOR_ID),
+    "getRevisionsCount": ((1, 0, 0), {}),
+    "getSavedRevisionsCount": ((1, 2, 11), {}),
+    "listSavedRevisions": ((1, 2, 11), {}),
+    "saveRevision": ((1, 2, 11), {}),
+    "padUsersCount": ((1, 0, 0), {}),
+    "padUsers": ((1, 1, 0), {}),
+    "deletePad": ((1, 0, 0), {}),
+    "copyPad": ((1, 2, 8), {}),
+    "copyPadWithoutHistory": ((1, 2, 15), _AUTHOR_ID),
+    "movePad": ((1, 2, 8), {}),
+    "getReadOnlyID": ((1, 0, 0), {}),
+    "getPadID": ((1, 2, 10), {}),
+    "setPublicStatus": ((1, 0, 0), {}),
+    "getPublicStatus": ((1, 0, 0), {}),
+    "listAuthorsOfPad": ((1, 0, 0), {}),
+    "getLastEdited": ((1, 0, 0), {}),
+    "sendClientsMessage": ((1, 1, 0), {}),
+    "checkToken": ((1, 2, 0), {}),
+    "setPassword": ((1, 0, 0), {}),
+    "isPasswordProtected": ((1, 0, 0), {}),
+    # PADS
+    "listAllPads": ((1, 2, 1), {}),
+    # GLOBAL
+    "getStats": ((1, 2, 14), {}),
+}
+
+FunctionSpec = collections.namedtuple("FunctionSpec", "path url dropped")
+FunctionSpec.__doc__ = """How a client calls an API function: the request path on its host, the full url and the
+parameters its API version does not know yet, which are left out."""
+
+
+def parse_version(api_version):
+    """returns "1.2.15" as (1, 2, 15)"""
+    return tuple(int(part) for part in api_version.split("."))
+
+
+def compile_specs(baseUrl, path, api_version):
+    """returns the FunctionSpecs of all functions the API version api_version offers"""
+    version = parse_version(api_version)
+    specs = {}
+    for function, (since, params) in FUNCTIONS.items():
+        if version >= since:
+            dropped = frozenset(param for param, added in params.items() if version < added)
+            specs[function] = make_spec(baseUrl, path, api_version, function, dropped)
+    return specs
+
+
+def make_spec(baseUrl, path, api_version, function, dropped=frozenset()):
+    return FunctionSpec(f"{path}/{api_version}/{function}", f"{baseUrl}/{api_version}/{function}", dropped)
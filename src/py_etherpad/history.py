@@ -0,0 +1,143 @@
+"""Stream the revision history of a pad, e.g. to archive it."""
+
+import asyncio
+import gzip
+import json
+import os
+
+
+def iter_revisions(client, padID, start=0, end=None, prefetch=8):
+    """yields (rev, changeset) for the revisions start to end (default: head) in order.
+
+    Up to prefetch changesets are requested concurrently ahead of the consumer;
+    nothing else is kept, so memory does not grow with the length of the history.
+    """
+    if end is None:
+        end = client.getRevisionsCount(padID)["revisions"]
+    revisions = ((padID, rev) for rev in range(start, end + 1))
+    for result in client.imap("getRevisionChangeset", revisions, prefetch):
+        if not result.ok:
+            raise result.error
+        yield result.args[1], result.value
+
+
+async def aiter_revisions(client, padID, start=0, end=None, prefetch=8):
+    """asyncio counterpart of iter_revisions for AsyncEtherpadLiteClient"""
+    if end is None:
+        end = (await client.getRevisionsCount(padID))["revisions"]
+    revisions = ((padID, rev) for rev in range(start, end + 1))
+    async for result in client.imap("getRevisionChangeset", revisions, prefetch):
+        if not result.ok:
+            raise result.error
+        yield result.args[1], result.value
+
+
+def _load_checkpoint(path, padID):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    if state.get("padID") != padID:
+        raise ValueError(f"checkpoint {path} belongs to pad {state.get('padID')!r}")
+    return state
+
+
+def _save_checkpoint(path, padID, rev, offset):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"padID": padID, "rev": rev, "offset": offset}, f)
+    os.replace(tmp, path)
+
+
+class _Export:
+    """the file of export_revisions: cut back to its last checkpoint on open, checkpointed while it is written"""
+
+    def __init__(self, padID, path, start, checkpoint_every):
+        self.padID = padID
+        self.checkpoint = path + ".checkpoint"
+        self.checkpoint_every = checkpoint_every
+        self.written = 0
+        self.rev = None
+        state = _load_checkpoint(self.checkpoint, padID)
+        offset = 0
+        self.start = start
+        if state is not None:
+            self.start, offset = state["rev"] + 1, state["offset"]
+        self.raw = open(path, "r+b" if state is not None else "wb")
+        # Drop whatever was written after the last checkpoint.
+        self.raw.truncate(offset)
+        self.raw.seek(offset)
+        self.compress = path.endswith(".gz")
+        self.out = None
+
+    def write(self, rev, changeset):
+        if self.out is None:
+            # Each checkpoint closes a gzip member, so the file can be cut back to it.
+            self.out = gzip.GzipFile(fileobj=self.raw, mode="wb") if self.compress else self.raw
+        self.out.write(json.dumps({"padID": self.padID, "rev": rev, "changeset": changeset}).encode() + b"\n")
+        self.written += 1
+        self.rev = rev
+        if self.written % self.checkpoint_every == 0:
+            self._checkpoint()
+
+    def _checkpoint(self):
+        if self.out is not self.raw:
+            self.out.close()
+        self.out = None
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+        _save_checkpoint(self.checkpoint, self.padID, self.rev, self.raw.tell())
+
+    def close(self, finished):
+        """closes the file, checkpointing the revisions written since the last checkpoint if finished"""
+        try:
+            if finished and self.out is not None:
+                self._checkpoint()
+        finally:
+            self.raw.close()
+
+
+def export_revisions(client, padID, path, start=0, end=None, prefetch=8, checkpoint_every=1000):
+    """writes the revisions of a pad as newline-delimited JSON to path, gzip compressed if it ends with .gz.
+
+    Every line is {"padID": ..., "rev": ..., "changeset": ...}. Progress is
+    recorded in path + ".checkpoint" every checkpoint_every revisions; a later
+    call with the same path continues after the last recorded revision, so an
+    interrupted export resumes and a finished one picks up new revisions.
+    Returns the number of revisions written.
+    """
+    export = _Export(padID, path, start, checkpoint_every)
+    finished = False
+    try:
+        if end is None:
+            end = client.getRevisionsCount(padID)["revisions"]
+        for rev, changeset in iter_revisions(client, padID, export.start, end, prefetch):
+            export.write(rev, changeset)
+        finished = True
+    finally:
+        export.close(finished)
+    return export.written
+
+
+async def aexport_revisions(client, padID, path, start=0, end=None, prefetch=8, checkpoint_every=1000):
+    """asyncio counterpart of export_revisions for AsyncEtherpadLiteClient, the file is written in a worker thread"""
+    export = await asyncio.to_thread(_Export, padID, path, start, checkpoint_every)
+    finished = False
+    try:
+        if end is None:
+            end = (await client.getRevisionsCount(padID))["revisions"]
+        async for rev, changeset in aiter_revisions(client, padID, export.start, end, prefetch):
+            await asyncio.to_thread(export.write, rev, changeset)
+        finished = True
+    finally:
+        await asyncio.to_thread(export.close, finished)
+    return export.written
+
+
+def read_revisions(path):
+    """yields the records of a file written by export_revisions"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        for line in f:
+            yield json.loads(line)
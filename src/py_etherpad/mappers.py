@@ -0,0 +1,124 @@
+"""Cache of the IDs handed out by createGroupIfNotExistsFor and createAuthorIfNotExistsFor."""
+
+import collections
+import sqlite3
+import threading
+
+
+class MapperCache:
+    """LRU cache mapping groupMapper and authorMapper values to Etherpad IDs.
+
+    The mappings never change on the server, so they are kept until
+    deleteGroup removes a group through a client using this cache, or a call
+    about a cached group fails because the group was deleted elsewhere.
+    createAuthorIfNotExistsFor with a name different from the cached one still
+    calls the server, which renames the author.
+
+    With a path the mappings are also stored in an SQLite database, so they
+    survive restarts and are shared by processes using the same file.
+    """
+
+    # function -> (kind of the mapping, mapper parameter, ID key of the result)
+    FUNCTIONS = {
+        "createGroupIfNotExistsFor": ("group", "groupMapper", "groupID"),
+        "createAuthorIfNotExistsFor": ("author", "authorMapper", "authorID"),
+    }
+
+    def __init__(self, maxsize=65536, path=None):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()  # (kind, mapper) -> (ID, name)
+        self._groups = {}  # groupID -> groupMapper
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("CREATE TABLE IF NOT EXISTS mappers "
+                             "(kind TEXT, mapper TEXT, id TEXT, name TEXT, PRIMARY KEY (kind, mapper))")
+
+    def fetch(self, function, params, send):
+        """returns the cached ID of a mapper or calls send(function, params) and caches it"""
+        if function not in self.FUNCTIONS:
+            try:
+                return send(function, params)
+            except ValueError as e:
+                if "groupID" in params and str(e) == "groupID does not exist":
+                    self.invalidate_group(params["groupID"])
+                raise
+            finally:
+                if function == "deleteGroup":
+                    self.invalidate_group(params["groupID"])
+
+        kind, name, id_key = self.FUNCTIONS[function]
+        key = (kind, str(params[name]))
+        author_name = params.get("name") or None
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None and (author_name is None or author_name == entry[1]):
+                self.hits += 1
+                return {id_key: entry[0]}
+            self.misses += 1
+
+        value = send(function, params)
+        with self._lock:
+            self._store(key, value[id_key], author_name or (entry[1] if entry else None))
+        return value
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif self._db is not None:
+            row = self._db.execute("SELECT id, name FROM mappers WHERE kind = ? AND mapper = ?", key).fetchone()
+            if row is not None:
+                entry = tuple(row)
+                self._remember(key, entry)
+        return entry
+
+    def _store(self, key, ID, name):
+        self._remember(key, (ID, name))
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO mappers VALUES (?, ?, ?, ?)", key + (ID, name))
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if key[0] == "group":
+            self._groups[entry[0]] = key[1]
+        while len(self._entries) > self.maxsize:
+            (kind, mapper), (ID, _) = self._entries.popitem(last=False)
+            if kind == "group":
+                self._groups.pop(ID, None)
+
+    def invalidate_group(self, groupID):
+        """forgets the mapper of a group, e.g. after it was deleted by another client"""
+        with self._lock:
+            mapper = self._groups.pop(groupID, None)
+            if mapper is not None:
+                self._entries.pop(("group", mapper), None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM mappers WHERE kind = 'group' AND id = ?", (groupID,))
+
+    def clear(self):
+        """forgets all mappings, also those stored on disk"""
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM mappers")
+
+    def close(self):
+        """closes the database"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """returns hit and miss counters"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
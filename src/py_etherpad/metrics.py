@@ -0,0 +1,127 @@
+"""Per-function latency histograms and counters for EtherpadLite API calls."""
+
+import bisect
+import collections
+import threading
+
+CallEvent = collections.namedtuple("CallEvent", "function payload_bytes response_bytes status duration error")
+CallEvent.__doc__ = """One request as seen by post-call hooks. status is None when no response arrived,
+error the raised exception or None."""
+
+# Upper bounds in seconds, like the default Prometheus client buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _FunctionStats:
+    __slots__ = ("buckets", "count", "sum", "errors", "payload_bytes", "response_bytes", "statuses")
+
+    def __init__(self, size):
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self.payload_bytes = 0
+        self.response_bytes = 0
+        self.statuses = collections.Counter()
+
+
+class MetricsCollector:
+    """Collects a latency histogram and error and byte counters per API function.
+
+    Attach it with collector.install(client); a client without hooks does not
+    pay for instrumentation at all.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def install(self, client):
+        """registers the collector as post-call hook of client"""
+        client.add_hook(post=self.record)
+        return self
+
+    def record(self, event):
+        """accounts one CallEvent"""
+        index = bisect.bisect_left(self.bounds, event.duration)
+        with self._lock:
+            stats = self._stats.get(event.function)
+            if stats is None:
+                stats = self._stats[event.function] = _FunctionStats(len(self.bounds) + 1)
+            stats.buckets[index] += 1
+            stats.count += 1
+            stats.sum += event.duration
+            stats.payload_bytes += event.payload_bytes
+            stats.response_bytes += event.response_bytes
+            if event.error is not None:
+                stats.errors += 1
+            if event.status is not None:
+                stats.statuses[event.status] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def as_dict(self):
+        """returns the metrics per function; buckets are cumulative counts keyed by upper bound"""
+        result = {}
+        with self._lock:
+            for function, stats in sorted(self._stats.items()):
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(self.bounds + (float("inf"),), stats.buckets):
+                    cumulative += count
+                    buckets[bound] = cumulative
+                result[function] = {
+                    "count": stats.count,
+                    "sum": stats.sum,
+                    "errors": stats.errors,
+                    "payload_bytes": stats.payload_bytes,
+                    "response_bytes": stats.response_bytes,
+                    "statuses": dict(stats.statuses),
+                    "buckets": buckets,
+                }
+        return result
+
+    def quantile(self, function, q):
+        """estimates a latency quantile of function from its histogram (upper bound of the bucket)"""
+        with self._lock:
+            stats = self._stats.get(function)
+            if stats is None or not stats.count:
+                return None
+            rank = q * stats.count
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), stats.buckets):
+                cumulative += count
+                if cumulative >= rank:
+                    return bound
+
+    def prometheus(self, prefix="etherpad_client"):
+        """returns the metrics in the Prometheus text exposition format"""
+        metrics = self.as_dict()
+        lines = [
+            f"# HELP {prefix}_request_duration_seconds Latency of Etherpad API requests.",
+            f"# TYPE {prefix}_request_duration_seconds histogram",
+        ]
+        for function, stats in metrics.items():
+            for bound, count in stats["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{function="{function}",le="{le}"}} {count}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{{function="{function}"}} {stats["sum"]!r}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{function="{function}"}} {stats["count"]}')
+        for name, key, help_text in (
+            ("errors_total", "errors", "Failed Etherpad API requests."),
+            ("request_bytes_total", "payload_bytes", "Bytes sent to the Etherpad API."),
+            ("response_bytes_total", "response_bytes", "Bytes received from the Etherpad API."),
+        ):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for function, stats in metrics.items():
+                lines.append(f'{prefix}_{name}{{function="{function}"}} {stats[key]}')
+        lines.append(f"# HELP {prefix}_responses_total Etherpad API responses by HTTP status.")
+        lines.append(f"# TYPE {prefix}_responses_total counter")
+        for function, stats in metrics.items():
+            for status, count in sorted(stats["statuses"].items()):
+                lines.append(f'{prefix}_responses_total{{function="{function}",status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
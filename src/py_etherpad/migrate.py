@@ -0,0 +1,411 @@
+"""Back up, restore and migrate many pads, listing, fetching and writing them concurrently."""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import zlib
+
+from . import EtherpadLiteClient
+
+
+def list_pads(client, groupID=None):
+    """returns an iterator over the padIDs of a group, or of the whole instance, streamed as they are listed.
+
+    The listing keeps one connection of the client busy until it is exhausted,
+    a client shared with the workers needs a connection more than they do.
+    """
+    if groupID is None:
+        return client.listAllPads(stream=True)["padIDs"]
+    return client.listPads(groupID, stream=True)["padIDs"]
+
+
+def fetch_pad(client, padID, html=True):
+    """returns the record of a pad: {"padID": ..., "text": ..., "html": ...}"""
+    record = {"padID": padID, "text": client.getText(padID)["text"]}
+    if html:
+        record["html"] = client.getHtml(padID)["html"]
+    return record
+
+
+def write_pad(client, padID, record, force=False):
+    """creates the pad padID (a group pad if it is named g.xxx$name) with the content of record.
+
+    An existing pad is overwritten if force is true, an error otherwise.
+    """
+    text = "" if "html" in record else record["text"]
+    try:
+        if padID.startswith("g.") and "$" in padID:
+            client.createGroupPad(*padID.split("$", 1), text=text)
+        else:
+            client.createPad(padID, text)
+        created = True
+    except ValueError:
+        if not force:
+            raise
+        created = False
+    if "html" in record:
+        client.setHtml(padID, record["html"])
+    elif not created:
+        client.setText(padID, text)
+
+
+def into_group(groupID):
+    """returns a rename function moving pads into a group, keeping their names"""
+    def rename(padID):
+        return f"{groupID}${padID.split('$', 1)[-1]}"
+    return rename
+
+
+def _finished(path):
+    """returns the padIDs recorded in the checkpoint file of migrate or restore"""
+    try:
+        with open(path) as f:
+            # A line cut off by a crash is not complete, its pad is done again.
+            return {json.loads(line) for line in f if line.endswith("\n")}
+    except FileNotFoundError:
+        return set()
+
+
+class _DoneLog:
+    """appends the padIDs of finished pads to a checkpoint file"""
+
+    def __init__(self, path):
+        self.done = _finished(path) if path is not None else set()
+        self.file = open(path, "a") if path is not None else None
+
+    def add(self, padID):
+        if self.file is not None:
+            self.file.write(json.dumps(padID) + "\n")
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def _run(client, items, task, max_workers, progress, done=frozenset(), log=None, write=None):
+    """runs task(*item) for every item, (padID, ...) tuples, max_workers at a time, returns the report.
+
+    write(value) is called with the results of task in the calling thread.
+    """
+    report = {"done": 0, "skipped": 0, "failed": {}}
+
+    def todo():
+        for item in items:
+            if item[0] in done:
+                report["skipped"] += 1
+            else:
+                yield item
+
+    for result in client.imap(task, todo(), max_workers, ordered=False):
+        padID = result.args[0]
+        if result.ok:
+            if write is not None:
+                write(result.value)
+            report["done"] += 1
+            if log is not None:
+                log.add(padID)
+        else:
+            report["failed"][padID] = result.error
+        if progress is not None:
+            progress(report)
+    return report
+
+
+def migrate(source, destination=None, padIDs=None, groupID=None, rename=None, move=False, html=True, force=False,
+            max_workers=8, checkpoint=None, dry_run=False, progress=None):
+    """copies (or moves) pads to new padIDs given by rename, on the same or on a destination instance.
+
+    padIDs defaults to the pads of groupID, or of the whole instance. On the
+    same instance the pads are copied with their history by copyPad/movePad;
+    to another instance their HTML (or text if html is false) is fetched and
+    written to a new pad. checkpoint names a file recording the finished pads,
+    a later run with the same file skips them. Failed pads are reported and
+    left for the next run.
+
+    Returns {"done": ..., "skipped": ..., "failed": {padID: error}}, with
+    dry_run the list of (padID, new padID) pairs that would be migrated.
+    """
+    rename = rename or (lambda padID: padID)
+    same_instance = destination is None or destination is source
+    if padIDs is None:
+        padIDs = list_pads(source, groupID)
+    if dry_run:
+        done = _finished(checkpoint) if checkpoint is not None else set()
+        return [(padID, rename(padID)) for padID in padIDs if padID not in done]
+
+    def task(padID):
+        target = rename(padID)
+        if same_instance:
+            if target == padID:
+                raise ValueError(f"{padID} would be migrated onto itself")
+            if move:
+                source.movePad(padID, target, force)
+            else:
+                source.copyPad(padID, target, force)
+            return
+        write_pad(destination, target, fetch_pad(source, padID, html), force)
+        if move:
+            source.deletePad(padID)
+
+    log = _DoneLog(checkpoint)
+    try:
+        return _run(source, ((padID,) for padID in padIDs), task, max_workers, progress, log.done, log)
+    finally:
+        log.close()
+
+
+# Closing record of an archive, padded to a fixed size to be found at its end: the offset of the index.
+_POINTER = b'{"index_at": %20d}\n'
+_POINTER_SIZE = len(gzip.compress(_POINTER % 0, 0, mtime=0))
+
+
+def _members(f, end):
+    """yields (offset, data) for the gzip members in the first end bytes of f"""
+    f.seek(0)
+    offset = 0
+    left = end
+    buffered = b""
+    while offset < end:
+        start = offset
+        decompressor = zlib.decompressobj(31)
+        data = []
+        while not decompressor.eof:
+            if not buffered:
+                buffered = f.read(min(65536, left))
+                if not buffered:
+                    raise EOFError("the archive ends within a gzip member")
+                left -= len(buffered)
+            data.append(decompressor.decompress(buffered))
+            offset += len(buffered) - len(decompressor.unused_data)
+            buffered = decompressor.unused_data
+        yield start, b"".join(data)
+
+
+def _entry(record, offset):
+    return {"padID": record["padID"], "size": len(record["text"]), "offset": offset}
+
+
+def _scan(path, offset):
+    """returns the index entries of the pads in the first offset bytes of a backup, up to its checkpoint"""
+    with open(path, "rb") as f:
+        return [_entry(json.loads(data), start) for start, data in _members(f, offset)]
+
+
+def _save_checkpoint(path, offset):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"offset": offset}, f)
+    os.replace(tmp, path)
+
+
+def backup(client, path, padIDs=None, groupID=None, html=True, max_workers=8, checkpoint_every=500, dry_run=False,
+           progress=None):
+    """writes the text and HTML of many pads to the gzip compressed archive path.
+
+    The archive holds one JSON record per line, {"padID": ..., "text": ...,
+    "html": ...}, each in a gzip member of its own, followed by an index
+    record {"index": [{"padID": ..., "size": ..., "offset": ...}, ...]} and a
+    fixed-size pointer to it, so read_index and read_record find a pad without
+    reading the whole archive. padIDs defaults to the pads of groupID, or of
+    the whole instance; up to max_workers pads are fetched while they are
+    being listed and written. Progress is recorded in path + ".checkpoint"
+    every checkpoint_every pads; a later call with the same path keeps the
+    pads written so far and backs up only the others, so an interrupted
+    backup resumes and a finished one picks up new pads.
+
+    Returns {"done": ..., "skipped": ..., "failed": {padID: error}}, with
+    dry_run the list of padIDs that would be backed up.
+    """
+    checkpoint = path + ".checkpoint"
+    try:
+        with open(checkpoint) as f:
+            offset = json.load(f)["offset"]
+    except FileNotFoundError:
+        offset = None
+    if padIDs is None:
+        padIDs = list_pads(client, groupID)
+    if dry_run:
+        done = {entry["padID"] for entry in _scan(path, offset)} if offset else set()
+        return [padID for padID in padIDs if padID not in done]
+
+    with open(path, "r+b" if offset is not None else "wb") as raw:
+        # Drop whatever was written after the last checkpoint, including the index.
+        if offset is not None:
+            raw.truncate(offset)
+        index = _scan(path, offset) if offset else []
+        done = {entry["padID"] for entry in index}
+        raw.seek(0, os.SEEK_END)
+
+        def write(record):
+            index.append(_entry(record, raw.tell()))
+            raw.write(gzip.compress(json.dumps(record).encode() + b"\n", mtime=0))
+            if len(index) % checkpoint_every == 0:
+                _checkpoint(raw, checkpoint)
+
+        def task(padID):
+            return fetch_pad(client, padID, html)
+
+        report = _run(client, ((padID,) for padID in padIDs), task, max_workers, progress, done, write=write)
+        _checkpoint(raw, checkpoint)
+        index_at = raw.tell()
+        raw.write(gzip.compress(json.dumps({"index": index}).encode() + b"\n", mtime=0))
+        raw.write(gzip.compress(_POINTER % index_at, 0, mtime=0))
+    return report
+
+
+def _checkpoint(raw, checkpoint):
+    raw.flush()
+    os.fsync(raw.fileno())
+    _save_checkpoint(checkpoint, raw.tell())
+
+
+def _records(f):
+    for line in f:
+        record = json.loads(line)
+        if "padID" in record:
+            yield record
+
+
+def read_backup(path):
+    """yields the pad records of an archive written by backup"""
+    with gzip.open(path, "rb") as f:
+        yield from _records(f)
+
+
+def read_record(path, offset):
+    """returns the pad record at offset (from the index) of an archive written by backup"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        with gzip.GzipFile(fileobj=f) as records:
+            return json.loads(records.readline())
+
+
+def read_index(path):
+    """returns the index of an archive written by backup, None if it was not finished"""
+    with open(path, "rb") as f:
+        f.seek(max(0, os.fstat(f.fileno()).st_size - _POINTER_SIZE))
+        try:
+            index_at = json.loads(gzip.decompress(f.read()))["index_at"]
+        except (OSError, EOFError, zlib.error, ValueError, KeyError):
+            return None
+        f.seek(index_at)
+        with gzip.GzipFile(fileobj=f) as records:
+            return json.loads(records.readline())["index"]
+
+
+def restore(client, path, rename=None, padIDs=None, force=False, max_workers=8, checkpoint=None, dry_run=False,
+            progress=None):
+    """writes the pads of an archive written by backup to new pads named by rename (by default their old padIDs).
+
+    padIDs restricts the restore to these pads, which are read by their
+    offsets in the index of a finished archive. checkpoint and the result
+    work as for migrate.
+    """
+    rename = rename or (lambda padID: padID)
+    wanted = None if padIDs is None else set(padIDs)
+    index = None if wanted is None else read_index(path)
+    if index is not None:
+        records = (read_record(path, entry["offset"]) for entry in index if entry["padID"] in wanted)
+    else:
+        records = (record for record in read_backup(path) if wanted is None or record["padID"] in wanted)
+    if dry_run:
+        done = _finished(checkpoint) if checkpoint is not None else set()
+        return [(record["padID"], rename(record["padID"])) for record in records if record["padID"] not in done]
+
+    def task(padID, record):
+        write_pad(client, rename(padID), record, force)
+
+    log = _DoneLog(checkpoint)
+    try:
+        return _run(client, ((record["padID"], record) for record in records), task, max_workers, progress, log.done,
+                    log)
+    finally:
+        log.close()
+
+
+def _progress(every=100):
+    """returns a progress callback printing counters and throughput every every pads"""
+    start = time.monotonic()
+
+    def progress(report):
+        count = report["done"] + len(report["failed"])
+        if count % every == 0:
+            rate = count / max(time.monotonic() - start, 1e-9)
+            print(f"{report['done']} done, {len(report['failed'])} failed, {report['skipped']} skipped, "
+                  f"{rate:.1f} pads/s", file=sys.stderr)
+
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="etherpad-migrate", description=__doc__)
+    parser.add_argument("--url", default="http://localhost:9001/api", help="API url of the instance")
+    parser.add_argument("--apikey", default=os.environ.get("ETHERPAD_API_KEY"),
+                        help="API key, by default $ETHERPAD_API_KEY")
+    parser.add_argument("--api-version", default="1.3.0")
+    parser.add_argument("--max-workers", type=int, default=8, help="pads handled concurrently")
+    parser.add_argument("--dry-run", action="store_true", help="only print the pads that would be handled")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backup_parser = commands.add_parser("backup", help="write pads to an archive")
+    backup_parser.add_argument("archive")
+    backup_parser.add_argument("--group", help="only the pads of this groupID")
+    backup_parser.add_argument("--no-html", dest="html", action="store_false", help="only the text of the pads")
+    backup_parser.add_argument("--checkpoint-every", type=int, default=500)
+
+    restore_parser = commands.add_parser("restore", help="write the pads of an archive to the instance")
+    restore_parser.add_argument("archive")
+    restore_parser.add_argument("--to-group", help="restore into this groupID")
+    restore_parser.add_argument("--force", action="store_true", help="overwrite existing pads")
+    restore_parser.add_argument("--checkpoint", help="file recording the restored pads, to resume")
+
+    migrate_parser = commands.add_parser("migrate", help="copy or move pads to another group or instance")
+    migrate_parser.add_argument("--group", help="only the pads of this groupID")
+    migrate_parser.add_argument("--to-url", help="API url of the destination instance, by default the same")
+    migrate_parser.add_argument("--to-apikey", default=os.environ.get("ETHERPAD_TO_API_KEY"),
+                                help="API key of the destination, by default $ETHERPAD_TO_API_KEY")
+    migrate_parser.add_argument("--to-group", help="migrate into this groupID")
+    migrate_parser.add_argument("--move", action="store_true", help="delete the pads from their old place")
+    migrate_parser.add_argument("--no-html", dest="html", action="store_false", help="only copy the text")
+    migrate_parser.add_argument("--force", action="store_true", help="overwrite existing pads")
+    migrate_parser.add_argument("--checkpoint", help="file recording the migrated pads, to resume")
+
+    args = parser.parse_args(argv)
+    # One more connection than workers for the listing, which streams while the pads are handled.
+    with EtherpadLiteClient(args.apikey, args.url, args.api_version, max_connections=args.max_workers + 1) as client:
+        options = {"max_workers": args.max_workers, "dry_run": args.dry_run, "progress": _progress()}
+        if args.command == "backup":
+            result = backup(client, args.archive, groupID=args.group, html=args.html,
+                            checkpoint_every=args.checkpoint_every, **options)
+        elif args.command == "restore":
+            rename = into_group(args.to_group) if args.to_group else None
+            result = restore(client, args.archive, rename, force=args.force, checkpoint=args.checkpoint, **options)
+        else:
+            rename = into_group(args.to_group) if args.to_group else None
+            destination = None
+            if args.to_url:
+                destination = EtherpadLiteClient(args.to_apikey, args.to_url, args.api_version,
+                                                 max_connections=args.max_workers)
+            try:
+                result = migrate(client, destination, groupID=args.group, rename=rename, move=args.move,
+                                 html=args.html, force=args.force, checkpoint=args.checkpoint, **options)
+            finally:
+                if destination is not None:
+                    destination.close()
+
+    if args.dry_run:
+        for item in result:
+            print(" -> ".join(item) if isinstance(item, tuple) else item)
+        return 0
+    for padID, error in result["failed"].items():
+        print(f"{padID}: {error}", file=sys.stderr)
+    print(f"{result['done']} done, {len(result['failed'])} failed, {result['skipped']} skipped", file=sys.stderr)
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
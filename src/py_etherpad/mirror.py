@@ -0,0 +1,51 @@
+"""Keep local copies of pads up to date by applying revision changesets."""
+
+from . import changeset
+
+
+class PadMirror:
+    """Local copy of a pad's text at a known revision.
+
+    sync() asks for getRevisionsCount and, when the pad moved on, fetches only
+    the changesets of the new revisions and applies them to the local text.
+    The full text is downloaded on the first sync and whenever the changeset
+    chain cannot be applied (e.g. the pad was deleted and recreated).
+    """
+
+    def __init__(self, client, padID, text=None, rev=None, max_workers=4):
+        self.client = client
+        self.padID = padID
+        self.text = text
+        self.rev = rev if text is not None else None
+        self.max_workers = max_workers
+        self.full_syncs = 0
+        self.changesets_applied = 0
+
+    def sync(self):
+        """brings the local copy to the head revision, returns true if the text changed"""
+        head = self.client.getRevisionsCount(self.padID)["revisions"]
+        if self.rev is not None and head == self.rev:
+            return False
+        if self.rev is None or head < self.rev:
+            return self._fetch(head)
+
+        text = self.text
+        revisions = [(self.padID, rev) for rev in range(self.rev + 1, head + 1)]
+        try:
+            for result in self.client.imap("getRevisionChangeset", revisions, min(self.max_workers, len(revisions))):
+                if not result.ok:
+                    raise result.error
+                text = changeset.apply(result.value, text)
+                self.changesets_applied += 1
+        except changeset.ChangesetError:
+            return self._fetch(head)
+        changed = text != self.text
+        self.text, self.rev = text, head
+        return changed
+
+    def _fetch(self, rev):
+        text = self.client.getText(self.padID, rev)["text"]
+        self.full_syncs += 1
+        changed = text != self.text
+        self.text, self.rev = text, rev
+        return changed
@@ -0,0 +1,207 @@
+"""Keep-alive HTTP connection pool used by EtherpadLiteClient."""
+
+import contextlib
+import http.client
+import io
+import select
+import threading
+import time
+import urllib.error as urllib_error
+import urllib.parse as urllib_parse
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out in time."""
+
+
+def _dropped(conn):
+    """true if the server closed an idle connection (or sent something unasked), checked without blocking"""
+    sock = conn.sock
+    if sock is None:
+        return True
+    try:
+        if hasattr(select, "poll"):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            return bool(poller.poll(0))
+        return bool(select.select([sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+class ConnectionPool:
+    """Thread-safe pool of persistent HTTP/1.1 connections to a single host.
+
+    Connections are reused LIFO, so a burst of calls keeps hitting the warmest
+    sockets, while connections idle for longer than idle_timeout are closed on
+    the next checkout. An idle connection the server has closed meanwhile is
+    replaced before a request is sent on it; the default idle_timeout stays
+    below the 5 seconds keep-alive timeout of Node, which Etherpad runs on. At most max_connections sockets are open at any time;
+    callers beyond that block until a connection is returned.
+    """
+
+    def __init__(self, baseUrl, max_connections=10, idle_timeout=4, timeout=20):
+        parts = urllib_parse.urlsplit(baseUrl)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"unsupported URL scheme: {parts.scheme!r}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self.connections_created = 0
+        self.requests = 0
+
+        self._idle = []  # (connection, last used), oldest first
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _new_connection(self):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _evict(self, now):
+        """close idle connections which exceeded idle_timeout, caller holds the lock"""
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.pop(0)
+            conn.close()
+            self._open -= 1
+
+    def _checkout(self):
+        """returns a (connection, reused) tuple"""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise ValueError("connection pool is closed")
+                now = time.monotonic()
+                self._evict(now)
+                while self._idle:
+                    conn = self._idle.pop()[0]
+                    if not _dropped(conn):
+                        return conn, True
+                    conn.close()
+                    self._open -= 1
+                if self._open < self.max_connections:
+                    self._open += 1
+                    self.connections_created += 1
+                    break
+                if now >= deadline:
+                    raise PoolTimeout(f"no free connection within {self.timeout} seconds")
+                self._cond.wait(deadline - now)
+        try:
+            return self._new_connection(), False
+        except BaseException:
+            self._release(None, False)
+            raise
+
+    def _release(self, conn, reusable):
+        with self._cond:
+            if reusable and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                if conn is not None:
+                    conn.close()
+                self._open -= 1
+            self._cond.notify()
+
+    def _send(self, method, path, body, headers, idempotent, timeout):
+        """sends a request, returns the connection and its response with the body still unread"""
+        timeout = self.timeout if timeout is None else timeout
+        while True:
+            conn, reused = self._checkout()
+            if conn.timeout != timeout:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+            except (ConnectionResetError, BrokenPipeError):
+                self._release(conn, False)
+                # The server closed a keep-alive connection while it was idle.
+                # The request did not get through, so send it on a fresh socket.
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                self._release(conn, False)
+                raise
+            try:
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError):
+                self._release(conn, False)
+                # The request was sent and may have been processed, only a
+                # request which is safe to repeat is sent again.
+                if reused and idempotent:
+                    continue
+                raise
+            except BaseException:
+                self._release(conn, False)
+                raise
+            with self._cond:
+                self.requests += 1
+            return conn, response
+
+    def _error(self, path, response, data):
+        return urllib_error.HTTPError(
+            self.origin + path, response.status, response.reason, response.headers, io.BytesIO(data)
+        )
+
+    def request(self, method, path, body=None, headers=None, idempotent=False, timeout=None):
+        """sends a request and returns the (status, body) of the response.
+
+        A request failing on a reused connection is sent again on a fresh one
+        if it did not get through, or if idempotent tells it is safe to repeat.
+        timeout overrides the socket timeout of the pool for this request.
+        Error statuses raise urllib.error.HTTPError, just like urllib does.
+        """
+        conn, response = self._send(method, path, body, headers, idempotent, timeout)
+        try:
+            data = response.read()
+        except BaseException:
+            self._release(conn, False)
+            raise
+        self._release(conn, not response.will_close)
+
+        if response.status >= 400:
+            raise self._error(path, response, data)
+        return response.status, data
+
+    @contextlib.contextmanager
+    def stream(self, method, path, body=None, headers=None, idempotent=False):
+        """sends a request and yields the response to read the body from.
+
+        The connection goes back to the pool if the body was read completely.
+        Resends and error statuses work like for request.
+        """
+        conn, response = self._send(method, path, body, headers, idempotent, None)
+        reusable = False
+        try:
+            if response.status >= 400:
+                data = response.read()
+                reusable = not response.will_close
+                raise self._error(path, response, data)
+            yield response
+            reusable = response.isclosed() and not response.will_close
+        finally:
+            self._release(conn, reusable)
+
+    def close(self):
+        """closes all idle connections, busy connections are closed when returned"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._idle.pop()[0].close()
+                self._open -= 1
+            self._cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,124 @@
+"""Keep batch jobs from overloading the Etherpad server: rate limits and adaptive concurrency."""
+
+import threading
+import time
+
+from .retry import is_transient
+
+
+class TokenBucket:
+    """Allows rate requests per second on average and bursts of up to burst requests.
+
+    Callers reserve tokens in arrival order and sleep outside of the lock
+    until their reservation is due, so waiting threads are served fairly.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self.clock = clock
+        self.tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """takes tokens, returns the seconds to wait until they are available"""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= tokens
+            return max(0.0, -self.tokens / self.rate)
+
+
+class RateLimiter:
+    """Delays calls to stay below rate calls per second overall and below per-function limits.
+
+    per_function maps function names to a rate or a (rate, burst) tuple, e.g.
+    {"setText": 2, "copyPad": (0.5, 1)}. Every attempt of a retried call
+    counts; cached results do not.
+    """
+
+    def __init__(self, rate=None, burst=None, per_function=None, sleep=time.sleep, clock=time.monotonic):
+        self.sleep = sleep
+        self.bucket = TokenBucket(rate, burst, clock) if rate else None
+        self.buckets = {}
+        for function, limit in (per_function or {}).items():
+            rate, burst = limit if isinstance(limit, tuple) else (limit, None)
+            self.buckets[function] = TokenBucket(rate, burst, clock)
+        self.waited = 0.0
+
+    def fetch(self, function, params, send):
+        """calls send(function, params) once the call fits into the limits"""
+        delay = 0.0
+        if self.bucket is not None:
+            delay = self.bucket.reserve()
+        bucket = self.buckets.get(function)
+        if bucket is not None:
+            delay = max(delay, bucket.reserve())
+        if delay:
+            self.waited += delay
+            self.sleep(delay)
+        return send(function, params)
+
+
+class AdaptiveConcurrency:
+    """Limits the calls in flight and adapts the limit to the latency of the server.
+
+    Every function keeps a baseline (its lowest recent latency) and a moving
+    average of its latency. While the average stays below tolerance times the
+    baseline the limit grows by about one per limit calls; above it, the limit
+    shrinks by 10 percent per slow call, and transient errors (5xx, 429,
+    connection problems) halve it. The limit stays between min_limit and
+    max_limit.
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=64, tolerance=2.0, smoothing=0.2, clock=time.monotonic):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.clock = clock
+        self.in_flight = 0
+        self._baseline = {}
+        self._average = {}
+        self._cond = threading.Condition()
+
+    def _done(self, function, latency, overloaded):
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded:
+                self.limit = max(self.min_limit, self.limit / 2)
+            elif latency is not None:
+                baseline = self._baseline.get(function, latency)
+                # The baseline follows lower latencies at once and higher ones slowly.
+                baseline = latency if latency < baseline else baseline + (latency - baseline) * 0.01
+                self._baseline[function] = baseline
+                average = self._average.get(function, latency)
+                average += (latency - average) * self.smoothing
+                self._average[function] = average
+                if average > baseline * self.tolerance:
+                    self.limit = max(self.min_limit, self.limit * 0.9)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def fetch(self, function, params, send):
+        """calls send(function, params) once fewer than limit calls are in flight"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        start = self.clock()
+        try:
+            result = send(function, params)
+        except Exception as e:
+            # API errors are answers as well, only transient failures indicate an overloaded server.
+            transient = is_transient(e)
+            self._done(function, None if transient else self.clock() - start, transient)
+            raise
+        self._done(function, self.clock() - start, False)
+        return result
@@ -0,0 +1,147 @@
+"""Retry transient failures of EtherpadLite API calls and fail fast while the server is down."""
+
+import contextvars
+import http.client
+import random
+import threading
+import time
+import urllib.error as urllib_error
+
+from .functions import READ_FUNCTIONS
+
+
+# (clock, end) of the deadline of the call a RetryPolicy is running in this thread or task.
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+def attempt_timeout(timeout):
+    """returns the socket timeout of a request: timeout, cut to the time left until the deadline of its RetryPolicy"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return timeout
+    clock, end = deadline
+    left = end - clock()
+    if left <= 0:
+        raise TimeoutError("the deadline of the call has passed")
+    return min(timeout, left)
+
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the server while the circuit breaker is open."""
+
+
+def is_transient(error):
+    """true for errors worth retrying: connection problems, timeouts, 5xx and 429 responses"""
+    if isinstance(error, urllib_error.HTTPError):
+        return error.code >= 500 or error.code == 429
+    return isinstance(error, (OSError, http.client.HTTPException))
+
+
+class RetryPolicy:
+    """Retries transient failures with exponential backoff and full jitter.
+
+    Only functions in functions are retried, by default the reads, which are
+    safe to repeat. The n-th retry waits a random time up to
+    min(max_backoff, backoff * 2 ** n) seconds, or the Retry-After of a 429/503
+    response. No retry is started that would end after deadline seconds from
+    the first attempt, and the socket timeout of every attempt is cut to the
+    time left until then, so a retried call takes about deadline seconds at
+    most (plus the wait for a free pooled connection).
+    """
+
+    def __init__(self, max_attempts=4, backoff=0.1, max_backoff=5, deadline=30, functions=READ_FUNCTIONS,
+                 sleep=time.sleep, clock=time.monotonic):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.functions = frozenset(functions)
+        self.sleep = sleep
+        self.clock = clock
+        self.retries = 0
+
+    def delay(self, attempt, error):
+        """seconds to wait before retry number attempt (starting at 0)"""
+        retry_after = getattr(error, "headers", None) and error.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def fetch(self, function, params, send):
+        """calls send(function, params), retrying transient failures of retryable functions"""
+        if function not in self.functions:
+            return send(function, params)
+        start = self.clock()
+        token = _deadline.set((self.clock, start + self.deadline))
+        try:
+            attempt = 0
+            while True:
+                try:
+                    return send(function, params)
+                except CircuitOpenError:
+                    raise
+                except Exception as e:
+                    if not is_transient(e) or attempt + 1 >= self.max_attempts:
+                        raise
+                    delay = self.delay(attempt, e)
+                    if self.clock() - start + delay > self.deadline:
+                        raise
+                self.retries += 1
+                self.sleep(delay)
+                attempt += 1
+        finally:
+            _deadline.reset(token)
+
+
+class CircuitBreaker:
+    """Fails calls fast while the server keeps failing.
+
+    After failure_threshold consecutive transient failures the circuit opens
+    and calls raise CircuitOpenError immediately. After reset_timeout seconds
+    a single trial call is let through: success closes the circuit, failure
+    opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _before(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and self.clock() - self._opened >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpenError("Etherpad server is unavailable, not sending the request")
+
+    def _after(self, failed):
+        with self._lock:
+            if not failed:
+                self.state = self.CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened = self.clock()
+
+    def fetch(self, function, params, send):
+        """calls send(function, params) unless the circuit is open"""
+        self._before()
+        try:
+            result = send(function, params)
+        except Exception as e:
+            self._after(is_transient(e))
+            raise
+        self._after(False)
+        return result
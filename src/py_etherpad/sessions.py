@@ -0,0 +1,138 @@
+"""Reuse Etherpad sessions across logins and prune expired ones."""
+
+import threading
+import time
+
+
+class SessionManager:
+    """Hands out sessions per (groupID, authorID), reusing a known session until it is about to expire.
+
+    New sessions are valid for lifetime seconds and replaced renew_before
+    seconds before their validUntil. sweep() deletes the expired sessions on
+    the server, which Etherpad keeps forever otherwise; start_sweeper() runs
+    it periodically in a background thread.
+    """
+
+    def __init__(self, client, lifetime=24 * 3600, renew_before=300, max_workers=8, clock=time.time):
+        self.client = client
+        self.lifetime = lifetime
+        self.renew_before = renew_before
+        self.max_workers = max_workers
+        self.clock = clock
+        self.created = 0
+        self.reused = 0
+        self._sessions = {}  # (groupID, authorID) -> (sessionID, validUntil)
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+        self.sweep_error = None
+
+    def _cached(self, groupID, authorID, now):
+        entry = self._sessions.get((groupID, authorID))
+        if entry is not None and entry[1] - now > self.renew_before:
+            return entry[0]
+        return None
+
+    def session(self, groupID, authorID):
+        """returns a sessionID valid for at least renew_before more seconds"""
+        return self.sessions(authorID, [groupID])[groupID]
+
+    def sessions(self, authorID, groupIDs):
+        """returns {groupID: sessionID} for an author entering many groups, creating the missing sessions concurrently"""
+        now = self.clock()
+        result = {}
+        missing = []
+        with self._lock:
+            for groupID in groupIDs:
+                sessionID = self._cached(groupID, authorID, now)
+                if sessionID is None:
+                    missing.append(groupID)
+                else:
+                    result[groupID] = sessionID
+            self.reused += len(result)
+        validUntil = int(now + self.lifetime)
+        error = None
+        requests = [(groupID, authorID, validUntil) for groupID in missing]
+        for created in self.client.imap("createSession", requests, self.max_workers):
+            if not created.ok:
+                error = error or created.error
+                continue
+            groupID = created.args[0]
+            result[groupID] = created.value["sessionID"]
+            with self._lock:
+                self._sessions[groupID, authorID] = (result[groupID], validUntil)
+                self.created += 1
+        if error is not None:
+            raise error
+        return result
+
+    def cookie(self, authorID, groupIDs):
+        """returns the value of the sessionID cookie giving the author access to all groupIDs"""
+        sessions = self.sessions(authorID, groupIDs)
+        return ",".join(sessions[groupID] for groupID in groupIDs)
+
+    def end(self, authorID, groupIDs=None):
+        """deletes the known sessions of an author (in groupIDs, by default all), e.g. at logout"""
+        with self._lock:
+            keys = [key for key in self._sessions if key[1] == authorID and (groupIDs is None or key[0] in groupIDs)]
+            sessionIDs = [self._sessions.pop(key)[0] for key in keys]
+        self._delete(sessionIDs)
+        return len(sessionIDs)
+
+    def _delete(self, sessionIDs):
+        """deletes sessions concurrently, sessions deleted meanwhile are no error"""
+        deleted = 0
+        for result in self.client.imap("deleteSession", sessionIDs, self.max_workers):
+            if result.ok:
+                deleted += 1
+            elif not isinstance(result.error, ValueError):
+                raise result.error
+        return deleted
+
+    def sweep(self, groupIDs=None):
+        """deletes the expired sessions of groupIDs (by default of all groups), returns how many were deleted"""
+        now = self.clock()
+        with self._lock:
+            for key in [key for key, (_, validUntil) in self._sessions.items() if validUntil <= now]:
+                del self._sessions[key]
+        if groupIDs is None:
+            groupIDs = self.client.listAllGroups()["groupIDs"]
+        expired = []
+        for listing in self.client.imap("listSessionsOfGroup", groupIDs, self.max_workers):
+            if not listing.ok:
+                if isinstance(listing.error, ValueError):
+                    continue  # the group is gone
+                raise listing.error
+            for sessionID, info in (listing.value or {}).items():
+                if info and int(info["validUntil"]) <= now:
+                    expired.append(sessionID)
+        return self._delete(expired)
+
+    def start_sweeper(self, interval=600, groupIDs=None):
+        """sweeps every interval seconds in a daemon thread until stop_sweeper is called"""
+        if self._sweeper is not None:
+            raise RuntimeError("the sweeper is already running")
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_periodically, args=(interval, groupIDs), daemon=True)
+        self._sweeper.start()
+
+    def _sweep_periodically(self, interval, groupIDs):
+        while not self._stop.wait(interval):
+            try:
+                self.sweep(groupIDs)
+                self.sweep_error = None
+            except Exception as e:
+                # Keep sweeping, the server may be back next time.
+                self.sweep_error = e
+
+    def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._stop.set()
+            self._sweeper.join()
+            self._sweeper = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_sweeper()
@@ -0,0 +1,268 @@
+"""Spread pads over several Etherpad instances by consistent hashing."""
+
+import bisect
+import concurrent.futures
+import hashlib
+import itertools
+
+from . import EtherpadLiteClient
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring, adding or removing a node only moves about 1/n of the keys.
+
+    Every node is placed replicas times on the ring to even out the load.
+    """
+
+    def __init__(self, nodes, replicas=128):
+        points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas))
+        if not points:
+            raise ValueError("a hash ring needs at least one node")
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node(self, key):
+        """returns the node responsible for key"""
+        return self._nodes[bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)]
+
+
+def shard_key(padID):
+    """returns the hash key of a pad: group pads (g.xxx$name) are placed with their group"""
+    if padID.startswith("g.") and "$" in padID:
+        return padID.split("$", 1)[0]
+    return padID
+
+
+def _concat(key):
+    def merge(results):
+        return {key: [item for result in results for item in result[key]]}
+    return merge
+
+
+def _sum(results):
+    totals = {}
+    for result in results:
+        for key, value in result.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _union(results):
+    merged = {}
+    for result in results:
+        merged.update(result or {})
+    return merged or None
+
+
+class ShardedEtherpadClient(EtherpadLiteClient):
+    """Client for pads spread over several Etherpad instances.
+
+    backends is a list of (baseUrl, apiKey); options are passed to the
+    EtherpadLiteClient of every backend, so stateful options like a
+    circuit_breaker are shared by all of them.
+
+    Calls about a pad go to the instance chosen by consistent hashing of the
+    padID, group pads and the calls about a group to the instance of the group.
+    Global listings are sent to every instance in parallel and merged, the
+    pads and sessions of an author from the instances that know the author; calls
+    about sessions, read-only IDs and authors ask every instance and return the
+    answer of the one that knows the ID. Authors are created on the instances
+    in turn (or by authorMapper), Etherpad does not share them between
+    instances; createSession needs an author of the group's instance, which
+    author_for_group returns. createGroup repeats until Etherpad hands out a groupID that
+    hashes to the instance it was created on, deleting the groups it created
+    on the way. createGroupIfNotExistsFor goes to the instance of the
+    groupMapper and keeps the groupID it gets, which may be an existing group
+    hashing elsewhere; such groups are remembered, and a call answered with
+    "groupID does not exist" by the hashed instance looks for the group on
+    the others.
+    """
+
+    # Functions sent to every shard, with the function merging the results.
+    FAN_OUT = {
+        "listAllPads": _concat("padIDs"),
+        "listAllGroups": _concat("groupIDs"),
+        "listPadsOfAuthor": _concat("padIDs"),
+        "listSessionsOfAuthor": _union,
+        "getStats": _sum,
+        "checkToken": lambda results: None,
+    }
+    # Fan-out functions about an author, the shards which do not know the author are left out.
+    ABOUT_AUTHOR = frozenset(("listPadsOfAuthor", "listSessionsOfAuthor"))
+    # Functions about IDs which do not tell their shard, answered by the shard that knows them.
+    FIND = frozenset(("getSessionInfo", "deleteSession", "getPadID", "getAuthorName"))
+    # Parameters naming the shard, in order of precedence.
+    ROUTING_PARAMS = ("padID", "sourceID", "groupID", "groupMapper", "authorMapper")
+    # createGroup tries at most this many times per shard to get a groupID placed on its own shard.
+    PLACEMENT_ATTEMPTS = 16
+
+    def __init__(self, backends, api_version="1.3.0", replicas=128, **options):
+        super().__init__(api_version=api_version, pooled=False)
+        self.shards = {baseUrl: EtherpadLiteClient(apiKey, baseUrl, api_version, **options)
+                       for baseUrl, apiKey in backends}
+        self.ring = HashRing(self.shards, replicas)
+        self._rotation = itertools.cycle(list(self.shards.values()))
+        self._executor = concurrent.futures.ThreadPoolExecutor(len(self.shards))
+        self._groups = {}  # groupID -> shard, for groups not on the shard their groupID hashes to
+
+    def close(self):
+        """closes the connections of every shard"""
+        for shard in self.shards.values():
+            shard.close()
+        self._executor.shutdown()
+
+    def add_hook(self, pre=None, post=None):
+        """registers the callbacks with every shard"""
+        for shard in self.shards.values():
+            shard.add_hook(pre, post)
+
+    def shard_for(self, key):
+        """returns the client of the shard holding the pad or group key"""
+        key = shard_key(key)
+        shard = self._groups.get(key)
+        return shard if shard is not None else self.shards[self.ring.node(key)]
+
+    def call(self, function, params=None):
+        """sends the call to the responsible shard, or to all of them"""
+        params = self._params(function, params)
+        if function in self.FAN_OUT:
+            return self.FAN_OUT[function](self._fan_out(function, params))
+        if function in self.FIND:
+            return self._find(function, params)
+        if function == "createAuthor":
+            return next(self._rotation).call(function, params)
+        if function == "createGroup":
+            return self._place_group(function, params)
+        if function == "createSession":
+            return self._create_session(function, params)
+        if function == "createGroupIfNotExistsFor":
+            shard = self._route(function, params)
+            groupID = shard.call(function, params)["groupID"]
+            if self.shard_for(groupID) is not shard:
+                self._groups[groupID] = shard
+            return {"groupID": groupID}
+        return self._routed(function, params, lambda shard: shard.call(function, params))
+
+    def call_streamed(self, function, key, params=None):
+        """call_streamed of the responsible shard; listings of every shard are chained lazily"""
+        if function in self.FAN_OUT:
+            return {key: itertools.chain.from_iterable(
+                shard.call_streamed(function, key, params)[key] for shard in self.shards.values()
+            )}
+        return self._routed(function, params or {}, lambda shard: shard.call_streamed(function, key, params))
+
+    def author_for_group(self, groupID, authorMapper, name=None):
+        """returns {"authorID": ...} of authorMapper on the instance of groupID, the author to create its sessions for.
+
+        Etherpad authors belong to one instance, so the same authorMapper
+        gets a different authorID on every instance it is used on.
+        """
+        params = {"authorMapper": authorMapper}
+        if name is not None:
+            params["name"] = name
+
+        def create(shard):
+            # Fails with "groupID does not exist" on an instance without the group, which is then looked for.
+            shard.listPads(groupID)
+            return shard.call("createAuthorIfNotExistsFor", params)
+
+        return self._routed("listPads", {"groupID": groupID}, create)
+
+    def _create_session(self, function, params):
+        try:
+            return self._routed(function, params, lambda shard: shard.call(function, params))
+        except ValueError as e:
+            if str(e) != "authorID does not exist":
+                raise
+            raise ValueError(f"authorID {params.get('authorID')} does not exist on the instance of group "
+                             f"{params.get('groupID')}, authors belong to one instance: get the author of the "
+                             f"group's instance with author_for_group") from e
+
+    def _routed(self, function, params, send):
+        """send(shard) to the responsible shard, or to the shard found to hold the group if that one does not know it"""
+        shard = self._route(function, params)
+        try:
+            return send(shard)
+        except ValueError as e:
+            if str(e) != "groupID does not exist":
+                raise
+            found = self._locate_group(self._routing_key(function, params), shard)
+            if found is None:
+                raise
+        return send(found)
+
+    def _locate_group(self, key, tried):
+        """returns the shard other than tried which knows the group of key and remembers it, None if none does"""
+        groupID = shard_key(key)
+        if not groupID.startswith("g.") or groupID in self._groups:
+            return None
+        futures = {self._executor.submit(shard.listPads, groupID): shard
+                   for shard in self.shards.values() if shard is not tried}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except ValueError:
+                continue
+            shard = self._groups[groupID] = futures[future]
+            return shard
+        return None
+
+    def _routing_key(self, function, params):
+        values = dict(params, **params.get("POST", {}))
+        for name in self.ROUTING_PARAMS:
+            if name in values:
+                return values[name]
+        raise ValueError(f"{function} names no pad or group, it cannot be routed to a shard")
+
+    def _route(self, function, params):
+        values = dict(params, **params.get("POST", {}))
+        shard = self.shard_for(self._routing_key(function, params))
+        if "destinationID" in values and self.shard_for(values["destinationID"]) is not shard:
+            raise ValueError(f"{function} cannot copy or move pads between shards")
+        return shard
+
+    def _fan_out(self, function, params):
+        futures = [self._executor.submit(shard.call, function, params) for shard in self.shards.values()]
+        if function not in self.ABOUT_AUTHOR:
+            return [future.result() for future in futures]
+        results = []
+        error = None
+        for future in futures:
+            try:
+                results.append(future.result())
+            except ValueError as e:
+                error = error or e
+        if not results:
+            raise error
+        return results
+
+    def _find(self, function, params):
+        futures = [self._executor.submit(shard.call, function, params) for shard in self.shards.values()]
+        found = False
+        error = None
+        for future in futures:
+            try:
+                result = future.result()
+            except ValueError as e:
+                error = error or e
+                continue
+            if result is not None:
+                return result
+            found = True
+        if not found:
+            raise error
+
+    def _place_group(self, function, params):
+        """creates a group on each shard in turn until its groupID hashes to it, deleting the misplaced new groups"""
+        for _ in range(self.PLACEMENT_ATTEMPTS * len(self.shards)):
+            target = next(self._rotation)
+            groupID = target.call(function, params)["groupID"]
+            if self.shard_for(groupID) is target:
+                return {"groupID": groupID}
+            target.deleteGroup(groupID)
+        raise RuntimeError(f"{function} did not get a groupID placed on its shard")
+
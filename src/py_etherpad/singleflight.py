@@ -0,0 +1,59 @@
+"""Coalesce identical concurrent EtherpadLite API calls into one request."""
+
+import threading
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Shares one upstream request between identical in-flight calls.
+
+    The first caller of a (function, params) pair sends the request, callers
+    arriving while it is in flight wait for it and receive the same result or
+    exception. Only the given functions are coalesced, which should be reads:
+    two concurrent appendText calls must both reach the server.
+    """
+
+    def __init__(self, functions):
+        self.functions = frozenset(functions)
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, function, params, send):
+        """calls send(function, params) unless an identical call is in flight and returns its result"""
+        if function not in self.functions:
+            return send(function, params)
+
+        key = (function, tuple(sorted((k, v) for k, v in params.items() if k != "POST")))
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = send(function, params)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.value
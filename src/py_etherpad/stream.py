@@ -0,0 +1,147 @@
+"""Incremental decoding of API responses whose data holds a huge list."""
+
+import codecs
+import contextlib
+import json
+
+# Bytes requested from the response per read.
+READ_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+# Characters which may continue a number, or the empty end of the buffer.
+_NUMBER = ("", *"0123456789.eE+-")
+
+
+class _Reader:
+    """JSON tokens and values from a binary file, decoded as the bytes arrive"""
+
+    def __init__(self, fp, read_size=READ_SIZE):
+        self.fp = fp
+        self.read = getattr(fp, "read1", fp.read)
+        self.read_size = read_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.decoder_json = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """appends the next bytes of the file to the buffer, false at the end of the file"""
+        if self.eof:
+            return False
+        data = self.read(self.read_size)
+        if not data:
+            # read1 leaves http.client responses open at their end, read finishes them.
+            data = self.fp.read()
+        self.eof = not data
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(data, self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """returns the next character after whitespace without consuming it, None at the end"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return None
+
+    def next(self):
+        char = self.peek()
+        if char is None:
+            raise ValueError("JSON response ended unexpectedly")
+        self.pos += 1
+        return char
+
+    def expect(self, expected):
+        char = self.next()
+        if char != expected:
+            raise ValueError(f"JSON response has {char!r} where {expected!r} was expected")
+
+    def value(self):
+        """decodes the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder_json.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may go on in the next read.
+            if isinstance(value, (int, float)) and self.buffer[end:end + 1] in _NUMBER and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def drain(self):
+        while self.fill():
+            self.pos = len(self.buffer)
+
+
+def _items(stack, reader):
+    """yields the elements of the JSON array at the position of reader, then releases stack"""
+    with stack:
+        # Primed right away, so the response is released even if the iterator is never used.
+        yield
+        reader.expect("[")
+        if reader.peek() == "]":
+            reader.next()
+        else:
+            while True:
+                yield reader.value()
+                separator = reader.next()
+                if separator == "]":
+                    break
+                if separator != ",":
+                    raise ValueError(f"JSON response has {separator!r} where ',' was expected")
+        reader.drain()
+
+
+def _parse(reader, key):
+    """reads the API response object up to data[key], returns it with the elements of data[key] still unread"""
+    reader.expect("{")
+    result = {}
+    while reader.peek() != "}":
+        name = reader.value()
+        reader.expect(":")
+        # Once the code is known the list can be handed out as it is read.
+        if name == "data" and "code" in result and reader.peek() == "{":
+            reader.next()
+            data = result["data"] = {}
+            while reader.peek() != "}":
+                field = reader.value()
+                reader.expect(":")
+                if field == key and reader.peek() == "[":
+                    return result, True
+                data[field] = reader.value()
+                if reader.peek() == ",":
+                    reader.next()
+            reader.next()
+        else:
+            result[name] = reader.value()
+        if reader.peek() == ",":
+            reader.next()
+    return result, False
+
+
+def load_streamed(response, key, read_size=READ_SIZE):
+    """decodes the API response read from the context manager response.
+
+    The list data[key] becomes an iterator yielding its elements while they
+    are downloaded; the response is closed once it is exhausted or dropped.
+    Fields of data after key are not read.
+    """
+    stack = contextlib.ExitStack()
+    with stack:
+        reader = _Reader(stack.enter_context(response), read_size)
+        result, streamed = _parse(reader, key)
+        if not streamed:
+            reader.drain()
+            return result
+        items = _items(stack.pop_all(), reader)
+    next(items)
+    result["data"][key] = items
+    return result
@@ -0,0 +1,113 @@
+"""Form encoding of request bodies, streamed for large values instead of building them in memory."""
+
+import re
+import urllib.parse as urllib_parse
+
+# Characters of text (or bytes) encoded per chunk of a streamed body.
+CHUNK_SIZE = 64 * 1024
+
+# Values up to this many UTF-8 bytes are sent in the url encoded body as they are.
+LARGE_VALUE = 8192
+
+# Strings quote_plus leaves as they are.
+_SAFE = re.compile(r"[A-Za-z0-9_.~-]*")
+
+
+def _quote(text):
+    return text if _SAFE.fullmatch(text) else urllib_parse.quote_plus(text)
+
+
+def encode_form(fields, doseq=False):
+    """returns fields url encoded like urllib.parse.urlencode, with a fast path for strings and numbers"""
+    parts = []
+    for key, value in fields.items():
+        if not isinstance(value, str):
+            if not isinstance(value, (int, float)) or not isinstance(key, str):
+                return urllib_parse.urlencode(fields, doseq)
+            value = str(value)
+        parts.append(f"{_quote(key)}={_quote(value)}")
+    return "&".join(parts)
+
+
+class Upload:
+    """A form value sent chunk by chunk: str, bytes, a file-like object or an iterable of str/bytes chunks.
+
+    Seekable files are rewound whenever the value is sent again, so a retried
+    request sends the whole value once more. Other files and iterables can
+    only be sent once.
+    """
+
+    def __init__(self, value, chunk_size=CHUNK_SIZE):
+        self.value = value
+        self.chunk_size = chunk_size
+        self._start = None
+        if hasattr(value, "read") and getattr(value, "seekable", lambda: False)():
+            self._start = value.tell()
+        self._sent = False
+
+    def chunks(self):
+        """yields the value as str or bytes chunks"""
+        value = self.value
+        if isinstance(value, (str, bytes, bytearray)):
+            for start in range(0, len(value), self.chunk_size):
+                yield value[start:start + self.chunk_size]
+            return
+        if self._start is not None:
+            value.seek(self._start)
+        elif self._sent:
+            raise ValueError("upload was already sent and cannot be rewound")
+        self._sent = True
+        if hasattr(value, "read"):
+            for chunk in iter(lambda: value.read(self.chunk_size), value.read(0)):
+                yield chunk
+        else:
+            yield from value
+
+
+def is_large(value, limit=LARGE_VALUE):
+    """true if value should be POSTed as Upload: files, iterables and strings of more than limit UTF-8 bytes"""
+    if isinstance(value, str):
+        # A string never has fewer UTF-8 bytes than characters; only encode short ones to count.
+        return len(value) > limit or len(value.encode()) > limit
+    if isinstance(value, (bytes, bytearray)):
+        return len(value) > limit
+    return True
+
+
+class FormBody:
+    """Iterable application/x-www-form-urlencoded body of params, whose Upload values are encoded chunk by chunk.
+
+    Every iteration encodes the body anew; sent counts the bytes of the last one.
+    """
+
+    def __init__(self, params, doseq=False, chunk_size=CHUNK_SIZE):
+        self.params = params
+        self.doseq = doseq
+        self.chunk_size = chunk_size
+        self.sent = 0
+
+    def __iter__(self):
+        self.sent = 0
+        fields = {key: value for key, value in self.params.items() if not isinstance(value, Upload)}
+        buffer = [urllib_parse.urlencode(fields, self.doseq).encode()]
+        size = len(buffer[0])
+        for key, value in self.params.items():
+            if not isinstance(value, Upload):
+                continue
+            buffer.append(("&" if size or self.sent else "") + urllib_parse.quote_plus(str(key)) + "=")
+            size += len(buffer[-1])
+            for chunk in value.chunks():
+                buffer.append(urllib_parse.quote_plus(chunk))
+                size += len(buffer[-1])
+                # Collect small pieces so that every chunk of the request is a decent write.
+                if size >= self.chunk_size:
+                    yield self._flush(buffer)
+                    size = 0
+        if size:
+            yield self._flush(buffer)
+
+    def _flush(self, buffer):
+        data = b"".join(part if isinstance(part, bytes) else part.encode() for part in buffer)
+        buffer.clear()
+        self.sent += len(data)
+        return data
@@ -0,0 +1,243 @@
+"""Notice changes of many pads by polling each one as often as it changes."""
+
+import array
+import collections
+import heapq
+import math
+import threading
+import time
+
+# function -> key of its result, any value which changes with the pad
+CHECKS = {"getLastEdited": "lastEdited", "getRevisionsCount": "revisions"}
+
+_UNKNOWN = math.nan  # not polled yet, the first value is the baseline
+_NEW = -math.inf  # found by refresh, the first value is reported
+
+
+class PadChange(collections.namedtuple("PadChange", "padID previous current")):
+    """A pad changed from previous to current (lastEdited or revisions). previous is None for a new pad, current for a
+    deleted one."""
+
+    __slots__ = ()
+
+
+class PadWatcher:
+    """Polls many pads with getLastEdited and reports the ones that changed.
+
+    Every pad has its own interval: a pad that changed is polled again after
+    min_interval, each poll finding it unchanged doubles the interval up to
+    max_interval. Only the pads that are due are polled, max_workers at a
+    time, so the work follows the activity instead of the number of pads. The
+    state of a pad is kept in arrays indexed by a slot number.
+
+    Pads are watched from their first poll on, pads found by refresh() later
+    (e.g. by the background thread every refresh_interval seconds) and pads
+    which disappear are reported as well.
+    """
+
+    def __init__(self, client, padIDs=None, min_interval=5.0, max_interval=600.0, max_workers=16,
+                 check="getLastEdited", refresh_interval=None, clock=time.monotonic):
+        if check not in CHECKS:
+            raise ValueError(f"check must be one of {', '.join(CHECKS)}")
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_workers = max_workers
+        self.check = check
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.callbacks = []
+        self.polls = 0
+        self.errors = 0
+
+        self._slots = {}  # padID -> slot
+        self._padIDs = []  # slot -> padID, None for a free slot
+        self._free = []
+        self._values = array.array("d")  # slot -> last value, _UNKNOWN or _NEW
+        self._intervals = array.array("d")  # slot -> seconds between polls
+        self._due = array.array("d")  # slot -> time of the next poll
+        self._schedule = []  # heap of (due, slot), entries not matching _due are stale
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._refreshed = clock()
+        if padIDs is None:
+            self.refresh(report=False)
+        else:
+            for padID in padIDs:
+                self.add(padID)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, padID):
+        return padID in self._slots
+
+    def on_change(self, callback):
+        """registers callback(change) for every PadChange found by poll"""
+        self.callbacks.append(callback)
+        return callback
+
+    def add(self, padID, report=False):
+        """watches a pad from its next poll on, which happens right away; report tells if that poll reports it"""
+        with self._lock:
+            if padID in self._slots:
+                return
+            value = _NEW if report else _UNKNOWN
+            now = self.clock()
+            if self._free:
+                slot = self._free.pop()
+                self._padIDs[slot] = padID
+                self._values[slot], self._intervals[slot], self._due[slot] = value, self.min_interval, now
+            else:
+                slot = len(self._padIDs)
+                self._padIDs.append(padID)
+                self._values.append(value)
+                self._intervals.append(self.min_interval)
+                self._due.append(now)
+            self._slots[padID] = slot
+            heapq.heappush(self._schedule, (now, slot))
+
+    def remove(self, padID):
+        """stops watching a pad, returns its last value (None if it was not polled yet or not watched)"""
+        with self._lock:
+            slot = self._slots.pop(padID, None)
+            if slot is None:
+                return None
+            self._padIDs[slot] = None
+            self._due[slot] = math.inf
+            self._free.append(slot)
+            value = self._values[slot]
+        return None if math.isnan(value) or value == _NEW else value
+
+    def refresh(self, report=True):
+        """watches the pads of listAllPads not watched yet and reports those which are gone, returns the changes"""
+        padIDs = set()
+        for padID in self.client.listAllPads(stream=True)["padIDs"]:
+            padIDs.add(padID)
+            self.add(padID, report)
+        self._refreshed = self.clock()
+        with self._lock:
+            gone = [padID for padID in self._slots if padID not in padIDs]
+        changes = [PadChange(padID, self.remove(padID), None) for padID in gone]
+        self._emit(changes)
+        return changes
+
+    def next_due(self):
+        """returns the time of the next poll, None without pads"""
+        with self._lock:
+            while self._schedule:
+                due, slot = self._schedule[0]
+                if due == self._due[slot]:
+                    return due
+                heapq.heappop(self._schedule)
+        return None
+
+    def _take_due(self, now):
+        due_pads = []
+        with self._lock:
+            while self._schedule and self._schedule[0][0] <= now:
+                due, slot = heapq.heappop(self._schedule)
+                if due == self._due[slot]:
+                    # Not scheduled again until the poll is done, the poll cannot run twice.
+                    self._due[slot] = math.inf
+                    due_pads.append(self._padIDs[slot])
+        return due_pads
+
+    def poll(self):
+        """polls the pads which are due, calls the callbacks and returns the changes"""
+        due_pads = self._take_due(self.clock())
+        key = CHECKS[self.check]
+        changes = []
+        for result in self.client.imap(self.check, due_pads, self.max_workers, ordered=False):
+            padID = result.args
+            self.polls += 1
+            if not result.ok:
+                if isinstance(result.error, ValueError):
+                    # The pad was deleted.
+                    changes.append(PadChange(padID, self.remove(padID), None))
+                    continue
+                self.errors += 1
+                self._reschedule(padID, False)
+                continue
+            change = self._update(padID, result.value[key])
+            if change is not None:
+                changes.append(change)
+        self._emit(changes)
+        return changes
+
+    def _update(self, padID, current):
+        with self._lock:
+            slot = self._slots.get(padID)
+            if slot is None:
+                return None
+            previous = self._values[slot]
+            self._values[slot] = current
+        if math.isnan(previous):
+            self._reschedule(padID, False)
+            return None
+        changed = previous != current
+        self._reschedule(padID, changed)
+        if not changed:
+            return None
+        return PadChange(padID, None if previous == _NEW else previous, current)
+
+    def _reschedule(self, padID, changed):
+        with self._lock:
+            slot = self._slots.get(padID)
+            if slot is None:
+                return
+            interval = self.min_interval if changed else min(self.max_interval, self._intervals[slot] * 2)
+            self._intervals[slot] = interval
+            due = self._due[slot] = self.clock() + interval
+            heapq.heappush(self._schedule, (due, slot))
+
+    def _emit(self, changes):
+        for change in changes:
+            for callback in self.callbacks:
+                callback(change)
+
+    def watch(self, sleep=time.sleep):
+        """yields the changes as they are found, polling and refreshing forever (or until stop is called)"""
+        while not self._stop.is_set():
+            if self.refresh_interval is not None and self.clock() >= self._refreshed + self.refresh_interval:
+                try:
+                    changes = self.refresh()
+                except Exception:
+                    # Try again at the next refresh_interval, polling goes on.
+                    self.errors += 1
+                    self._refreshed = self.clock()
+                    changes = []
+                yield from changes
+            yield from self.poll()
+            due = self.next_due()
+            wake = self.clock() + self.max_interval if due is None else due
+            if self.refresh_interval is not None:
+                wake = min(wake, self._refreshed + self.refresh_interval)
+            delay = wake - self.clock()
+            if delay > 0:
+                sleep(delay)
+
+    def start(self):
+        """polls in a daemon thread until stop is called, the changes reach the callbacks"""
+        if self._thread is not None:
+            raise RuntimeError("the watcher is already running")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for _ in self.watch(sleep=self._stop.wait):
+            pass
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
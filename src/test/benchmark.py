@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""Benchmark EtherpadLiteClient against an in-process stand-in Etherpad.
+
+Run with the package importable, e.g. from the src directory:
+
+    PYTHONPATH=. python test/benchmark.py --latency 0.001 --output bench.json
+    PYTHONPATH=. python test/benchmark.py --compare bench.json
+
+Every workload reports calls, errors, wall time, throughput and p50/p99
+latency as JSON. --compare exits with status 1 when a workload lost more
+than --tolerance of the throughput recorded in an earlier result file.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+
+
+def percentile(durations, q):
+    if not durations:
+        return None
+    ordered = sorted(durations)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(durations, errors, seconds):
+    calls = len(durations)
+    return {
+        "calls": calls,
+        "errors": errors,
+        "seconds": round(seconds, 6),
+        "throughput": round(calls / seconds, 2) if seconds else None,
+        "p50_ms": round(percentile(durations, 0.5) * 1000, 3) if durations else None,
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3) if durations else None,
+    }
+
+
+def timed_calls(func, args_list):
+    """calls func for every item, returns per-call durations and the error count"""
+    durations = []
+    errors = 0
+    for args in args_list:
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception:
+            errors += 1
+        durations.append(time.perf_counter() - start)
+    return durations, errors
+
+
+# Every workload prepares the server and returns the measured part, which returns (durations, errors).
+
+
+def small_get(client, options):
+    client.createPad("bench-small", "hello")
+    return lambda: timed_calls(client.getText, [("bench-small",)] * options.calls)
+
+
+def small_get_unpooled(client, options):
+    client.createPad("bench-unpooled", "hello")
+    unpooled = py_etherpad.EtherpadLiteClient(client.apiKey, client.baseUrl, pooled=False)
+    return lambda: timed_calls(unpooled.getText, [("bench-unpooled",)] * options.calls)
+
+
+def large_set_text(client, options):
+    client.createPad("bench-large")
+    text = ("x" * 63 + "\n") * (options.payload_size // 64)
+    return lambda: timed_calls(client.setText, [("bench-large", text)] * max(1, options.calls // 10))
+
+
+def batch_read(client, options):
+    padIDs = ["bench-batch-%d" % i for i in range(options.calls)]
+    client.map("createPad", [(padID, "y" * options.payload_size) for padID in padIDs], options.workers)
+
+    def measure():
+        durations = []
+        client.add_hook(post=lambda event: durations.append(event.duration))
+        try:
+            errors = sum(not result.ok for result in client.map("getText", padIDs, options.workers))
+        finally:
+            client.post_call_hooks.pop()
+        return durations, errors
+
+    return measure
+
+
+def revision_walk(client, options):
+    client.createPad("bench-history", "rev 0")
+    for rev in range(1, options.calls):
+        client.appendText("bench-history", "\nrev %d" % rev)
+
+    def measure():
+        durations = []
+        errors = 0
+        start = time.perf_counter()
+        try:
+            for _ in client.iter_revisions("bench-history", prefetch=options.workers):
+                now = time.perf_counter()
+                durations.append(now - start)
+                start = now
+        except Exception:
+            errors += 1
+        return durations, errors
+
+    return measure
+
+
+def call_overhead(client, options):
+    """CPU time of the client itself: a client whose transport answers at once without any I/O"""
+    local = py_etherpad.EtherpadLiteClient(client.apiKey, client.baseUrl)
+    answer = (200, json.dumps({"code": 0, "message": "ok", "data": {"text": "hello\n"}}).encode())
+    local._transfer = lambda function, method, data: answer
+    calls = options.calls * 20
+    return lambda: timed_calls(local.getText, [("bench-overhead",)] * calls)
+
+
+WORKLOADS = {
+    "small_get": small_get,
+    "small_get_unpooled": small_get_unpooled,
+    "large_set_text": large_set_text,
+    "batch_read": batch_read,
+    "revision_walk": revision_walk,
+    "call_overhead": call_overhead,
+}
+
+
+def run(options):
+    results = {}
+    with MockEtherpad(latency=options.latency, error_rate=options.error_rate, seed=1) as server:
+        with py_etherpad.EtherpadLiteClient(API_KEY, server.baseUrl, max_connections=options.workers) as client:
+            for name in options.workload:
+                server.error_rate = 0.0
+                measure = WORKLOADS[name](client, options)
+                server.error_rate = options.error_rate
+                start = time.perf_counter()
+                durations, errors = measure()
+                results[name] = summarize(durations, errors, time.perf_counter() - start)
+    return {
+        "environment": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                        "platform": platform.platform()},
+        "config": {key: value for key, value in vars(options).items() if key not in ("output", "compare")},
+        "results": results,
+    }
+
+
+def compare(report, baseline_path, tolerance):
+    """returns the workloads whose throughput dropped by more than tolerance"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = {}
+    for name, result in report["results"].items():
+        before = baseline.get(name, {}).get("throughput")
+        if before and result["throughput"] is not None and result["throughput"] < before * (1 - tolerance):
+            regressions[name] = {"before": before, "after": result["throughput"]}
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS),
+                        help="workload to run, may be repeated (default: all)")
+    parser.add_argument("--calls", type=int, default=500, help="calls per workload")
+    parser.add_argument("--workers", type=int, default=8, help="concurrency of batch reads and revision walks")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the server sleeps per request")
+    parser.add_argument("--payload-size", type=int, default=256 * 1024, help="bytes of text for large payloads")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON report to check for throughput regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative throughput loss")
+    options = parser.parse_args(argv)
+    options.workload = options.workload or list(WORKLOADS)
+
+    report = run(options)
+    if options.compare:
+        report["regressions"] = compare(report, options.compare, options.tolerance)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
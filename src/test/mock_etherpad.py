@@ -0,0 +1,448 @@
+"""In-process stand-in for the Etherpad HTTP API, used by the offline tests."""
+
+import collections
+import json
+import random
+import re
+import select
+import socket
+import string
+import threading
+import time
+import urllib.parse as urllib_parse
+from html import unescape as html_unescape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_KEY = "mock-api-key"
+DEFAULT_TEXT = "Welcome to Etherpad!\n"
+ID_CHARACTERS = string.digits + string.ascii_letters
+
+
+def base36(number):
+    digits = ""
+    while True:
+        number, digit = divmod(number, 36)
+        digits = "0123456789abcdefghijklmnopqrstuvwxyz"[digit] + digits
+        if not number:
+            return digits
+
+
+def make_changeset(old, new, attribs=""):
+    """packs the changeset turning old into new as a single splice, the inserted chars carry attribs"""
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    removed = old[prefix:len(old) - suffix]
+    added = new[prefix:len(new) - suffix]
+
+    ops = ""
+    for opcode, chars in (("=", old[:prefix]), ("-", removed), ("+", added)):
+        # An op spanning newlines has to end with one, the rest of the chars go into a second op.
+        line_end = chars.rfind("\n") + 1
+        prefix = attribs if opcode == "+" else ""
+        if line_end:
+            ops += "%s|%s%s%s" % (prefix, base36(chars.count("\n")), opcode, base36(line_end))
+        if len(chars) > line_end:
+            ops += prefix + opcode + base36(len(chars) - line_end)
+    sign = ">" if len(new) >= len(old) else "<"
+    return "Z:%s%s%s%s$%s" % (base36(len(old)), sign, base36(abs(len(new) - len(old))), ops, added)
+
+
+class ApiError(Exception):
+    """Answered with code 1 and the exception message."""
+
+
+class MockEtherpad:
+    """A tiny in-memory Etherpad answering the HTTP API on a random local port.
+
+    connect_delay is slept once per new TCP connection (a stand-in for the
+    TCP/TLS handshake), latency once per request. The next fail_next
+    requests, and a random error_rate fraction of all requests, are answered
+    with HTTP status fail_status (and retry_after seconds as Retry-After for
+    429 and 503). The next drop_next requests are handled, but their
+    connection is closed without an answer. Connections idle for
+    keep_alive_timeout seconds are closed by the server, like Node does.
+    """
+
+    def __init__(self, connect_delay=0.0, latency=0.0, error_rate=0.0, seed=None):
+        self.connect_delay = connect_delay
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.fail_next = 0
+        self.drop_next = 0
+        self.keep_alive_timeout = None
+        # Sizes of the chunks of chunked request bodies, in arrival order.
+        self.request_chunks = []
+        self.fail_status = 503
+        self.retry_after = 1
+        self.connections = 0
+        self.calls = collections.Counter()
+        self.lock = threading.RLock()
+
+        self.pads = {}  # padID -> list of revision texts
+        self.revision_authors = {}  # padID -> authorID (or None) of every revision
+        self.pools = {}  # padID -> list of [key, value] attributes
+        self.groups = {}  # groupID -> mapper
+        self.authors = {}  # authorID -> name
+        self.author_mappers = {}
+        self.sessions = {}
+        self.chat = collections.defaultdict(list)
+        self.public = {}
+        self.last_edited = {}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                with server.lock:
+                    server.connections += 1
+                if server.connect_delay:
+                    time.sleep(server.connect_delay)
+                super().setup()
+
+            def handle(self):
+                self.close_connection = True
+                self.handle_one_request()
+                while not self.close_connection:
+                    timeout = server.keep_alive_timeout
+                    if timeout is not None and not select.select([self.connection], [], [], timeout)[0]:
+                        # Like Node: the FIN goes out at once, a request crossing it is never answered.
+                        self.connection.shutdown(socket.SHUT_WR)
+                        time.sleep(0.5)
+                        return
+                    self.handle_one_request()
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self.answer()
+
+            def do_POST(self):
+                self.answer()
+
+            def read_chunked(self):
+                chunks = []
+                while True:
+                    size = int(self.rfile.readline().split(b";", 1)[0], 16)
+                    if not size:
+                        break
+                    chunks.append(self.rfile.read(size))
+                    self.rfile.readline()
+                    with server.lock:
+                        server.request_chunks.append(size)
+                while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+
+            def answer(self):
+                url = urllib_parse.urlsplit(self.path)
+                params = dict(urllib_parse.parse_qsl(url.query, keep_blank_values=True))
+                if (self.headers.get("Transfer-Encoding") or "").lower() == "chunked":
+                    body = self.read_chunked()
+                else:
+                    body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                params.update(urllib_parse.parse_qsl(body.decode(), keep_blank_values=True))
+                function = url.path.rsplit("/", 1)[-1]
+                status, payload = server.dispatch(function, params, self.headers.get("apikey"))
+                with server.lock:
+                    drop, server.drop_next = server.drop_next > 0, max(server.drop_next - 1, 0)
+                if drop:
+                    self.close_connection = True
+                    return
+                data = json.dumps(payload).encode()
+                if server.latency:
+                    time.sleep(server.latency)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                if status in (429, 503):
+                    self.send_header("Retry-After", str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.baseUrl = "http://127.0.0.1:%d/api" % self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.01,), daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def dispatch(self, function, params, header_key):
+        with self.lock:
+            self.calls[function] += 1
+            if self.fail_next or (self.error_rate and self.random.random() < self.error_rate):
+                self.fail_next = max(self.fail_next - 1, 0)
+                return self.fail_status, {"code": 2, "message": "injected failure", "data": None}
+        if params.pop("apikey", header_key) != API_KEY:
+            return 401, {"code": 4, "message": "no or wrong API Key", "data": None}
+        handler = getattr(self, "api_" + function, None)
+        if handler is None:
+            return 404, {"code": 3, "message": "no such function", "data": None}
+        try:
+            with self.lock:
+                data = handler(**params)
+        except ApiError as e:
+            return 200, {"code": 1, "message": str(e), "data": None}
+        return 200, {"code": 0, "message": "ok", "data": data}
+
+    def _new_id(self, prefix):
+        # Random like Etherpad's, so that several servers hand out distinct IDs.
+        return "%s.%s" % (prefix, "".join(self.random.choice(ID_CHARACTERS) for _ in range(16)))
+
+    def _pad(self, padID):
+        if padID not in self.pads:
+            raise ApiError("padID does not exist")
+        return self.pads[padID]
+
+    def _revision(self, padID, rev):
+        texts = self._pad(padID)
+        if rev is None or rev == "":
+            return texts[-1]
+        rev = int(rev)
+        if rev >= len(texts):
+            raise ApiError("rev is higher than the head revision of the pad")
+        return texts[rev]
+
+    def _commit(self, padID, text, authorID=None):
+        if not text.endswith("\n"):
+            text += "\n"
+        self.pads[padID].append(text)
+        self.revision_authors.setdefault(padID, []).append(authorID)
+        if authorID:
+            # Like Etherpad, the attribute pool learns the author when the revision is written.
+            self._attribute(padID, "author", authorID)
+        self.last_edited[padID] = int(time.time() * 1000)
+
+    # GROUPS
+
+    def api_createGroup(self):
+        groupID = self._new_id("g")
+        self.groups[groupID] = None
+        return {"groupID": groupID}
+
+    def api_createGroupIfNotExistsFor(self, groupMapper):
+        for groupID, mapper in self.groups.items():
+            if mapper == groupMapper:
+                return {"groupID": groupID}
+        groupID = self._new_id("g")
+        self.groups[groupID] = groupMapper
+        return {"groupID": groupID}
+
+    def api_deleteGroup(self, groupID):
+        if groupID not in self.groups:
+            raise ApiError("groupID does not exist")
+        del self.groups[groupID]
+        for padID in [p for p in self.pads if p.startswith(groupID + "$")]:
+            del self.pads[padID]
+
+    def api_listPads(self, groupID):
+        if groupID not in self.groups:
+            raise ApiError("groupID does not exist")
+        return {"padIDs": [p for p in self.pads if p.startswith(groupID + "$")]}
+
+    def api_createGroupPad(self, groupID, padName, text=None, authorID=None):
+        if groupID not in self.groups:
+            raise ApiError("groupID does not exist")
+        padID = groupID + "$" + padName
+        if padID in self.pads:
+            raise ApiError("padName does already exist")
+        self.pads[padID] = []
+        self.revision_authors[padID] = []
+        self._commit(padID, DEFAULT_TEXT if text is None else text, authorID)
+        return {"padID": padID}
+
+    def api_listAllGroups(self):
+        return {"groupIDs": list(self.groups)}
+
+    # AUTHORS
+
+    def api_createAuthor(self, name=None):
+        authorID = self._new_id("a")
+        self.authors[authorID] = name
+        return {"authorID": authorID}
+
+    def api_createAuthorIfNotExistsFor(self, authorMapper, name=None):
+        if authorMapper not in self.author_mappers:
+            self.author_mappers[authorMapper] = self.api_createAuthor(name)["authorID"]
+        elif name:
+            self.authors[self.author_mappers[authorMapper]] = name
+        return {"authorID": self.author_mappers[authorMapper]}
+
+    def api_getAuthorName(self, authorID):
+        if authorID not in self.authors:
+            raise ApiError("authorID does not exist")
+        return self.authors[authorID]
+
+    def api_listPadsOfAuthor(self, authorID):
+        if authorID not in self.authors:
+            raise ApiError("authorID does not exist")
+        return {"padIDs": [padID for padID, authors in self.revision_authors.items() if authorID in authors]}
+
+    # SESSIONS
+
+    def api_createSession(self, groupID, authorID, validUntil):
+        if groupID not in self.groups:
+            raise ApiError("groupID does not exist")
+        if authorID not in self.authors:
+            raise ApiError("authorID does not exist")
+        if int(validUntil) < time.time():
+            raise ApiError("validUntil is in the past")
+        sessionID = self._new_id("s")
+        self.sessions[sessionID] = {"groupID": groupID, "authorID": authorID, "validUntil": int(validUntil)}
+        return {"sessionID": sessionID}
+
+    def api_deleteSession(self, sessionID):
+        if self.sessions.pop(sessionID, None) is None:
+            raise ApiError("sessionID does not exist")
+
+    def api_getSessionInfo(self, sessionID):
+        if sessionID not in self.sessions:
+            raise ApiError("sessionID does not exist")
+        return self.sessions[sessionID]
+
+    def api_listSessionsOfGroup(self, groupID):
+        if groupID not in self.groups:
+            raise ApiError("groupID does not exist")
+        return {s: info for s, info in self.sessions.items() if info["groupID"] == groupID} or None
+
+    def api_listSessionsOfAuthor(self, authorID):
+        if authorID not in self.authors:
+            raise ApiError("authorID does not exist")
+        return {s: info for s, info in self.sessions.items() if info["authorID"] == authorID} or None
+
+    # PAD CONTENT
+
+    def api_getText(self, padID, rev=None):
+        return {"text": self._revision(padID, rev)}
+
+    def api_setText(self, padID, text, authorID=None):
+        self._pad(padID)
+        self._commit(padID, text, authorID)
+
+    def api_appendText(self, padID, text, authorID=None):
+        self._commit(padID, self._pad(padID)[-1][:-1] + text, authorID)
+
+    def api_getHTML(self, padID, rev=None):
+        body = self._revision(padID, rev)[:-1].replace("\n", "<br>")
+        return {"html": "<!DOCTYPE HTML><html><body>%s<br></body></html>" % body}
+
+    def api_setHTML(self, padID, html, authorID=None):
+        self._pad(padID)
+        text = re.sub(r"<br\s*/?>", "\n", html)
+        self._commit(padID, html_unescape(re.sub(r"<[^>]*>", "", text)))
+
+    def api_getRevisionChangeset(self, padID, rev=None):
+        texts = self._pad(padID)
+        rev = len(texts) - 1 if rev is None or rev == "" else int(rev)
+        if rev >= len(texts):
+            raise ApiError("rev is higher than the head revision of the pad")
+        authors = self.revision_authors.get(padID, [])
+        authorID = authors[rev] if rev < len(authors) else None
+        attribs = "*" + base36(self._attribute(padID, "author", authorID)) if authorID else ""
+        return make_changeset(texts[rev - 1] if rev else "\n", texts[rev], attribs)
+
+    def _attribute(self, padID, key, value):
+        pool = self.pools.setdefault(padID, [])
+        if [key, value] not in pool:
+            pool.append([key, value])
+        return pool.index([key, value])
+
+    def api_getAttributePool(self, padID):
+        self._pad(padID)
+        pool = self.pools.get(padID, [])
+        return {"pool": {"numToAttrib": {str(num): attrib for num, attrib in enumerate(pool)}, "nextNum": len(pool)}}
+
+    def api_getRevisionsCount(self, padID):
+        return {"revisions": len(self._pad(padID)) - 1}
+
+    # CHAT
+
+    def api_getChatHistory(self, padID, start=None, end=None):
+        self._pad(padID)
+        messages = self.chat[padID]
+        if start is not None and end is not None:
+            messages = messages[int(start):int(end) + 1]
+        return {"messages": messages}
+
+    def api_getChatHead(self, padID):
+        self._pad(padID)
+        return {"chatHead": len(self.chat[padID]) - 1}
+
+    def api_appendChatMessage(self, padID, text, authorID, time=None):
+        self._pad(padID)
+        self.chat[padID].append({"text": text, "userId": authorID, "time": int(time or 0), "userName": None})
+
+    # PAD
+
+    def api_createPad(self, padID, text=None, authorID=None):
+        if padID in self.pads:
+            raise ApiError("padID does already exist")
+        self.pads[padID] = []
+        self.revision_authors[padID] = []
+        self._commit(padID, DEFAULT_TEXT if text is None else text, authorID)
+
+    def api_deletePad(self, padID):
+        self._pad(padID)
+        del self.pads[padID]
+
+    def api_copyPad(self, sourceID, destinationID, force="false"):
+        if destinationID in self.pads and force.lower() != "true":
+            raise ApiError("destinationID already exists")
+        self.pads[destinationID] = list(self._pad(sourceID))
+        self.revision_authors[destinationID] = list(self.revision_authors.get(sourceID, []))
+
+    def api_movePad(self, sourceID, destinationID, force="false"):
+        self.api_copyPad(sourceID, destinationID, force)
+        del self.pads[sourceID]
+
+    def api_padUsersCount(self, padID):
+        self._pad(padID)
+        return {"padUsersCount": 0}
+
+    def api_getLastEdited(self, padID):
+        self._pad(padID)
+        return {"lastEdited": self.last_edited[padID]}
+
+    def api_getReadOnlyID(self, padID):
+        self._pad(padID)
+        return {"readOnlyID": "r." + padID.encode().hex()[:16]}
+
+    def api_getPublicStatus(self, padID):
+        self._pad(padID)
+        return {"publicStatus": self.public.get(padID, False)}
+
+    def api_setPublicStatus(self, padID, publicStatus):
+        self._pad(padID)
+        self.public[padID] = publicStatus.lower() == "true"
+
+    def api_listAuthorsOfPad(self, padID):
+        self._pad(padID)
+        return {"authorIDs": sorted({authorID for authorID in self.revision_authors.get(padID, []) if authorID})}
+
+    def api_checkToken(self):
+        return None
+
+    # PADS
+
+    def api_listAllPads(self):
+        return {"padIDs": sorted(self.pads)}
+
+    # GLOBAL
+
+    def api_getStats(self):
+        return {"totalPads": len(self.pads), "totalSessions": 0, "totalActivePads": 0}
@@ -0,0 +1,153 @@
+"""Module to test the asyncio client against a local stand-in server."""
+
+import asyncio
+import os
+import tempfile
+import unittest
+import urllib.error
+
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.aio import AsyncEtherpadLiteClient
+from py_etherpad.history import read_revisions
+
+
+class TestAsyncEtherpadLiteClient(unittest.TestCase):
+    """Class to test AsyncEtherpadLiteClient."""
+
+    def testMethods(self):
+        """the inherited API methods are awaitable"""
+
+        async def scenario(client):
+            group = (await client.createGroup())["groupID"]
+            pad = (await client.createGroupPad(group, "Hairball", "meow"))["padID"]
+            self.assertEqual(await client.listPads(group), {"padIDs": [pad]})
+            self.assertEqual(await client.setText(pad, "purr"), None)
+            self.assertEqual(await client.getText(pad), {"text": "purr\n"})
+            self.assertEqual(await client.getText(pad, 0), {"text": "meow\n"})
+            self.assertEqual(await client.padUsersCount(pad), {"padUsersCount": 0})
+            with self.assertRaises(ValueError) as cm:
+                await client.getText("missing")
+            self.assertEqual(str(cm.exception), "padID does not exist")
+
+        with MockEtherpad() as server:
+            asyncio.run(self.run_client(server, scenario))
+
+    def testLargePost(self):
+        """texts above 8 KiB are sent in the POST body"""
+        text = "x" * 20000
+
+        async def scenario(client):
+            await client.createPad("large")
+            await client.setText("large", text)
+            self.assertEqual(await client.getText("large"), {"text": text + "\n"})
+
+        with MockEtherpad() as server:
+            asyncio.run(self.run_client(server, scenario))
+
+    def testConcurrency(self):
+        """a thousand concurrent calls share a bounded number of connections"""
+
+        async def scenario(client):
+            await client.createPad("busy", "hello")
+            results = await asyncio.gather(*(client.getText("busy") for _ in range(1000)))
+            self.assertEqual(results, [{"text": "hello\n"}] * 1000)
+            self.assertLessEqual(client.pool.connections_created, 20)
+
+        with MockEtherpad() as server:
+            asyncio.run(self.run_client(server, scenario, max_connections=20))
+            self.assertLessEqual(server.connections, 20)
+
+    def testResendAfterDisconnect(self):
+        """a reused connection dropped after the request is only resent for reads"""
+
+        async def scenario(client):
+            await client.createPad("dropped", "hello")
+            server.drop_next = 1
+            self.assertEqual(await client.getText("dropped"), {"text": "hello\n"})
+            self.assertEqual(server.calls["getText"], 2)
+            server.drop_next = 1
+            with self.assertRaises(ConnectionError):
+                await client.appendText("dropped", " world")
+            self.assertEqual(server.calls["appendText"], 1)
+
+        with MockEtherpad() as server:
+            asyncio.run(self.run_client(server, scenario))
+
+    def testRevisions(self):
+        """iter_revisions is an async iterator prefetching changesets, export_revisions resumes like the blocking one"""
+
+        async def scenario(client):
+            await client.createPad("history", "a")
+            for text in ("ab", "abc"):
+                await client.setText("history", text)
+            revisions = [rev async for rev, _ in client.iter_revisions("history", prefetch=2)]
+            self.assertEqual(revisions, [0, 1, 2])
+            self.assertEqual(server.calls["getRevisionChangeset"], 3)
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "history.ndjson.gz")
+                self.assertEqual(await client.export_revisions("history", path, checkpoint_every=2), 3)
+                await client.setText("history", "abcd")
+                self.assertEqual(await client.export_revisions("history", path), 1)
+                self.assertEqual([record["rev"] for record in read_revisions(path)], [0, 1, 2, 3])
+
+        with MockEtherpad() as server:
+            asyncio.run(self.run_client(server, scenario))
+
+    def testChat(self):
+        """iter_chat is an async iterator over pages, chat_since a coroutine"""
+
+        async def scenario(client):
+            await client.createPad("chatty")
+            authorID = (await client.createAuthor("talker"))["authorID"]
+            for i in range(25):
+                await client.appendChatMessage("chatty", "message %d" % i, authorID)
+            messages = [message["text"] async for _, message in client.iter_chat("chatty", page_size=10)]
+            self.assertEqual(messages, ["message %d" % i for i in range(25)])
+            self.assertEqual(server.calls["getChatHistory"], 3)
+            new = await client.chat_since("chatty", 22)
+            self.assertEqual([index for index, _ in new], [23, 24])
+
+        with MockEtherpad() as server:
+            asyncio.run(self.run_client(server, scenario))
+
+    def testServerClosedIdleConnection(self):
+        """an idle connection closed by the server is replaced before a write is sent on it"""
+
+        async def scenario(client):
+            await client.createPad("idle", "hello")
+            await asyncio.sleep(0.2)
+            await client.setText("idle", "again")
+            self.assertEqual(server.calls["setText"], 1)
+            self.assertEqual(server.connections, 2)
+
+        with MockEtherpad() as server:
+            server.keep_alive_timeout = 0.05
+            asyncio.run(self.run_client(server, scenario))
+
+    def testHTTPError(self):
+        """a wrong api key raises HTTPError"""
+
+        async def scenario():
+            async with AsyncEtherpadLiteClient("wrong", server.baseUrl) as client:
+                with self.assertRaises(urllib.error.HTTPError) as cm:
+                    await client.checkToken()
+                self.assertEqual(cm.exception.code, 401)
+
+        with MockEtherpad() as server:
+            asyncio.run(scenario())
+
+    def testBlockingWith(self):
+        """a plain with points to async with instead of leaving the pool open"""
+        client = AsyncEtherpadLiteClient(API_KEY, "http://127.0.0.1:9001/api")
+        with self.assertRaises(TypeError) as cm:
+            with client:
+                pass
+        self.assertIn("async with", str(cm.exception))
+
+    async def run_client(self, server, scenario, **kwargs):
+        async with AsyncEtherpadLiteClient(API_KEY, server.baseUrl, **kwargs) as client:
+            await scenario(client)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Module to test authorship analytics against a local stand-in server."""
+
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.authorship import AuthorNames, Authorship
+from py_etherpad.changeset import Changeset, base36
+
+
+class TestAuthorship(unittest.TestCase):
+    """Class to test Authorship on pads written by several authors."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+        self.ann = self.ep_client.createAuthor("Ann")["authorID"]
+        self.bob = self.ep_client.createAuthor("Bob")["authorID"]
+        self.ep_client.createPad("shared", "hello\n\n", self.ann)
+        self.ep_client.appendText("shared", "world\n", self.bob)
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testRuns(self):
+        authorship = Authorship(self.ep_client, "shared")
+        self.assertEqual(authorship.update(), 2)
+        text = self.ep_client.getText("shared")["text"]
+        self.assertEqual(text, "hello\nworld\n")
+        self.assertEqual(list(authorship.runs()), [(0, 6, self.ann), (6, 11, self.bob), (11, 12, "")])
+        self.assertEqual(authorship.author_at(7), self.bob)
+        self.assertEqual(len(authorship), len(text))
+
+    def testIncremental(self):
+        """only new revisions are fetched, deletions count against the author of the removed text"""
+        authorship = Authorship(self.ep_client, "shared")
+        authorship.update()
+        self.ep_client.setText("shared", "hello\nBob\n", self.ann)
+        self.assertEqual(authorship.update(), 1)
+        self.assertEqual(authorship.update(), 0)
+        self.assertEqual(self.server.calls["getRevisionChangeset"], 3)
+        self.assertEqual(self.server.calls["getAttributePool"], 1)
+
+        rows = {row["name"]: row for row in authorship.report()}
+        self.assertEqual((rows["Ann"]["chars"], rows["Ann"]["inserted"], rows["Ann"]["removed"]), (9, 9, 0))
+        self.assertEqual((rows["Bob"]["chars"], rows["Bob"]["inserted"], rows["Bob"]["removed"]), (0, 5, 5))
+        self.assertEqual([row["name"] for row in authorship.report()], ["Ann", "Bob"])
+        self.assertAlmostEqual(rows["Ann"]["share"], 9 / len(authorship))
+
+    def testReassign(self):
+        """a keep op with an author attribute changes the author, an empty author clears it"""
+        authorship = Authorship(self.ep_client, "shared")
+        authorship.update()
+        ann = authorship._number(self.ann)
+        clear = "*" + base36(authorship._pool.put("author", ""))
+        authorship.apply(Changeset.unpack("Z:c>0=2%s=3$" % clear))
+        self.assertEqual(list(authorship.runs())[:2], [(0, 2, self.ann), (2, 5, "")])
+        self.assertEqual(authorship.chars[ann], 3)  # "he" and the newline after "llo"
+        self.assertEqual(sum(authorship.chars), len(authorship))
+
+    def testNames(self):
+        """names are fetched once, unknown authors have none"""
+        names = AuthorNames(self.ep_client)
+        self.assertEqual(names.get([self.ann, self.bob, "a.missing"]),
+                         {self.ann: "Ann", self.bob: "Bob", "a.missing": None})
+        names.get([self.bob, self.ann])
+        self.assertEqual(self.server.calls["getAuthorName"], 3)
+
+        # Failed requests are not taken for authors without a name.
+        names = AuthorNames(self.ep_client)
+        self.server.fail_next = 1
+        self.assertEqual(names.get([self.ann]), {self.ann: None})
+        self.assertEqual(names.get([self.ann]), {self.ann: "Ann"})
+        self.assertEqual(self.server.calls["getAuthorName"], 5)
+
+    def testLongHistory(self):
+        """many small edits of several authors stay a few runs"""
+        for i in range(300):
+            self.ep_client.appendText("shared", "x", (self.ann, self.bob)[i // 100 % 2])
+        authorship = Authorship(self.ep_client, "shared", names=AuthorNames(self.ep_client))
+        authorship.update()
+        self.assertLessEqual(len(authorship.lengths), 6)
+        self.assertEqual(sum(authorship.chars), len(authorship))
+        self.assertEqual(len(authorship), len(self.ep_client.getText("shared")["text"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Module to test batch execution against a local stand-in server."""
+
+import asyncio
+import threading
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.aio import AsyncEtherpadLiteClient
+
+
+class TestBatch(unittest.TestCase):
+    """Class to test map, imap and batch of EtherpadLiteClient."""
+
+    def setUp(self):
+        self.server = MockEtherpad(latency=0.005).__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+        self.padIDs = ["pad%03d" % i for i in range(60)]
+        for padID in self.padIDs:
+            self.ep_client.createPad(padID, padID.upper())
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testMapOrderAndErrors(self):
+        """results keep the input order and failed items do not abort the batch"""
+        results = self.ep_client.map("getText", self.padIDs[:10] + ["missing"] + self.padIDs[10:])
+        self.assertEqual([r.index for r in results], list(range(61)))
+        self.assertEqual(results[0].value, {"text": "PAD000\n"})
+        self.assertEqual(results[11].value, {"text": "PAD010\n"})
+        self.assertFalse(results[10].ok)
+        self.assertEqual(str(results[10].error), "padID does not exist")
+        self.assertEqual(sum(r.ok for r in results), 60)
+
+    def testArguments(self):
+        """dicts are keyword arguments and tuples positional arguments"""
+        self.ep_client.setText("pad000", "second")
+        results = self.ep_client.map("getText", [{"padID": "pad000", "rev": 0}, ("pad000", 1)])
+        self.assertEqual([r.value["text"] for r in results], ["PAD000\n", "second\n"])
+
+    def testBatch(self):
+        """client.batch() proxies every client method"""
+        results = self.ep_client.batch(max_workers=4).deletePad(self.padIDs)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(self.ep_client.listAllPads(), {"padIDs": []})
+        with self.assertRaises(AttributeError):
+            self.ep_client.batch().noSuchMethod
+
+    def testImapBounded(self):
+        """imap streams results and never runs more than max_workers calls at once"""
+        running = []
+        peak = []
+        lock = threading.Lock()
+        getText = self.ep_client.getText
+
+        def tracked(padID):
+            with lock:
+                running.append(padID)
+                peak.append(len(running))
+            try:
+                return getText(padID)
+            finally:
+                with lock:
+                    running.remove(padID)
+
+        self.ep_client.getText = tracked
+        seen = [r.index for r in self.ep_client.imap("getText", iter(self.padIDs), max_workers=5, ordered=False)]
+        self.assertEqual(sorted(seen), list(range(60)))
+        self.assertLessEqual(max(peak), 5)
+
+    def testAsyncMap(self):
+        """the asyncio client maps with a bound on calls in flight"""
+
+        async def scenario():
+            async with AsyncEtherpadLiteClient(API_KEY, self.server.baseUrl) as client:
+                results = await client.map("getText", self.padIDs + ["missing"], max_workers=10)
+                self.assertEqual(results[59].value, {"text": "PAD059\n"})
+                self.assertFalse(results[60].ok)
+                streamed = [r.index async for r in client.imap("padUsersCount", self.padIDs, ordered=False)]
+                self.assertEqual(sorted(streamed), list(range(60)))
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+"""Module to smoke test the benchmark suite."""
+
+import json
+import os
+import tempfile
+import unittest
+
+import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    """Class to run every benchmark workload once with tiny sizes."""
+
+    def testReport(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.json")
+            self.assertEqual(benchmark.main(["--calls", "5", "--payload-size", "1000", "--output", path]), 0)
+            with open(path) as f:
+                report = json.load(f)
+            self.assertEqual(sorted(report["results"]), sorted(benchmark.WORKLOADS))
+            for result in report["results"].values():
+                self.assertEqual(result["errors"], 0)
+                self.assertGreater(result["calls"], 0)
+
+            # A baseline nobody can reach is reported as regression.
+            for result in report["results"].values():
+                result["throughput"] = 1e12
+            with open(path, "w") as f:
+                json.dump(report, f)
+            self.assertEqual(benchmark.main(["--calls", "5", "--workload", "small_get", "--compare", path,
+                                             "--output", path]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
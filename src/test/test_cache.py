@@ -0,0 +1,88 @@
+"""Module to test the response cache against a local stand-in server."""
+
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+    """Class to test ResponseCache through EtherpadLiteClient."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.clock = FakeClock()
+        self.cache = py_etherpad.ResponseCache(maxsize=4, clock=self.clock)
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, cache=self.cache)
+        self.ep_client.createPad("hot", "first")
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testHitsAndTTL(self):
+        """repeated reads are answered locally until the TTL expires"""
+        for _ in range(5):
+            self.assertEqual(self.ep_client.getText("hot"), {"text": "first\n"})
+            self.assertEqual(self.ep_client.getHtml("hot")["html"], "<!DOCTYPE HTML><html><body>first<br></body></html>")
+        self.assertEqual(self.server.calls["getText"], 1)
+        self.assertEqual(self.server.calls["getHTML"], 1)
+        self.assertEqual(self.cache.stats(), {"hits": 8, "misses": 2, "size": 2})
+
+        self.clock.now += 3
+        self.ep_client.getText("hot")
+        self.assertEqual(self.server.calls["getText"], 2)
+
+    def testUncachedFunctions(self):
+        """functions without a TTL always reach the server"""
+        self.ep_client.getRevisionsCount("hot")
+        self.ep_client.getRevisionsCount("hot")
+        self.assertEqual(self.server.calls["getRevisionsCount"], 2)
+        self.assertEqual(len(self.cache), 0)
+
+    def testInvalidation(self):
+        """mutating calls drop the cached responses of the touched pads"""
+        self.ep_client.getText("hot")
+        self.ep_client.setText("hot", "second")
+        self.assertEqual(self.ep_client.getText("hot"), {"text": "second\n"})
+        self.ep_client.appendText("hot", "!")
+        self.assertEqual(self.ep_client.getText("hot"), {"text": "second!\n"})
+
+        self.ep_client.getPublicStatus("hot")
+        self.ep_client.movePad("hot", "cold")
+        with self.assertRaises(ValueError):
+            self.ep_client.getPublicStatus("hot")
+        self.assertEqual(self.ep_client.getText("cold"), {"text": "second!\n"})
+
+    def testRevisionsNeverExpire(self):
+        """reads of an explicit rev are cached regardless of the TTL"""
+        self.ep_client.getText("hot", 0)
+        self.clock.now += 10 ** 6
+        self.assertEqual(self.ep_client.getText("hot", 0), {"text": "first\n"})
+        self.assertEqual(self.server.calls["getText"], 1)
+
+    def testLRU(self):
+        """the least recently used response is evicted first"""
+        for i in range(4):
+            self.ep_client.createPad("pad%d" % i, str(i))
+            self.ep_client.getText("pad%d" % i)
+        self.ep_client.getText("pad0")
+        self.ep_client.getText("hot")
+        self.assertEqual(len(self.cache), 4)
+        calls = self.server.calls["getText"]
+        self.ep_client.getText("pad0")
+        self.assertEqual(self.server.calls["getText"], calls)
+        self.ep_client.getText("pad1")
+        self.assertEqual(self.server.calls["getText"], calls + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Module to test the Easysync changeset library."""
+
+import random
+import unittest
+
+from mock_etherpad import make_changeset
+from py_etherpad import changeset
+from py_etherpad.changeset import AttributePool, Changeset, ChangesetError, Op
+
+
+class TestChangeset(unittest.TestCase):
+    """Class to test Changeset, compose and AttributePool."""
+
+    def testUnpack(self):
+        """packed changesets are parsed into ops and packed back unchanged"""
+        cs = Changeset.unpack("Z:c>6|1=6*0*1+6$brave ")
+        self.assertEqual((cs.old_len, cs.new_len, cs.char_bank), (12, 18, "brave "))
+        self.assertEqual(cs.ops, (Op("=", 6, 1, ""), Op("+", 6, 0, "*0*1")))
+        self.assertEqual(cs.pack(), "Z:c>6|1=6*0*1+6$brave ")
+        self.assertEqual(Changeset.unpack("Z:z<z$").new_len, 0)
+        for broken in ("Y:1>0$", "Z:1>1+1", "Z:1>1%1$x"):
+            with self.assertRaises(ChangesetError):
+                Changeset.unpack(broken)
+
+    def testApply(self):
+        cs = Changeset.unpack("Z:c<5|1-6=1+1$W")
+        self.assertEqual(cs.apply("hello\nworld\n"), "wWorld\n")
+        with self.assertRaises(ChangesetError):
+            cs.apply("hello\n")
+        with self.assertRaises(ChangesetError):
+            changeset.apply("Z:2>1+2$x", "a\n")
+
+    def testCompose(self):
+        """composing a chain gives the same text as applying it step by step and keeps ops line aligned"""
+        rng = random.Random(42)
+        for _ in range(300):
+            texts = ["".join(rng.choice("ab\n") for _ in range(rng.randint(0, 15))) + "\n" for _ in range(5)]
+            chain = [make_changeset(old, new) for old, new in zip(texts, texts[1:])]
+            composed = changeset.compose(chain)
+            self.assertEqual(composed.apply(texts[0]), texts[-1])
+            pos = bank = 0
+            for op in composed.ops:
+                if op.opcode == "+":
+                    chars = composed.char_bank[bank:bank + op.chars]
+                    bank += op.chars
+                else:
+                    chars = texts[0][pos:pos + op.chars]
+                    pos += op.chars
+                self.assertEqual(chars.count("\n"), op.lines)
+                if op.lines:
+                    self.assertTrue(chars.endswith("\n"))
+
+    def testComposeCancels(self):
+        """an insertion deleted again leaves an identity changeset"""
+        insert = Changeset.unpack("Z:1>3+3$abc")
+        delete = Changeset.unpack("Z:4<3-3$")
+        self.assertTrue(insert.compose(delete).is_identity())
+        with self.assertRaises(ChangesetError):
+            insert.compose(insert)
+
+    def testAttributePool(self):
+        pool = AttributePool.from_api({"pool": {"numToAttrib": {"0": ["author", "a.1"], "1": ["bold", "true"]},
+                                                "nextNum": 2}})
+        self.assertEqual(pool.resolve("*0*1"), (("author", "a.1"), ("bold", "true")))
+        self.assertEqual(pool.attributes("*1"), {"bold": "true"})
+        self.assertEqual(pool.attribs({"bold": "true", "author": "a.1"}), "*0*1")
+        self.assertEqual(pool.put("italic", "true"), 2)
+        with self.assertRaises(ChangesetError):
+            pool.resolve("*9")
+
+    def testComposeAttributes(self):
+        """with a pool, formatting applied to inserted text merges into the insertion"""
+        pool = AttributePool({"0": ["author", "a.1"], "1": ["bold", "true"], "2": ["bold", ""]})
+        insert = Changeset.unpack("Z:1>5*0+5$hello")
+        bold = Changeset.unpack("Z:6>0*1=3$")
+        composed = insert.compose(bold, pool)
+        self.assertEqual(composed.pack(), "Z:1>5*0*1+3*0+2$hello")
+        unbold = Changeset.unpack("Z:6>0*2=1$")
+        self.assertEqual(composed.compose(unbold, pool).pack(), "Z:1>5*0+1*0*1+2*0+2$hello")
+
+    def testLongText(self):
+        """applying thousands of ops to a long text stays linear"""
+        text = "word " * 200000 + "\n"
+        ops = "".join("=4+1=1" for _ in range(5000))
+        cs = Changeset.unpack("Z:%s>%s%s$%s" % (changeset.base36(len(text)), changeset.base36(5000), ops, "!" * 5000))
+        result = cs.apply(text)
+        self.assertEqual(len(result), len(text) + 5000)
+        self.assertTrue(result.startswith("word! word!"))
+
+
+if __name__ == "__main__":
+    unittest.main()
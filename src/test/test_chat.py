@@ -0,0 +1,62 @@
+"""Module to test paged chat history against a local stand-in server."""
+
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+
+
+class TestChat(unittest.TestCase):
+    """Class to test iter_chat and chat_since."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+        self.ep_client.createPad("chatty")
+        self.authorID = self.ep_client.createAuthor("talker")["authorID"]
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def say(self, count):
+        first = self.ep_client.getChatHead("chatty")["chatHead"] + 1
+        for i in range(first, first + count):
+            self.ep_client.appendChatMessage("chatty", "message %d" % i, self.authorID)
+
+    def testPages(self):
+        """the history is read in page_size windows"""
+        self.say(250)
+        messages = list(self.ep_client.iter_chat("chatty", page_size=100))
+        self.assertEqual([index for index, _ in messages], list(range(250)))
+        self.assertEqual([message["text"] for _, message in messages], ["message %d" % i for i in range(250)])
+        self.assertEqual(self.server.calls["getChatHistory"], 3)
+
+        window = list(self.ep_client.iter_chat("chatty", page_size=7, start=10, end=20))
+        self.assertEqual([index for index, _ in window], list(range(10, 21)))
+        self.assertEqual(window[0][1]["text"], "message 10")
+
+    def testEmpty(self):
+        self.assertEqual(list(self.ep_client.iter_chat("chatty")), [])
+        self.assertEqual(self.server.calls["getChatHistory"], 0)
+        with self.assertRaises(ValueError):
+            list(self.ep_client.iter_chat("missing"))
+
+    def testPolling(self):
+        """chat_since only returns what is new since the last poll"""
+        last = -1
+        self.assertEqual(self.ep_client.chat_since("chatty", last), [])
+        self.say(3)
+        new = self.ep_client.chat_since("chatty", last)
+        self.assertEqual([index for index, _ in new], [0, 1, 2])
+        last = new[-1][0]
+
+        self.assertEqual(self.ep_client.chat_since("chatty", last), [])
+        self.say(150)
+        new = self.ep_client.chat_since("chatty", last, page_size=50)
+        self.assertEqual([index for index, _ in new], list(range(3, 153)))
+        self.assertEqual(new[0][1]["text"], "message 3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Module to test the JSON backends against a local stand-in server."""
+
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad import codec
+
+
+class TestCodec(unittest.TestCase):
+    """Class to test decoding responses with every installed JSON backend."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def testBackends(self):
+        text = "äöü ☃ \"quoted\"\n" * 100
+        for backend in codec.BACKENDS:
+            with self.subTest(backend=backend):
+                with py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, json_backend=backend) as client:
+                    client.createPad(backend, text)
+                    self.assertEqual(client.getText(backend), {"text": text})
+                    with self.assertRaises(ValueError):
+                        client.getText("missing")
+
+    def testDefault(self):
+        """the fastest installed backend is the default"""
+        self.assertIs(codec.get_loads(), codec.get_loads(next(iter(codec.BACKENDS))))
+        if codec.orjson is not None:
+            self.assertIs(codec.get_loads(), codec.orjson.loads)
+        with self.assertRaises(ValueError):
+            codec.get_loads("missing")
+
+    def testInvalid(self):
+        for loads in codec.BACKENDS.values():
+            with self.assertRaises(ValueError):
+                loads(b"{invalid")
+            self.assertEqual(loads('{"text": "ä"}'.encode()), {"text": "ä"})
+
+
+if __name__ == "__main__":
+    unittest.main()
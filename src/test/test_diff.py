@@ -0,0 +1,71 @@
+"""Module to test local revision diffs against a local stand-in server."""
+
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.changeset import Changeset
+from py_etherpad.diff import RevisionDiffer, render_html, render_text, segments
+
+
+class TestRevisionDiffer(unittest.TestCase):
+    """Class to test RevisionDiffer on a pad with a few hundred revisions."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+        self.ep_client.createPad("busy", "line 0\n")
+        for i in range(1, 250):
+            if i % 10 == 0:
+                self.ep_client.setText("busy", "rewritten %d\n" % i)
+            else:
+                self.ep_client.appendText("busy", "line %d\n" % i)
+        self.texts = [self.ep_client.getText("busy", rev)["text"] for rev in range(250)]
+        self.differ = RevisionDiffer(self.ep_client, checkpoint_every=100)
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testText(self):
+        for rev in (0, 1, 99, 100, 249, 150):
+            self.assertEqual(self.differ.text("busy", rev), self.texts[rev])
+        self.assertEqual(sorted(self.differ._pads["busy"].snapshots), [0, 100, 200])
+        self.assertEqual(self.server.calls["getRevisionChangeset"], 250)
+
+    def testRanges(self):
+        """any range matches the texts and every changeset is fetched once"""
+        for start, end in ((0, 249), (5, 7), (12, 19), (95, 205), (100, 200), (150, 150), (0, 249)):
+            diff = self.differ.diff("busy", start, end)
+            self.assertEqual("".join(part for opcode, part in diff if opcode != "+"), self.texts[start])
+            self.assertEqual("".join(part for opcode, part in diff if opcode != "-"), self.texts[end])
+        self.assertEqual(self.server.calls["getRevisionChangeset"], 250)
+        self.assertEqual(self.differ.fetched, 250)
+        self.assertEqual(self.server.calls["createDiffHTML"], 0)
+
+    def testBlocks(self):
+        """a block is composed once and reused by the ranges covering it"""
+        self.differ.changeset("busy", 0, 249)
+        self.assertEqual(self.server.calls["getRevisionChangeset"], 249)
+        self.assertEqual(sorted(self.differ._pads["busy"].blocks), [0, 1])
+        # The changesets covered by known blocks are not needed again.
+        self.differ.forget("busy")
+        self.differ.changeset("busy", 100, 200)
+        self.assertEqual(self.server.calls["getRevisionChangeset"], 349)
+
+    def testHead(self):
+        self.ep_client.appendText("busy", "<new> & more")
+        self.assertEqual(self.differ.diff_text("busy", 249), self.texts[249][:-1] + "{+<new> & more+}\n")
+        self.assertTrue(self.differ.diff_html("busy", 249).endswith("<ins>&lt;new&gt; &amp; more</ins><br>"))
+        with self.assertRaises(ValueError):
+            self.differ.diff("busy", 10, 5)
+
+    def testRender(self):
+        diff = segments(Changeset.unpack("Z:8>1=2-2+3$abc"), "a <b>\ncd")
+        self.assertEqual(diff, [("=", "a "), ("-", "<b"), ("+", "abc"), ("=", ">\ncd")])
+        self.assertEqual(render_text(diff), "a [-<b-]{+abc+}>\ncd")
+        self.assertEqual(render_html(diff), "a <del>&lt;b</del><ins>abc</ins>&gt;<br>cd")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Module to test the multiprocess export against a local stand-in server."""
+
+import os
+import tempfile
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.export import export_instance, pad_path
+
+
+def shout(padID, fmt, content):
+    return content.upper() if fmt == "txt" else content
+
+
+class TestExport(unittest.TestCase):
+    """Class to test export_instance with two worker processes."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+        self.padIDs = ["pad-%03d" % i for i in range(30)]
+        self.ep_client.map("createPad", [(padID, "text of %s" % padID) for padID in self.padIDs])
+        self.groupID = self.ep_client.createGroup()["groupID"]
+        self.ep_client.createGroupPad(self.groupID, "notes", "group notes")
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testExport(self):
+        progress = []
+        stats = export_instance(API_KEY, self.server.baseUrl, self.directory.name, processes=2, threads=4,
+                                chunk_size=7, progress=progress.append)
+        self.assertEqual((stats["pads"], stats["failed"]), (31, {}))
+        self.assertEqual(len(progress), 5)
+        self.assertGreater(stats["pads_per_second"], 0)
+        self.assertEqual(len(os.listdir(self.directory.name)), 62)
+        with open(pad_path(self.directory.name, "pad-007", "txt")) as f:
+            self.assertEqual(f.read(), "text of pad-007\n")
+        with open(pad_path(self.directory.name, self.groupID + "$notes", "html")) as f:
+            self.assertEqual(f.read(), "<!DOCTYPE HTML><html><body>group notes<br></body></html>")
+        self.assertEqual(stats["bytes"], sum(os.path.getsize(os.path.join(self.directory.name, name))
+                                             for name in os.listdir(self.directory.name)))
+
+    def testTransformAndFailures(self):
+        stats = export_instance(API_KEY, self.server.baseUrl, self.directory.name, ["pad-001", "missing"],
+                                formats=("txt",), processes=1, transform=shout)
+        self.assertEqual(stats["pads"], 1)
+        self.assertEqual(stats["failed"], {"missing": "ValueError: padID does not exist"})
+        with open(pad_path(self.directory.name, "pad-001", "txt")) as f:
+            self.assertEqual(f.read(), "TEXT OF PAD-001\n")
+        with self.assertRaises(ValueError):
+            export_instance(API_KEY, self.server.baseUrl, self.directory.name, formats=("pdf",))
+
+
+if __name__ == "__main__":
+    unittest.main()
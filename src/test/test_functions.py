@@ -0,0 +1,78 @@
+"""Module to test the per-function spec table and the call path against a local stand-in server."""
+
+import unittest
+import urllib.error as urllib_error
+import urllib.parse as urllib_parse
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.functions import FUNCTIONS, compile_specs, parse_version
+from py_etherpad.upload import encode_form
+
+
+class TestFunctions(unittest.TestCase):
+    """Class to test version gating, parameter handling and form encoding."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testSpecs(self):
+        self.assertEqual(self.ep_client.API_VERSION, (1, 3, 0))
+        specs = compile_specs("http://host/api", "/api", "1.2.8")
+        self.assertEqual(specs["getText"].path, "/api/1.2.8/getText")
+        self.assertEqual(specs["getText"].url, "http://host/api/1.2.8/getText")
+        self.assertEqual(specs["setText"].dropped, {"authorID"})
+        self.assertNotIn("getStats", specs)
+        self.assertEqual(set(compile_specs("http://host/api", "/api", "1.3.0")), set(FUNCTIONS))
+        self.assertEqual(parse_version("1.2.15"), (1, 2, 15))
+
+    def testVersionGating(self):
+        """an older API version leaves out newer parameters and refuses newer functions"""
+        client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, api_version="1.2.13")
+        self.assertEqual(client._params("createPad", {"padID": "gated", "authorID": "a.author"}), {"padID": "gated"})
+        client.createPad("gated", "hello", authorID="a.author")
+        self.assertEqual(self.ep_client.getText("gated"), {"text": "hello\n"})
+        with self.assertRaises(ValueError):
+            client.getStats()
+        client.close()
+
+        # Versions compare as numbers, 2.0 is newer than 1.3.
+        client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, api_version="2.0.0")
+        self.assertEqual(client._params("setText", {"authorID": "a.author"}), {"authorID": "a.author"})
+
+    def testParamsUntouched(self):
+        """call leaves the parameters of the caller as they are"""
+        self.ep_client.createPad("untouched")
+        params = {"padID": "untouched"}
+        self.ep_client.call("getText", params)
+        post = {"POST": {"text": "posted"}, "padID": "untouched"}
+        self.ep_client.call("setText", post)
+        self.assertEqual(params, {"padID": "untouched"})
+        self.assertEqual(post, {"POST": {"text": "posted"}, "padID": "untouched"})
+        self.assertEqual(self.ep_client.getText("untouched"), {"text": "posted\n"})
+
+    def testUnknownFunction(self):
+        """functions missing from the table are still sent"""
+        with self.assertRaises(urllib_error.HTTPError):
+            self.ep_client.call("notAFunction")
+        self.assertEqual(self.server.calls["notAFunction"], 1)
+
+    def testEncodeForm(self):
+        fields = [
+            {"padID": "plain", "rev": 3, "force": False, "apikey": "k-1.x_~"},
+            {"text": "äöü & = + % / ?\n", "padID": "with space"},
+            {"values": ["a", "b"], "padID": b"bytes"},
+            {"time": 1.5, "none": None},
+        ]
+        for field in fields:
+            for doseq in (False, True):
+                self.assertEqual(encode_form(field, doseq), urllib_parse.urlencode(field, doseq))
+
+
+if __name__ == "__main__":
+    unittest.main()
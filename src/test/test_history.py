@@ -0,0 +1,85 @@
+"""Module to test streaming revision export against a local stand-in server."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad import changeset
+from py_etherpad.history import read_revisions
+
+
+class TestHistory(unittest.TestCase):
+    """Class to test iter_revisions and export_revisions."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+        self.ep_client.createPad("history", "rev 0")
+        for rev in range(1, 40):
+            self.ep_client.appendText("history", "\nrev %d" % rev)
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testIterRevisions(self):
+        """revisions arrive in order and replay to the head text"""
+        text = "\n"
+        revs = []
+        for rev, cs in self.ep_client.iter_revisions("history", prefetch=4):
+            revs.append(rev)
+            text = changeset.apply(cs, text)
+        self.assertEqual(revs, list(range(40)))
+        self.assertEqual(text, self.ep_client.getText("history")["text"])
+        self.assertEqual([rev for rev, _ in self.ep_client.iter_revisions("history", 5, 7)], [5, 6, 7])
+
+    def testIterRevisionsError(self):
+        with self.assertRaises(ValueError):
+            list(self.ep_client.iter_revisions("history", 38, 45))
+
+    def export(self, name):
+        path = os.path.join(self.tmp, name)
+        self.assertEqual(self.ep_client.export_revisions("history", path, end=24, checkpoint_every=10), 25)
+
+        # Simulate a crash after revision 24 was written but before its checkpoint.
+        with open(path + ".checkpoint", "w") as f:
+            f.write('{"padID": "history", "rev": 19, "offset": %d}' % self.offset_of(path, name))
+        with open(path, "ab") as f:
+            f.write(b"garbage")
+
+        self.assertEqual(self.ep_client.export_revisions("history", path, checkpoint_every=10), 20)
+        self.assertEqual(self.ep_client.export_revisions("history", path), 0)
+        self.ep_client.appendText("history", "\nrev 40")
+        self.assertEqual(self.ep_client.export_revisions("history", path), 1)
+
+        records = list(read_revisions(path))
+        self.assertEqual([r["rev"] for r in records], list(range(41)))
+        self.assertEqual(records[3]["changeset"], self.ep_client.getRevisionChangeset("history", 3))
+
+    def offset_of(self, path, name):
+        # export() wrote checkpoints after revisions 9, 19 and 24; recompute the offset after 19.
+        scratch = os.path.join(self.tmp, "scratch-" + name)
+        self.ep_client.export_revisions("history", scratch, end=19, checkpoint_every=10)
+        return os.path.getsize(scratch)
+
+    def testExportPlain(self):
+        self.export("history.ndjson")
+
+    def testExportCompressed(self):
+        self.export("history.ndjson.gz")
+
+    def testCheckpointOfOtherPad(self):
+        path = os.path.join(self.tmp, "history.ndjson")
+        self.ep_client.export_revisions("history", path)
+        self.ep_client.createPad("other")
+        with self.assertRaises(ValueError):
+            self.ep_client.export_revisions("other", path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Module to test the mapper ID cache against a local stand-in server."""
+
+import os
+import tempfile
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+
+
+class TestMapperCache(unittest.TestCase):
+    """Class to test MapperCache through EtherpadLiteClient."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.mappers = py_etherpad.MapperCache(maxsize=3)
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, mapper_cache=self.mappers)
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testGroups(self):
+        """the groupID of a mapper is asked for once"""
+        groupID = self.ep_client.createGroupIfNotExistsFor("team-1")["groupID"]
+        for _ in range(5):
+            self.assertEqual(self.ep_client.createGroupIfNotExistsFor("team-1"), {"groupID": groupID})
+        self.assertEqual(self.server.calls["createGroupIfNotExistsFor"], 1)
+        self.assertEqual(self.mappers.stats(), {"hits": 5, "misses": 1, "size": 1})
+
+    def testAuthors(self):
+        """a new name is still sent to the server"""
+        authorID = self.ep_client.createAuthorIfNotExistsFor("user-1", "Ann")["authorID"]
+        self.assertEqual(self.ep_client.createAuthorIfNotExistsFor("user-1"), {"authorID": authorID})
+        self.assertEqual(self.ep_client.createAuthorIfNotExistsFor("user-1", "Ann"), {"authorID": authorID})
+        self.assertEqual(self.server.calls["createAuthorIfNotExistsFor"], 1)
+        self.assertEqual(self.ep_client.createAuthorIfNotExistsFor("user-1", "Bob"), {"authorID": authorID})
+        self.assertEqual(self.ep_client.getAuthorName(authorID), "Bob")
+        self.ep_client.createAuthorIfNotExistsFor("user-1", "Bob")
+        self.assertEqual(self.server.calls["createAuthorIfNotExistsFor"], 2)
+
+    def testDeleteGroup(self):
+        """deleteGroup drops the mapping, so is a group deleted by another client once it is used"""
+        groupID = self.ep_client.createGroupIfNotExistsFor("team-1")["groupID"]
+        self.ep_client.deleteGroup(groupID)
+        second = self.ep_client.createGroupIfNotExistsFor("team-1")["groupID"]
+        self.assertNotEqual(second, groupID)
+
+        del self.server.groups[second]
+        with self.assertRaises(ValueError):
+            self.ep_client.createGroupPad(second, "notes")
+        self.assertNotEqual(self.ep_client.createGroupIfNotExistsFor("team-1")["groupID"], second)
+        self.assertEqual(self.server.calls["createGroupIfNotExistsFor"], 3)
+
+    def testEviction(self):
+        groupIDs = [self.ep_client.createGroupIfNotExistsFor("team-%d" % i)["groupID"] for i in range(4)]
+        self.assertEqual(len(self.mappers), 3)
+        self.assertEqual(self.ep_client.createGroupIfNotExistsFor("team-0"), {"groupID": groupIDs[0]})
+        self.assertEqual(self.server.calls["createGroupIfNotExistsFor"], 5)
+
+    def testPersistence(self):
+        """mappings stored on disk are used by a new cache"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "mappers.sqlite")
+            for attempt in range(2):
+                mappers = py_etherpad.MapperCache(path=path)
+                client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, mapper_cache=mappers)
+                groupID = client.createGroupIfNotExistsFor("team-1")["groupID"]
+                authorID = client.createAuthorIfNotExistsFor("user-1", "Ann")["authorID"]
+                if attempt == 1:
+                    client.deleteGroup(groupID)
+                mappers.close()
+            self.assertEqual(self.server.calls["createGroupIfNotExistsFor"], 1)
+            self.assertEqual(self.server.calls["createAuthorIfNotExistsFor"], 1)
+
+            mappers = py_etherpad.MapperCache(path=path)
+            client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, mapper_cache=mappers)
+            self.assertNotEqual(client.createGroupIfNotExistsFor("team-1")["groupID"], groupID)
+            self.assertEqual(client.createAuthorIfNotExistsFor("user-1"), {"authorID": authorID})
+            mappers.clear()
+            client.createAuthorIfNotExistsFor("user-1")
+            mappers.close()
+            self.assertEqual(self.server.calls["createAuthorIfNotExistsFor"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Module to test call hooks and the metrics collector against a local stand-in server."""
+
+import asyncio
+import unittest
+import urllib.error
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.aio import AsyncEtherpadLiteClient
+from py_etherpad.metrics import CallEvent, MetricsCollector
+
+
+class TestMetrics(unittest.TestCase):
+    """Class to test add_hook and MetricsCollector."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testHooks(self):
+        """pre and post hooks see every request with sizes, status and duration"""
+        pre = []
+        post = []
+        self.ep_client.add_hook(pre=lambda function, size: pre.append((function, size)), post=post.append)
+        self.ep_client.createPad("measured", "hello")
+        with self.assertRaises(ValueError):
+            self.ep_client.getText("missing")
+
+        self.assertEqual([function for function, _ in pre], ["createPad", "getText"])
+        self.assertEqual(pre[0][1], len("padID=measured&text=hello&apikey=" + API_KEY))
+        created, failed = post
+        self.assertIsInstance(created, CallEvent)
+        self.assertEqual((created.function, created.status, created.error), ("createPad", 200, None))
+        self.assertEqual(created.response_bytes, len(b'{"code": 0, "message": "ok", "data": null}'))
+        self.assertGreater(created.duration, 0)
+        self.assertEqual(failed.status, 200)
+        self.assertIsInstance(failed.error, ValueError)
+
+    def testCollector(self):
+        collector = MetricsCollector(buckets=(0.001, 10)).install(self.ep_client)
+        self.ep_client.createPad("measured")
+        for _ in range(3):
+            self.ep_client.getText("measured")
+        self.server.fail_next = 1
+        with self.assertRaises(urllib.error.HTTPError):
+            self.ep_client.getText("measured")
+
+        metrics = collector.as_dict()
+        self.assertEqual(sorted(metrics), ["createPad", "getText"])
+        getText = metrics["getText"]
+        self.assertEqual((getText["count"], getText["errors"]), (4, 1))
+        self.assertEqual(getText["statuses"], {200: 3, 503: 1})
+        self.assertEqual(getText["buckets"][float("inf")], 4)
+        self.assertEqual(getText["buckets"][10], 4)
+        self.assertIn(collector.quantile("getText", 0.5), (0.001, 10))
+        self.assertIsNone(collector.quantile("getHTML", 0.5))
+
+        text = collector.prometheus()
+        self.assertIn('etherpad_client_request_duration_seconds_bucket{function="getText",le="+Inf"} 4', text)
+        self.assertIn('etherpad_client_request_duration_seconds_count{function="createPad"} 1', text)
+        self.assertIn('etherpad_client_errors_total{function="getText"} 1', text)
+        self.assertIn('etherpad_client_responses_total{function="getText",status="503"} 1', text)
+
+    def testAsyncHooks(self):
+        collector = MetricsCollector()
+
+        async def scenario():
+            async with AsyncEtherpadLiteClient(API_KEY, self.server.baseUrl) as client:
+                collector.install(client)
+                await client.createPad("measured")
+                await asyncio.gather(*(client.getText("measured") for _ in range(5)))
+
+        asyncio.run(scenario())
+        self.assertEqual(collector.as_dict()["getText"]["count"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
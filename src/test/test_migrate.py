@@ -0,0 +1,115 @@
+"""Module to test backups and migrations against local stand-in servers."""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad import migrate
+
+
+class TestMigrate(unittest.TestCase):
+    """Class to test backup, restore and migrate between two instances."""
+
+    def setUp(self):
+        self.source_server = MockEtherpad().__enter__()
+        self.target_server = MockEtherpad().__enter__()
+        self.source = py_etherpad.EtherpadLiteClient(API_KEY, self.source_server.baseUrl)
+        self.target = py_etherpad.EtherpadLiteClient(API_KEY, self.target_server.baseUrl)
+        self.padIDs = ["pad-%03d" % i for i in range(40)]
+        self.source.map("createPad", [(padID, "text of %s" % padID) for padID in self.padIDs])
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "pads.backup.gz")
+
+    def tearDown(self):
+        self.directory.cleanup()
+        self.source.close()
+        self.target.close()
+        self.source_server.__exit__()
+        self.target_server.__exit__()
+
+    def testBackupRestore(self):
+        report = migrate.backup(self.source, self.path, checkpoint_every=7)
+        self.assertEqual((report["done"], report["failed"]), (40, {}))
+        records = list(migrate.read_backup(self.path))
+        self.assertEqual(sorted(record["padID"] for record in records), self.padIDs)
+        self.assertEqual(records[0]["text"], "text of %s\n" % records[0]["padID"])
+        index = migrate.read_index(self.path)
+        self.assertEqual(len(index), 40)
+        self.assertEqual(index[0], {"padID": records[0]["padID"], "size": len(records[0]["text"]), "offset": 0})
+        for entry, record in zip(index, records):
+            self.assertEqual(migrate.read_record(self.path, entry["offset"]), record)
+
+        report = migrate.restore(self.target, self.path)
+        self.assertEqual(report["done"], 40)
+        self.assertEqual(self.target.listAllPads()["padIDs"], self.padIDs)
+        self.assertEqual(self.target.getText("pad-005"), {"text": "text of pad-005\n"})
+
+        report = migrate.restore(self.target, self.path, lambda padID: "copy-" + padID, ["pad-005", "pad-017"])
+        self.assertEqual(report["done"], 2)
+        self.assertEqual(self.target.getText("copy-pad-017"), {"text": "text of pad-017\n"})
+
+    def testResumeBackup(self):
+        """an interrupted backup keeps the pads up to its checkpoint and a later run adds new pads"""
+        migrate.backup(self.source, self.path, self.padIDs[:10], checkpoint_every=4)
+        with open(self.path + ".checkpoint") as f:
+            checkpoint = f.read()
+        with open(self.path, "ab") as f:
+            f.write(b"\x1f\x8b\x08\x00 cut off")
+        self.assertIsNone(migrate.read_index(self.path))
+        self.assertEqual(migrate.backup(self.source, self.path, dry_run=True), self.padIDs[10:])
+
+        calls = self.source_server.calls["getText"]
+        report = migrate.backup(self.source, self.path, checkpoint_every=4)
+        self.assertEqual((report["done"], report["skipped"]), (30, 10))
+        self.assertEqual(self.source_server.calls["getText"] - calls, 30)
+        self.assertEqual(sorted(entry["padID"] for entry in migrate.read_index(self.path)), self.padIDs)
+        self.assertEqual(len(list(migrate.read_backup(self.path))), 40)
+        entry = migrate.read_index(self.path)[25]
+        self.assertEqual(migrate.read_record(self.path, entry["offset"])["padID"], entry["padID"])
+        self.assertNotEqual(checkpoint, open(self.path + ".checkpoint").read())
+
+    def testMigrateToGroup(self):
+        """pads are written into a group of another instance, failures are left for the next run"""
+        groupID = self.target.createGroup()["groupID"]
+        self.target.createGroupPad(groupID, "pad-003", "already there")
+        checkpoint = os.path.join(self.directory.name, "migrated")
+        rename = migrate.into_group(groupID)
+        plan = migrate.migrate(self.source, self.target, rename=rename, checkpoint=checkpoint, dry_run=True)
+        self.assertEqual(plan[0], ("pad-000", groupID + "$pad-000"))
+
+        report = migrate.migrate(self.source, self.target, rename=rename, checkpoint=checkpoint)
+        self.assertEqual((report["done"], list(report["failed"])), (39, ["pad-003"]))
+        report = migrate.migrate(self.source, self.target, rename=rename, checkpoint=checkpoint, force=True)
+        self.assertEqual((report["done"], report["skipped"], report["failed"]), (1, 39, {}))
+        self.assertEqual(len(self.target.listPads(groupID)["padIDs"]), 40)
+        self.assertEqual(self.target.getText(groupID + "$pad-003"), {"text": "text of pad-003\n"})
+
+    def testMoveOnSameInstance(self):
+        groupID = self.source.createGroup()["groupID"]
+        report = migrate.migrate(self.source, padIDs=self.padIDs[:5], rename=migrate.into_group(groupID), move=True)
+        self.assertEqual(report["done"], 5)
+        self.assertEqual(sorted(self.source.listPads(groupID)["padIDs"]),
+                         [groupID + "$" + padID for padID in self.padIDs[:5]])
+        self.assertNotIn("pad-000", self.source.listAllPads()["padIDs"])
+        self.assertEqual(self.source_server.calls["movePad"], 5)
+
+    def testCommandLine(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = migrate.main(["--url", self.source_server.baseUrl, "--apikey", API_KEY, "--max-workers", "1",
+                                   "backup", self.path])
+        self.assertEqual(status, 0)
+        self.assertIn("40 done, 0 failed", stderr.getvalue())
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            migrate.main(["--url", self.target_server.baseUrl, "--apikey", API_KEY, "--dry-run", "restore", self.path])
+        self.assertIn("pad-000 -> pad-000", stdout.getvalue())
+        self.assertEqual(self.target.listAllPads()["padIDs"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
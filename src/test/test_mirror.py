@@ -0,0 +1,61 @@
+"""Module to test incremental pad mirroring against a local stand-in server."""
+
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad import changeset
+from py_etherpad.mirror import PadMirror
+
+
+class TestPadMirror(unittest.TestCase):
+    """Class to test PadMirror."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+        self.ep_client.createPad("mirrored", "line one\nline two")
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testApply(self):
+        """changesets with line counts, deletions and insertions apply to the old text"""
+        self.assertEqual(changeset.apply("Z:c>6|1=6+6$brave ", "hello\nworld\n"), "hello\nbrave world\n")
+        self.assertEqual(changeset.apply("Z:c<6|1-6$", "hello\nworld\n"), "world\n")
+        with self.assertRaises(changeset.ChangesetError):
+            changeset.apply("Z:5>1+1$x", "hello\nworld\n")
+        with self.assertRaises(changeset.ChangesetError):
+            changeset.apply("Z:1>1!1$x", "\n")
+
+    def testIncrementalSync(self):
+        """after the first full download only changesets are transferred"""
+        mirror = PadMirror(self.ep_client, "mirrored")
+        self.assertTrue(mirror.sync())
+        self.assertEqual((mirror.text, mirror.rev, mirror.full_syncs), ("line one\nline two\n", 0, 1))
+
+        self.assertFalse(mirror.sync())
+        self.ep_client.appendText("mirrored", " and more")
+        self.ep_client.setText("mirrored", "line zero\nline one\nline two and more")
+        self.ep_client.appendText("mirrored", "\nline three")
+        self.assertTrue(mirror.sync())
+        self.assertEqual(mirror.text, self.ep_client.getText("mirrored")["text"])
+        self.assertEqual((mirror.rev, mirror.full_syncs, mirror.changesets_applied), (3, 1, 3))
+        self.assertEqual(self.server.calls["getText"], 2)
+
+    def testFallback(self):
+        """an unusable changeset chain falls back to a full download"""
+        mirror = PadMirror(self.ep_client, "mirrored", text="stale local copy\n", rev=0)
+        self.ep_client.setText("mirrored", "fresh")
+        mirror.sync()
+        self.assertEqual((mirror.text, mirror.rev, mirror.full_syncs), ("fresh\n", 1, 1))
+
+        self.ep_client.deletePad("mirrored")
+        self.ep_client.createPad("mirrored", "recreated")
+        mirror.sync()
+        self.assertEqual((mirror.text, mirror.rev, mirror.full_syncs), ("recreated\n", 0, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""Module to test the keep-alive connection pool against a local stand-in server."""
+
+import threading
+import time
+import unittest
+import urllib.error
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Class to test the pooled transport of EtherpadLiteClient."""
+
+    def testReuse(self):
+        """fifty calls on the pooled client share one connection"""
+        with MockEtherpad() as server:
+            with py_etherpad.EtherpadLiteClient(API_KEY, server.baseUrl) as client:
+                client.createPad("reuse", "hello")
+                for _ in range(50):
+                    self.assertEqual(client.getText("reuse"), {"text": "hello\n"})
+                self.assertEqual(server.connections, 1)
+                self.assertEqual(client.pool.connections_created, 1)
+
+    def testUnpooled(self):
+        """pooled=False keeps opening a connection per call"""
+        with MockEtherpad() as server:
+            client = py_etherpad.EtherpadLiteClient(API_KEY, server.baseUrl, pooled=False)
+            client.createPad("fresh")
+            for _ in range(5):
+                client.getRevisionsCount("fresh")
+            self.assertEqual(server.connections, 6)
+
+    def testLatency(self):
+        """with a costly handshake, reusing connections lowers the per-call latency"""
+        calls = 10
+        with MockEtherpad(connect_delay=0.02) as server:
+            timings = {}
+            for pooled in (False, True):
+                client = py_etherpad.EtherpadLiteClient(API_KEY, server.baseUrl, pooled=pooled)
+                client.checkToken()
+                start = time.perf_counter()
+                for _ in range(calls):
+                    client.checkToken()
+                timings[pooled] = (time.perf_counter() - start) / calls
+                client.close()
+            self.assertGreater(timings[False], 0.02)
+            self.assertLess(timings[True], timings[False] / 2)
+
+    def testMaxConnections(self):
+        """concurrent threads never open more connections than allowed"""
+        with MockEtherpad(latency=0.01) as server:
+            client = py_etherpad.EtherpadLiteClient(API_KEY, server.baseUrl, max_connections=3)
+            threads = [threading.Thread(target=lambda: [client.checkToken() for _ in range(5)]) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertLessEqual(server.connections, 3)
+            self.assertEqual(client.pool.requests, 40)
+            client.close()
+
+    def testIdleEviction(self):
+        """connections idle for longer than idle_timeout are replaced"""
+        with MockEtherpad() as server:
+            client = py_etherpad.EtherpadLiteClient(API_KEY, server.baseUrl, idle_timeout=0.05)
+            client.checkToken()
+            time.sleep(0.1)
+            client.checkToken()
+            self.assertEqual(server.connections, 2)
+            client.close()
+
+    def testResendAfterDisconnect(self):
+        """a reused connection dropped after the request is only resent for reads"""
+        with MockEtherpad() as server:
+            with py_etherpad.EtherpadLiteClient(API_KEY, server.baseUrl) as client:
+                client.createPad("dropped", "hello")
+                server.drop_next = 1
+                self.assertEqual(client.getText("dropped"), {"text": "hello\n"})
+                self.assertEqual(server.calls["getText"], 2)
+
+                server.drop_next = 1
+                with self.assertRaises(ConnectionError):
+                    client.appendText("dropped", " world")
+                self.assertEqual(server.calls["appendText"], 1)
+                self.assertEqual(client.getText("dropped"), {"text": "hello world\n"})
+
+    def testServerClosedIdleConnection(self):
+        """an idle connection closed by the server is replaced before a write is sent on it"""
+        with MockEtherpad() as server:
+            server.keep_alive_timeout = 0.05
+            with py_etherpad.EtherpadLiteClient(API_KEY, server.baseUrl) as client:
+                client.createPad("idle", "hello")
+                time.sleep(0.2)
+                client.setText("idle", "again")
+                self.assertEqual(server.calls["setText"], 1)
+                self.assertEqual(server.connections, 2)
+                self.assertEqual(client.getText("idle"), {"text": "again\n"})
+
+    def testErrors(self):
+        """API errors and HTTP errors surface like on the unpooled client"""
+        with MockEtherpad() as server:
+            client = py_etherpad.EtherpadLiteClient(API_KEY, server.baseUrl)
+            with self.assertRaises(ValueError) as cm:
+                client.getText("missing")
+            self.assertEqual(str(cm.exception), "padID does not exist")
+            with self.assertRaises(urllib.error.HTTPError) as cm:
+                py_etherpad.EtherpadLiteClient("wrong", server.baseUrl).checkToken()
+            self.assertEqual(cm.exception.code, 401)
+            client.close()
+            with self.assertRaises(ValueError):
+                client.checkToken()
+
+
+if __name__ == "__main__":
+    unittest.main()
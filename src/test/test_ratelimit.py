@@ -0,0 +1,126 @@
+"""Module to test rate limiting and adaptive concurrency."""
+
+import threading
+import time
+import unittest
+import urllib.error
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.ratelimit import AdaptiveConcurrency, RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRateLimit(unittest.TestCase):
+    """Class to test TokenBucket and RateLimiter."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def testBucket(self):
+        bucket = TokenBucket(rate=10, burst=3, clock=self.clock)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        self.assertAlmostEqual(bucket.reserve(), 0.2)
+        self.clock.now += 10
+        self.assertEqual(bucket.reserve(), 0)
+
+    def testPerFunction(self):
+        """per-function limits only slow down their function"""
+        limiter = RateLimiter(rate=100, burst=10, per_function={"setText": (2, 1)}, sleep=self.clock.sleep,
+                              clock=self.clock)
+        send = lambda function, params: function
+        for _ in range(3):
+            limiter.fetch("setText", {}, send)
+        self.assertAlmostEqual(self.clock.now, 1.0)
+        for _ in range(5):
+            limiter.fetch("getText", {}, send)
+        self.assertAlmostEqual(self.clock.now, 1.0)
+        self.assertAlmostEqual(limiter.waited, 1.0)
+
+    def testClient(self):
+        with MockEtherpad() as server:
+            limiter = RateLimiter(rate=100, burst=1)
+            with py_etherpad.EtherpadLiteClient(API_KEY, server.baseUrl, rate_limiter=limiter) as client:
+                client.createPad("limited")
+                start = time.monotonic()
+                client.map("getText", ["limited"] * 10, max_workers=4)
+                self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    """Class to test AdaptiveConcurrency."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.concurrency = AdaptiveConcurrency(initial=4, min_limit=1, max_limit=16, clock=self.clock)
+
+    def run_calls(self, count, latency, error=None):
+        def send(function, params):
+            self.clock.now += latency
+            if error is not None:
+                raise error
+        for _ in range(count):
+            try:
+                self.concurrency.fetch("getText", {}, send)
+            except Exception:
+                pass
+
+    def testAdapts(self):
+        """the limit grows while latency is flat and shrinks when it rises or the server is overloaded"""
+        self.run_calls(200, 0.01)
+        self.assertEqual(self.concurrency.limit, 16)
+        self.run_calls(40, 0.1)
+        self.assertEqual(self.concurrency.limit, 1)
+        self.run_calls(300, 0.01)
+        self.assertEqual(self.concurrency.limit, 16)
+        overloaded = urllib.error.HTTPError("url", 503, "busy", {}, None)
+        self.run_calls(1, 0.01, overloaded)
+        self.assertEqual(self.concurrency.limit, 8)
+        self.run_calls(1, 0.01, ValueError("padID does not exist"))
+        self.assertGreater(self.concurrency.limit, 8)
+        self.assertEqual(self.concurrency.in_flight, 0)
+
+    def testBoundsInFlight(self):
+        concurrency = AdaptiveConcurrency(initial=2, max_limit=2)
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def send(function, params):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+
+        threads = [threading.Thread(target=concurrency.fetch, args=("getText", {}, send)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max(peak), 2)
+
+    def testClient(self):
+        with MockEtherpad() as server:
+            concurrency = AdaptiveConcurrency(initial=2)
+            with py_etherpad.EtherpadLiteClient(API_KEY, server.baseUrl, concurrency=concurrency) as client:
+                client.createPad("adaptive")
+                results = client.map("getText", ["adaptive"] * 20, max_workers=8)
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(concurrency.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""Module to test retries and the circuit breaker against a local stand-in server."""
+
+import socket
+import time
+import unittest
+import urllib.error
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRetry(unittest.TestCase):
+    """Class to test RetryPolicy and CircuitBreaker through EtherpadLiteClient."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.clock = FakeClock()
+        self.policy = RetryPolicy(max_attempts=4, backoff=1, max_backoff=8, deadline=30, sleep=self.clock.sleep,
+                                  clock=self.clock)
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, retry=self.policy)
+        self.ep_client.createPad("flaky", "hello")
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testRetryReads(self):
+        """reads succeed once the server recovers"""
+        self.server.fail_next = 3
+        self.assertEqual(self.ep_client.getText("flaky"), {"text": "hello\n"})
+        self.assertEqual(self.policy.retries, 3)
+        self.assertEqual(self.clock.now, 3 * self.server.retry_after)
+
+        self.server.fail_next = 4
+        with self.assertRaises(urllib.error.HTTPError):
+            self.ep_client.getText("flaky")
+
+    def testNoRetryForWrites(self):
+        """mutating calls are not repeated by default"""
+        self.server.fail_next = 1
+        with self.assertRaises(urllib.error.HTTPError):
+            self.ep_client.setText("flaky", "again")
+        self.assertEqual(self.policy.retries, 0)
+
+    def testNoRetryForApiErrors(self):
+        with self.assertRaises(ValueError):
+            self.ep_client.getText("missing")
+        self.server.fail_status = 401
+        self.server.fail_next = 1
+        with self.assertRaises(urllib.error.HTTPError):
+            self.ep_client.getText("flaky")
+        self.assertEqual(self.policy.retries, 0)
+
+    def testDeadline(self):
+        """no retry starts after the deadline"""
+        self.policy.deadline = 0.5
+        self.server.fail_next = 1
+        self.server.fail_status = 429
+        with self.assertRaises(urllib.error.HTTPError):
+            self.ep_client.getText("flaky")
+        self.assertEqual(self.policy.retries, 0)
+
+    def testDeadlineBoundsAttempts(self):
+        """an attempt waits for the response no longer than the deadline allows"""
+        self.server.latency = 1.0
+        for pooled in (True, False):
+            with self.subTest(pooled=pooled):
+                policy = RetryPolicy(deadline=0.3)
+                client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, pooled=pooled, retry=policy)
+                start = time.monotonic()
+                with self.assertRaises(OSError):
+                    client.getText("flaky")
+                self.assertLess(time.monotonic() - start, 0.9)
+                client.close()
+
+    def testLargePostRetried(self):
+        """the POSTed parameters survive a retry"""
+        self.ep_client.setText("flaky", "x" * 10000)
+        self.server.fail_next = 1
+        params = {"POST": {"padID": "flaky"}}
+        self.assertEqual(self.ep_client.call("getText", params)["text"], "x" * 10000 + "\n")
+        self.assertEqual(self.policy.retries, 1)
+
+    def testCircuitBreaker(self):
+        """a dead server trips the breaker, which lets a trial call through after reset_timeout"""
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            dead = "http://127.0.0.1:%d/api" % s.getsockname()[1]
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=self.clock)
+        client = py_etherpad.EtherpadLiteClient(API_KEY, dead, retry=self.policy, circuit_breaker=breaker)
+        # The fourth attempt already finds the circuit open.
+        with self.assertRaises(CircuitOpenError):
+            client.getText("flaky")
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual((breaker.failures, self.policy.retries), (3, 3))
+        with self.assertRaises(CircuitOpenError):
+            client.getText("flaky")
+        self.assertEqual(self.policy.retries, 3)
+
+        # The server comes back.
+        self.clock.now += 10
+        client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, circuit_breaker=breaker)
+        self.assertEqual(client.getText("flaky"), {"text": "hello\n"})
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        # API errors mean the server is alive.
+        for _ in range(5):
+            with self.assertRaises(ValueError):
+                client.getText("missing")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Module to test the SessionManager against a local stand-in server."""
+
+import time
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+
+
+class TestSessionManager(unittest.TestCase):
+    """Class to test session reuse, bulk creation, logout and sweeping."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+        self.groupIDs = [self.ep_client.createGroup()["groupID"] for _ in range(5)]
+        self.authorID = self.ep_client.createAuthor("user")["authorID"]
+        self.now = time.time()
+        self.manager = py_etherpad.SessionManager(self.ep_client, lifetime=3600, renew_before=60,
+                                                  clock=lambda: self.now)
+
+    def tearDown(self):
+        self.manager.stop_sweeper()
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testReuse(self):
+        """a session is reused until renew_before seconds before it expires"""
+        sessionID = self.manager.session(self.groupIDs[0], self.authorID)
+        self.now += 3500
+        self.assertEqual(self.manager.session(self.groupIDs[0], self.authorID), sessionID)
+        self.assertEqual(self.server.calls["createSession"], 1)
+        self.now += 50
+        self.assertNotEqual(self.manager.session(self.groupIDs[0], self.authorID), sessionID)
+        self.assertEqual((self.manager.created, self.manager.reused), (2, 1))
+
+    def testBulk(self):
+        first = self.manager.session(self.groupIDs[0], self.authorID)
+        sessions = self.manager.sessions(self.authorID, self.groupIDs)
+        self.assertEqual(list(sessions), self.groupIDs)
+        self.assertEqual(sessions[self.groupIDs[0]], first)
+        self.assertEqual(self.server.calls["createSession"], 5)
+        for groupID, sessionID in sessions.items():
+            info = self.ep_client.getSessionInfo(sessionID)
+            self.assertEqual((info["groupID"], info["authorID"]), (groupID, self.authorID))
+        self.assertEqual(self.manager.cookie(self.authorID, self.groupIDs[:2]),
+                         ",".join(sessions[groupID] for groupID in self.groupIDs[:2]))
+
+    def testBulkError(self):
+        """the sessions created before an error are kept"""
+        with self.assertRaises(ValueError):
+            self.manager.sessions(self.authorID, self.groupIDs[:2] + ["g.missing"])
+        self.manager.sessions(self.authorID, self.groupIDs[:2])
+        self.assertEqual(self.server.calls["createSession"], 3)
+
+    def testEnd(self):
+        other = self.ep_client.createAuthor("other")["authorID"]
+        self.manager.sessions(self.authorID, self.groupIDs)
+        kept = self.manager.session(self.groupIDs[0], other)
+        self.ep_client.deleteSession(self.manager.session(self.groupIDs[1], self.authorID))
+        self.assertEqual(self.manager.end(self.authorID, self.groupIDs[:2]), 2)
+        self.assertEqual(self.manager.end(self.authorID), 3)
+        self.assertEqual(self.ep_client.listSessionsOfAuthor(self.authorID), None)
+        self.assertEqual(list(self.ep_client.listSessionsOfAuthor(other)), [kept])
+        self.manager.session(self.groupIDs[0], self.authorID)
+        self.assertEqual(self.server.calls["createSession"], 7)
+
+    def testSweep(self):
+        """expired sessions of every group are deleted, valid ones kept"""
+        expired = [self.ep_client.createSession(groupID, self.authorID, int(self.now) + 5)["sessionID"]
+                   for groupID in self.groupIDs]
+        valid = self.ep_client.createSession(self.groupIDs[0], self.authorID, int(self.now) + 7200)["sessionID"]
+        managed = self.manager.session(self.groupIDs[1], self.authorID)
+        self.now += 10
+        self.assertEqual(self.manager.sweep(), 5)
+        self.assertEqual(set(self.ep_client.listSessionsOfAuthor(self.authorID)), {valid, managed})
+        self.assertEqual(self.server.calls["listSessionsOfGroup"], 5)
+        self.assertFalse(set(expired) & set(self.server.sessions))
+        self.assertEqual(self.manager.sweep(self.groupIDs[:1] + ["g.missing"]), 0)
+
+    def testSweeper(self):
+        self.ep_client.createSession(self.groupIDs[0], self.authorID, int(self.now) + 5)
+        self.now += 10
+        with self.manager:
+            self.manager.start_sweeper(interval=0.01, groupIDs=self.groupIDs)
+            with self.assertRaises(RuntimeError):
+                self.manager.start_sweeper()
+            deadline = time.monotonic() + 5
+            while self.server.sessions and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(self.server.sessions, {})
+        self.assertIsNone(self.manager.sweep_error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+"""Module to test the sharded client against several local stand-in servers."""
+
+import time
+import unittest
+
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad import EtherpadLiteClient
+from py_etherpad.sharding import HashRing, ShardedEtherpadClient, shard_key
+
+
+class TestSharding(unittest.TestCase):
+    """Class to test ShardedEtherpadClient with three instances."""
+
+    def setUp(self):
+        self.servers = [MockEtherpad().__enter__() for _ in range(3)]
+        self.ep_client = ShardedEtherpadClient([(server.baseUrl, API_KEY) for server in self.servers])
+        self.by_url = {server.baseUrl: server for server in self.servers}
+
+    def tearDown(self):
+        self.ep_client.close()
+        for server in self.servers:
+            server.__exit__()
+
+    def server_of(self, key):
+        return self.by_url[self.ep_client.shard_for(key).baseUrl]
+
+    def testPadRouting(self):
+        """every pad lives on exactly one instance, the one its padID hashes to"""
+        padIDs = ["pad-%d" % i for i in range(60)]
+        for padID in padIDs:
+            self.ep_client.createPad(padID, padID)
+        for padID in padIDs:
+            self.assertEqual([padID in server.pads for server in self.servers].count(True), 1)
+            self.assertIn(padID, self.server_of(padID).pads)
+            self.assertEqual(self.ep_client.getText(padID), {"text": padID + "\n"})
+        self.assertTrue(all(server.pads for server in self.servers))
+
+        self.assertEqual(sorted(self.ep_client.listAllPads()["padIDs"]), sorted(padIDs))
+        self.assertEqual(sorted(self.ep_client.listAllPads(stream=True)["padIDs"]), sorted(padIDs))
+        self.assertEqual(self.ep_client.getStats()["totalPads"], 60)
+        results = self.ep_client.map("getText", padIDs)
+        self.assertEqual([result.value["text"] for result in results], [padID + "\n" for padID in padIDs])
+
+    def testGroups(self):
+        """groups and their pads live on the instance the groupID hashes to"""
+        groupIDs = [self.ep_client.createGroup()["groupID"] for _ in range(6)]
+        for groupID in groupIDs:
+            self.assertIn(groupID, self.server_of(groupID).groups)
+            padID = self.ep_client.createGroupPad(groupID, "notes", "hi")["padID"]
+            self.assertEqual(shard_key(padID), groupID)
+            self.assertEqual(self.ep_client.getText(padID), {"text": "hi\n"})
+            self.assertEqual(self.ep_client.listPads(groupID), {"padIDs": [padID]})
+        self.assertEqual(sorted(self.ep_client.listAllGroups()["groupIDs"]), sorted(groupIDs))
+
+        mapped = self.ep_client.createGroupIfNotExistsFor("team")["groupID"]
+        self.assertEqual(self.ep_client.createGroupIfNotExistsFor("team")["groupID"], mapped)
+        self.assertIn(mapped, self.server_of(mapped).groups)
+
+    def testExistingMappedGroups(self):
+        """existing groups of a groupMapper are kept wherever their groupID hashes to"""
+        server = self.servers[0]
+        with EtherpadLiteClient(API_KEY, server.baseUrl) as single:
+            mappers = [mapper for mapper in ("team-%d" % i for i in range(200))
+                       if self.server_of(mapper) is server][:40]
+            groupIDs = {}
+            for mapper in mappers:
+                groupIDs[mapper] = single.createGroupIfNotExistsFor(mapper)["groupID"]
+                single.createGroupPad(groupIDs[mapper], "notes", mapper)
+        moved = [groupID for groupID in groupIDs.values() if self.server_of(groupID) is not server]
+        self.assertTrue(moved)
+
+        for mapper, groupID in groupIDs.items():
+            self.assertEqual(self.ep_client.createGroupIfNotExistsFor(mapper), {"groupID": groupID})
+            self.assertEqual(self.ep_client.getText(groupID + "$notes"), {"text": mapper + "\n"})
+        self.assertEqual(len(server.groups), 40)
+        self.assertEqual(len(server.pads), 40)
+
+        # A client which did not create them finds them on the first miss.
+        moved = moved[0]
+        with ShardedEtherpadClient([(server.baseUrl, API_KEY) for server in self.servers]) as other:
+            self.assertEqual(other.listPads(moved), {"padIDs": [moved + "$notes"]})
+            other.createGroupPad(moved, "more")
+            self.assertIn(moved + "$more", server.pads)
+            with self.assertRaises(ValueError):
+                other.listPads("g.unknown")
+            # A missing pad of a group on its own instance costs no search.
+            placed = other.createGroup()["groupID"]
+            calls = sum(server.calls["listPads"] for server in self.servers)
+            with self.assertRaises(ValueError):
+                other.getText(placed + "$missing")
+            self.assertEqual(sum(server.calls["listPads"] for server in self.servers), calls)
+
+    def testSessions(self):
+        """sessions are found on whichever instance knows them"""
+        groupID = self.ep_client.createGroup()["groupID"]
+        authorID = self.ep_client.author_for_group(groupID, "someone", "Someone")["authorID"]
+        self.assertIn(authorID, self.server_of(groupID).authors)
+        sessionID = self.ep_client.createSession(groupID, authorID, int(time.time()) + 3600)["sessionID"]
+        self.assertEqual(self.ep_client.getSessionInfo(sessionID)["groupID"], groupID)
+        self.assertEqual(list(self.ep_client.listSessionsOfAuthor(authorID)), [sessionID])
+        self.ep_client.deleteSession(sessionID)
+        with self.assertRaises(ValueError):
+            self.ep_client.getSessionInfo(sessionID)
+
+    def testSessionOfForeignAuthor(self):
+        """an author of another instance gets a clear error instead of a session"""
+        groupID = self.ep_client.createGroup()["groupID"]
+        other = next(server for server in self.servers if server is not self.server_of(groupID))
+        authorID = self.ep_client.shards[other.baseUrl].createAuthor()["authorID"]
+        with self.assertRaises(ValueError) as cm:
+            self.ep_client.createSession(groupID, authorID, int(time.time()) + 3600)
+        self.assertIn("author_for_group", str(cm.exception))
+
+    def testAuthorListings(self):
+        """the pads and sessions of an author come from the instances which know the author"""
+        authorID = self.ep_client.createAuthor("someone")["authorID"]
+        server = next(server for server in self.servers if authorID in server.authors)
+        padID = next(padID for padID in ("pad-%d" % i for i in range(100)) if self.server_of(padID) is server)
+        self.ep_client.createPad(padID, "hi", authorID=authorID)
+        self.assertEqual(self.ep_client.listPadsOfAuthor(authorID), {"padIDs": [padID]})
+        self.assertIsNone(self.ep_client.listSessionsOfAuthor(authorID))
+        with self.assertRaises(ValueError):
+            self.ep_client.listPadsOfAuthor("a.unknown")
+        with self.assertRaises(ValueError):
+            self.ep_client.listSessionsOfAuthor("a.unknown")
+
+    def testCopy(self):
+        source = "source"
+        same = next(padID for padID in ("copy-%d" % i for i in range(100))
+                    if self.ep_client.shard_for(padID) is self.ep_client.shard_for(source))
+        other = next(padID for padID in ("copy-%d" % i for i in range(100))
+                     if self.ep_client.shard_for(padID) is not self.ep_client.shard_for(source))
+        self.ep_client.createPad(source, "copied")
+        self.ep_client.copyPad(source, same)
+        self.assertEqual(self.ep_client.getText(same), {"text": "copied\n"})
+        with self.assertRaises(ValueError):
+            self.ep_client.copyPad(source, other)
+
+
+class TestHashRing(unittest.TestCase):
+    """Class to test the consistent hash ring."""
+
+    def testBalanceAndStability(self):
+        keys = ["pad-%d" % i for i in range(3000)]
+        ring = HashRing(["a", "b", "c"])
+        before = {key: ring.node(key) for key in keys}
+        counts = [list(before.values()).count(node) for node in "abc"]
+        self.assertGreater(min(counts), 700)
+
+        grown = HashRing(["a", "b", "c", "d"])
+        moved = [key for key in keys if grown.node(key) != before[key]]
+        self.assertTrue(all(grown.node(key) == "d" for key in moved))
+        self.assertLess(len(moved), 0.35 * len(keys))
+
+        with self.assertRaises(ValueError):
+            HashRing([])
+
+
+if __name__ == "__main__":
+    unittest.main()
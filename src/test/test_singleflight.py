@@ -0,0 +1,76 @@
+"""Module to test request coalescing against a local stand-in server."""
+
+import threading
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Class to test the single_flight mode of EtherpadLiteClient."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, single_flight=True)
+        self.ep_client.createPad("popular", "hello")
+        self.server.latency = 0.2
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def herd(self, func, *args, threads=20):
+        """calls func from many threads at once, returns results and exceptions"""
+        barrier = threading.Barrier(threads)
+        outcomes = [None] * threads
+
+        def worker(i):
+            barrier.wait()
+            try:
+                outcomes[i] = func(*args)
+            except Exception as e:
+                outcomes[i] = e
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return outcomes
+
+    def testCoalesce(self):
+        """identical concurrent reads produce one upstream request"""
+        outcomes = self.herd(self.ep_client.getText, "popular")
+        self.assertEqual(outcomes, [{"text": "hello\n"}] * 20)
+        self.assertEqual(self.server.calls["getText"], 1)
+        self.assertEqual(self.ep_client.flights.coalesced, 19)
+
+        self.herd(self.ep_client.getText, "popular")
+        self.assertEqual(self.server.calls["getText"], 2)
+
+    def testSharedError(self):
+        """every waiter receives the exception of the shared request"""
+        outcomes = self.herd(self.ep_client.padUsersCount, "missing")
+        self.assertTrue(all(isinstance(e, ValueError) for e in outcomes))
+        self.assertEqual(self.server.calls["padUsersCount"], 1)
+
+    def testDistinctParams(self):
+        """calls with different parameters are not merged"""
+        self.server.latency = 0
+        self.ep_client.setText("popular", "again")
+        self.server.latency = 0.2
+        self.herd(self.ep_client.getText, "popular", 0, threads=5)
+        self.herd(self.ep_client.getText, "popular", threads=5)
+        self.assertEqual(self.server.calls["getText"], 2)
+
+    def testWritesNotCoalesced(self):
+        """identical mutating calls still reach the server one by one"""
+        self.server.latency = 0.01
+        self.herd(self.ep_client.appendText, "popular", "!", threads=5)
+        self.assertEqual(self.server.calls["appendText"], 5)
+        self.assertEqual(self.ep_client.getText("popular"), {"text": "hello!!!!!\n"})
+
+
+if __name__ == "__main__":
+    unittest.main()
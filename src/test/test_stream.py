@@ -0,0 +1,103 @@
+"""Module to test streamed decoding of list results against a local stand-in server."""
+
+import asyncio
+import gc
+import io
+import json
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.aio import AsyncEtherpadLiteClient
+from py_etherpad.stream import load_streamed
+
+
+class TestStream(unittest.TestCase):
+    """Class to test the stream flag of the listing functions."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, max_connections=1)
+        self.padIDs = ["pad-%05d" % i for i in range(1000)]
+        self.ep_client.map("createPad", self.padIDs, max_workers=1)
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def testListAllPads(self):
+        """the padIDs arrive as iterator and the connection is reused afterwards"""
+        result = self.ep_client.listAllPads(stream=True)
+        self.assertNotIsInstance(result["padIDs"], list)
+        self.assertEqual(list(result["padIDs"]), self.padIDs)
+        self.assertEqual(self.ep_client.listAllPads(), {"padIDs": self.padIDs})
+        self.assertEqual(self.ep_client.pool.connections_created, 1)
+
+    def testDropped(self):
+        """an iterator dropped half way gives up its connection"""
+        padIDs = self.ep_client.listAllPads(stream=True)["padIDs"]
+        self.assertEqual(next(padIDs), "pad-00000")
+        del padIDs
+        gc.collect()
+        self.assertEqual(self.ep_client.getText("pad-00001"), {"text": "Welcome to Etherpad!\n"})
+        self.assertEqual(self.ep_client.pool.connections_created, 2)
+
+    def testOtherListings(self):
+        groupID = self.ep_client.createGroup()["groupID"]
+        self.ep_client.createGroupPad(groupID, "notes")
+        self.assertEqual(list(self.ep_client.listAllGroups(stream=True)["groupIDs"]), [groupID])
+        self.assertEqual(list(self.ep_client.listPads(groupID, stream=True)["padIDs"]), [groupID + "$notes"])
+        with self.assertRaises(ValueError):
+            self.ep_client.listPads("g.missing", stream=True)
+
+        authorID = self.ep_client.createAuthor("chatty")["authorID"]
+        for i in range(5):
+            self.ep_client.appendChatMessage("pad-00000", "message %d" % i, authorID)
+        messages = self.ep_client.getChatHistory("pad-00000", 1, 2, stream=True)["messages"]
+        self.assertEqual([message["text"] for message in messages], ["message 1", "message 2"])
+
+    def testUnpooled(self):
+        client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, pooled=False)
+        self.assertEqual(list(client.listAllPads(stream=True)["padIDs"]), self.padIDs)
+
+    def testAsync(self):
+        async def scenario():
+            async with AsyncEtherpadLiteClient(API_KEY, self.server.baseUrl) as client:
+                return list((await client.listAllPads(stream=True))["padIDs"])
+
+        self.assertEqual(asyncio.run(scenario()), self.padIDs)
+
+
+class TestLoadStreamed(unittest.TestCase):
+    """Class to test the incremental decoder on its own."""
+
+    def testIncremental(self):
+        """the first element is available after reading a small part of the response"""
+        items = [{"id": i, "text": "ä" * 10, "values": [1.5, True, None]} for i in range(10000)]
+        fp = io.BytesIO(json.dumps({"code": 0, "message": "ok", "data": {"count": 3, "messages": items}}).encode())
+        result = load_streamed(fp, "messages", read_size=1024)
+        self.assertEqual(result["data"]["count"], 3)
+        self.assertEqual(next(result["data"]["messages"]), items[0])
+        self.assertLess(fp.tell(), 4096)
+        self.assertEqual(list(result["data"]["messages"]), items[1:])
+        self.assertTrue(fp.closed)
+
+    def testTinyReads(self):
+        """numbers, strings and whitespace split across reads"""
+        text = '{ "code" : 0 ,\n "message":"ok", "data" : { "padIDs" : [ 12345 , "a\\"b" , -1.5e3 , [] ] } }'
+        result = load_streamed(io.BytesIO(text.encode()), "padIDs", read_size=1)
+        self.assertEqual(list(result["data"]["padIDs"]), [12345, 'a"b', -1500.0, []])
+
+    def testNotStreamed(self):
+        for text in ('{"code": 1, "message": "padID does not exist", "data": null}',
+                     '{"data": {"padIDs": ["a"]}, "code": 0, "message": "ok"}',
+                     '{"code": 0, "message": "ok", "data": {"padIDs": []}}'):
+            result = load_streamed(io.BytesIO(text.encode()), "padIDs")
+            expected = json.loads(text)
+            if expected["data"]:
+                result["data"]["padIDs"] = list(result["data"]["padIDs"])
+            self.assertEqual(result, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
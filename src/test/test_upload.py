@@ -0,0 +1,122 @@
+"""Module to test streamed uploads against a local stand-in server."""
+
+import asyncio
+import io
+import os
+import tempfile
+import tracemalloc
+import unittest
+import urllib.parse as urllib_parse
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.aio import AsyncEtherpadLiteClient
+from py_etherpad.upload import CHUNK_SIZE, FormBody, Upload, is_large
+
+
+class TestUpload(unittest.TestCase):
+    """Class to test setText, appendText and setHtml with large and streamed values."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+        self.ep_client.createPad("upload")
+        self.text = "".join("line %d äöü & = + %%\n" % i for i in range(20000))
+
+    def tearDown(self):
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def assertText(self, text):
+        self.assertEqual(self.ep_client.getText("upload"), {"text": text})
+
+    def testLargeString(self):
+        """large strings are sent chunked, every chunk a few times CHUNK_SIZE at most"""
+        self.ep_client.setText("upload", self.text)
+        self.assertText(self.text)
+        self.assertGreater(len(self.server.request_chunks), 1)
+        self.assertLess(max(self.server.request_chunks), 4 * CHUNK_SIZE)
+
+    def testSmallString(self):
+        self.ep_client.setText("upload", "short")
+        self.assertText("short\n")
+        self.assertEqual(self.server.request_chunks, [])
+
+    def testFiles(self):
+        self.ep_client.setText("upload", io.StringIO(self.text))
+        self.assertText(self.text)
+        self.ep_client.appendText("upload", io.BytesIO("tail ä\n".encode()))
+        self.assertText(self.text[:-1] + "tail ä\n")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "import.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.text)
+            with open(path, "rb") as f:
+                self.ep_client.setText("upload", f)
+        self.assertText(self.text)
+
+    def testIterable(self):
+        self.ep_client.setText("upload", (line + "\n" for line in ("a", "b", "ü")))
+        self.assertText("a\nb\nü\n")
+        self.ep_client.setHtml("upload", iter(["<p>", "x &amp; y", "<br>", "z</p>"]))
+        self.assertText("x & y\nz\n")
+
+    def testUnpooled(self):
+        client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, pooled=False)
+        client.setText("upload", io.StringIO(self.text))
+        self.assertText(self.text)
+
+    def testHooks(self):
+        events = []
+        self.ep_client.add_hook(post=events.append)
+        self.ep_client.setText("upload", self.text)
+        body = urllib_parse.urlencode({"padID": "upload", "text": self.text}).encode()
+        self.assertEqual(events[0].payload_bytes, len(body))
+
+    def testRetryRewinds(self):
+        """a retried upload sends a seekable file from its start again"""
+        policy = py_etherpad.RetryPolicy(functions={"setText"}, sleep=lambda seconds: None)
+        client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl, retry=policy)
+        self.server.fail_next = 1
+        client.setText("upload", io.StringIO(self.text))
+        self.assertText(self.text)
+        self.assertEqual(policy.retries, 1)
+        client.close()
+
+        upload = Upload(iter(["once"]))
+        self.assertEqual(list(upload.chunks()), ["once"])
+        with self.assertRaises(ValueError):
+            list(upload.chunks())
+
+    def testAsync(self):
+        async def scenario():
+            async with AsyncEtherpadLiteClient(API_KEY, self.server.baseUrl) as client:
+                await client.setText("upload", io.StringIO(self.text))
+                return await client.getText("upload")
+
+        self.assertEqual(asyncio.run(scenario()), {"text": self.text})
+
+    def testMemory(self):
+        """peak memory of encoding a file does not grow with its size"""
+        with tempfile.TemporaryFile() as f:
+            f.write(b"x" * (8 * 1024 * 1024))
+            f.seek(0)
+            tracemalloc.start()
+            try:
+                for _ in FormBody({"padID": "upload", "text": Upload(f)}):
+                    pass
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        self.assertLess(peak, 1024 * 1024)
+
+    def testIsLarge(self):
+        self.assertFalse(is_large("x" * 8192))
+        self.assertTrue(is_large("x" * 8193))
+        self.assertTrue(is_large("ä" * 5000))
+        self.assertTrue(is_large(io.StringIO("")))
+
+
+if __name__ == "__main__":
+    unittest.main()
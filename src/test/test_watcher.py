@@ -0,0 +1,122 @@
+"""Module to test the PadWatcher against a local stand-in server."""
+
+import threading
+import unittest
+
+import py_etherpad
+from mock_etherpad import API_KEY, MockEtherpad
+from py_etherpad.watcher import PadChange, PadWatcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPadWatcher(unittest.TestCase):
+    """Class to test change detection and the adaptive poll intervals."""
+
+    def setUp(self):
+        self.server = MockEtherpad().__enter__()
+        self.ep_client = py_etherpad.EtherpadLiteClient(API_KEY, self.server.baseUrl)
+        self.padIDs = ["pad-%03d" % i for i in range(50)]
+        self.ep_client.map("createPad", self.padIDs)
+        self.clock = FakeClock()
+        self.watcher = PadWatcher(self.ep_client, min_interval=1, max_interval=16, clock=self.clock)
+        self.changes = []
+        self.watcher.on_change(self.changes.append)
+
+    def tearDown(self):
+        self.watcher.stop()
+        self.ep_client.close()
+        self.server.__exit__()
+
+    def setText(self, padID, text):
+        previous = self.server.last_edited[padID]
+        self.ep_client.setText(padID, text)
+        # Edits follow each other faster than the millisecond timestamps.
+        self.server.last_edited[padID] = max(self.server.last_edited[padID], previous + 1)
+
+    def testChanges(self):
+        self.assertEqual(len(self.watcher), 50)
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.server.calls["getLastEdited"], 50)
+        before = self.server.last_edited["pad-007"]
+        self.setText("pad-007", "changed")
+        self.assertEqual(self.watcher.poll(), [])  # nothing is due yet
+        self.clock.now = 2
+        self.assertEqual(self.watcher.poll(), [PadChange("pad-007", before, self.server.last_edited["pad-007"])])
+        self.assertEqual(self.changes, [PadChange("pad-007", before, self.server.last_edited["pad-007"])])
+
+    def testAdaptiveIntervals(self):
+        """a busy pad is polled every min_interval, idle pads less and less often"""
+        self.watcher.poll()
+        for second in range(1, 65):
+            self.clock.now = second
+            self.setText("pad-000", "edit %d" % second)
+            self.watcher.poll()
+        # The first poll of pad-000 after its baseline comes after 2 seconds, then every second.
+        self.assertEqual(len(self.changes), 63)
+        # The idle pads were polled after 2, 6, 14, 30, 46 and 62 seconds.
+        self.assertEqual(self.server.calls["getLastEdited"], 50 + 63 + 49 * 6)
+        self.assertEqual(self.watcher.next_due(), 65)
+
+    def testCreatedAndDeleted(self):
+        self.watcher.poll()
+        self.ep_client.deletePad("pad-001")
+        self.ep_client.createPad("pad-new")
+        changes = self.watcher.refresh()
+        self.assertEqual(len(changes), 1)
+        self.assertEqual((changes[0].padID, changes[0].current), ("pad-001", None))
+        self.assertIn("pad-new", self.watcher)
+        self.assertEqual(self.watcher.poll(), [PadChange("pad-new", None, self.server.last_edited["pad-new"])])
+
+        self.ep_client.deletePad("pad-002")
+        self.clock.now = 2
+        changes = self.watcher.poll()
+        self.assertEqual([(change.padID, change.current) for change in changes], [("pad-002", None)])
+        self.assertNotIn("pad-002", self.watcher)
+        self.assertEqual(len(self.watcher), 49)
+
+    def testWatch(self):
+        """watch yields the changes and sleeps until the next pad is due, the first poll doubles the interval"""
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            self.clock.now += seconds
+            if len(sleeps) == 1:
+                self.setText("pad-003", "changed")
+            if len(sleeps) == 3:
+                self.watcher._stop.set()
+
+        changes = list(self.watcher.watch(sleep))
+        self.assertEqual([change.padID for change in changes], ["pad-003"])
+        self.assertEqual(sleeps, [2, 1, 2])
+
+    def testThread(self):
+        watcher = PadWatcher(self.ep_client, self.padIDs[:3], min_interval=0.01, max_interval=0.02)
+        changed = threading.Event()
+        watcher.on_change(lambda change: changed.set())
+        with watcher:
+            watcher.start()
+            while watcher.polls < 3:
+                changed.wait(0.01)
+            self.setText("pad-002", "changed")
+            self.assertTrue(changed.wait(5))
+
+    def testCheck(self):
+        watcher = PadWatcher(self.ep_client, ["pad-000"], check="getRevisionsCount", clock=self.clock)
+        watcher.poll()
+        self.ep_client.setText("pad-000", "changed")
+        self.clock.now = 10
+        self.assertEqual(watcher.poll(), [PadChange("pad-000", 0, 1)])
+        with self.assertRaises(ValueError):
+            PadWatcher(self.ep_client, [], check="getText")
+
+
+if __name__ == "__main__":
+    unittest.main()